@@ -1,5 +1,7 @@
 from fastapi import APIRouter
 
+from app.api.routers import admin_router as admin
+from app.api.routers import health_router as health
 from app.api.routers import packages_router as packages
 
 # Главный роутер приложения:
@@ -7,3 +9,5 @@ api_router = APIRouter()
 
 # Подключаем роутеры:
 api_router.include_router(packages.router, prefix="/api", tags=["packages"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
+api_router.include_router(health.router, tags=["health"])
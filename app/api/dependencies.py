@@ -1,6 +1,8 @@
 from uuid import uuid4
 
-from fastapi import Request
+from fastapi import HTTPException, Request
+
+from app.core.profiling import is_admin_token_valid
 
 
 async def get_or_create_session_id(request: Request) -> str:
@@ -14,3 +16,12 @@ async def get_or_create_session_id(request: Request) -> str:
         session_id = str(uuid4())
         request.state.new_session_id = session_id
     return session_id
+
+
+async def require_admin(request: Request) -> None:
+    """
+    Доступ к админским эндпоинтам только с заголовком X-Admin-Token.
+    Если ADMIN_TOKEN не задан — админка недоступна.
+    """
+    if not is_admin_token_valid(request.headers.get("x-admin-token")):
+        raise HTTPException(status_code=403, detail="Доступ запрещён")
@@ -1 +1 @@
-from . import packages_router  # noqa: F401
+from . import admin_router, health_router, packages_router  # noqa: F401
@@ -0,0 +1,39 @@
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.api.dependencies import require_admin
+from app.core.config import settings
+from app.core.profiling import ProfilerBusyError, profile_for, slow_captures
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+profile_seconds_query = Query(10.0, gt=0, le=settings.PROFILER_MAX_SECONDS)
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def run_profiler(
+    seconds: float = profile_seconds_query,
+) -> PlainTextResponse:
+    """
+    Запуск сэмплирующего профилировщика на N секунд.
+
+    Возвращает collapsed stacks (вход для flamegraph.pl / speedscope).
+    """
+    try:
+        collapsed = await profile_for(seconds)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(
+        collapsed,
+        headers={"Content-Disposition": 'attachment; filename="profile.folded"'},
+    )
+
+
+@router.get("/slow-requests")
+async def get_slow_requests() -> List[Dict[str, Any]]:
+    """
+    Последние захваченные медленные запросы: этапы, стек и длительность.
+    """
+    return list(slow_captures)
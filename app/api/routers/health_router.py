@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+
+from app.db.mongo import MongoService, get_mongo_service
+from app.services.health import check_dependencies, readiness
+from app.workers.producer import Producer, get_producer
+
+router = APIRouter()
+
+get_mongo_service_dep = Depends(get_mongo_service)
+get_producer_dep = Depends(get_producer)
+
+
+@router.get("/ready")
+async def ready(
+    mongo: MongoService = get_mongo_service_dep,
+    producer: Producer = get_producer_dep,
+) -> JSONResponse:
+    """
+    Готовность к трафику: 200 после прогрева пулов и кэшей,
+    503 до него и во время остановки.
+    """
+    is_ready = await readiness.recheck(mongo, producer)
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "startup": readiness.startup},
+    )
+
+
+@router.get("/health")
+async def health(
+    mongo: MongoService = get_mongo_service_dep,
+    producer: Producer = get_producer_dep,
+) -> JSONResponse:
+    """
+    Состояние зависимостей: время round-trip до MySQL, Redis, Mongo
+    и RabbitMQ. 503, если хотя бы одна недоступна.
+    """
+    checks = await check_dependencies(mongo, producer)
+    ok = all(check["ok"] for check in checks.values())
+    return JSONResponse(
+        status_code=200 if ok else 503,
+        content={"status": "ok" if ok else "degraded", "dependencies": checks},
+    )
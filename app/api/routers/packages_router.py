@@ -1,17 +1,29 @@
 import asyncio
 import logging
+import math
+from datetime import datetime
 from typing import Any, Dict, List
 
 from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi_filter import FilterDepends
-from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy import select
+from fastapi_pagination import Page, Params
+from fastapi_pagination.api import resolve_params
+from fastapi_pagination.ext.sqlalchemy import create_count_query, paginate
+from sqlalchemy import Select, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.dependencies import get_or_create_session_id
+from app.core.config import settings
+from app.core.responses import (
+    EncodedCache,
+    FastJSONResponse,
+    ResponseCache,
+    dumps,
+)
+from app.core.utils import msk_now
 from app.db.mongo import MongoService, get_mongo_service
+from app.db.mysql import async_session
 from app.db.mysql import get_session as get_async_session
 from app.models.packages import Package
 from app.models.types import Type
@@ -22,7 +34,10 @@ from app.schemas.packages import (
     PackageOut,
     PackagesFilter,
 )
+from app.services import idempotency
+from app.services.admission import admission
 from app.workers.producer import Producer, get_producer
+from app.workers.queues import LANE_BULK
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -34,6 +49,30 @@ get_async_session_dep = Depends(get_async_session)
 get_mongo_service_dep = Depends(get_mongo_service)
 packages_filter_dep = FilterDepends(PackagesFilter)
 
+# Ответ на повтор уже принятого запроса
+REPLAYED_HEADERS = {"Idempotent-Replayed": "true"}
+
+# Быстрый путь (FAST_JSON_RESPONSES): строки из базы уже округлены при
+# записи, поэтому отдаются как есть, без PackageOut на каждую строку
+PACKAGE_OUT_COLUMNS = [
+    Package.__table__.c[name]
+    for name, field in PackageOut.model_fields.items()
+    if not field.exclude
+]
+types_response_cache: EncodedCache[str] = EncodedCache(
+    1, settings.TYPES_RESPONSE_TTL_SEC
+)
+# Статистика прошедших дней больше не меняется — хранится без TTL
+stats_response_cache: EncodedCache[str] = EncodedCache(
+    settings.STATS_RESPONSE_CACHE_SIZE
+)
+# Кэш ответов статистики и списков (RESPONSE_CACHE_TTL_SEC > 0): данные
+# меняются только при записи пачки воркером, и за несколько секунд
+# одинаковые запросы дашбордов обслуживает один запрос к хранилищу
+response_cache = ResponseCache(
+    settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL_SEC
+)
+
 
 @router.post("/packages/register")
 async def register_package(
@@ -45,10 +84,26 @@ async def register_package(
     """
     Регистрация посылки.
 
+    Повтор запроса с тем же заголовком Idempotency-Key (или без него,
+    но с тем же содержимым в течение короткого окна) посылку не дублирует.
+
     package: данные посылки
     """
+    # При перегрузке — быстрый 429/503 с Retry-After
+    await admission.admit(session_id, producer)
+
     package_data: dict[str, Any] = package.model_dump()
+    claim_key, message_key, window = idempotency.resolve_keys(
+        session_id, request.headers.get(idempotency.IDEMPOTENCY_HEADER), package_data
+    )
+    content = {"message": "Посылка зарегистрирована", "session_id": session_id}
+    if not await idempotency.claim(claim_key, window):
+        admission.release()
+        response = JSONResponse(content=content, headers=REPLAYED_HEADERS)
+        return set_session_cookie(response, request, session_id)
+
     package_data["session_id"] = session_id
+    package_data["idempotency_key"] = message_key
 
     async def send_package_background(data: dict[str, Any]):
         try:
@@ -60,14 +115,92 @@ async def register_package(
             logger.exception(
                 f"Ошибка отправки посылки в очередь: session_id={data['session_id']}"
             )
+            # Посылка не ушла — повтор клиента не должен считаться дублем
+            await idempotency.release(claim_key)
+        finally:
+            admission.release()
 
     asyncio.create_task(send_package_background(package_data))
 
-    response = JSONResponse(
-        content={"message": "Посылка зарегистрирована", "session_id": session_id}
+    return set_session_cookie(JSONResponse(content=content), request, session_id)
+
+
+@router.post("/packages/register/bulk")
+async def register_packages_bulk(
+    packages: List[PackageBase],
+    request: Request,
+    session_id: str = get_session_dep,
+    producer: Producer = get_producer_dep,
+):
+    """
+    Массовая регистрация посылок (импорт).
+
+    Посылки идут в отдельную bulk-очередь и не задерживают
+    интерактивные регистрации.
+
+    packages: список посылок
+    """
+    if len(packages) > settings.BULK_REGISTER_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=(
+                "Слишком много посылок в запросе "
+                f"(максимум {settings.BULK_REGISTER_MAX_ITEMS})"
+            ),
+        )
+    await admission.admit(session_id, producer, LANE_BULK)
+
+    payloads = [package.model_dump() for package in packages]
+    claim_key, message_key, window = idempotency.resolve_keys(
+        session_id, request.headers.get(idempotency.IDEMPOTENCY_HEADER), payloads
     )
+    content = {
+        "message": "Посылки зарегистрированы",
+        "count": len(payloads),
+        "session_id": session_id,
+    }
+    if not await idempotency.claim(claim_key, window):
+        admission.release()
+        response = JSONResponse(content=content, headers=REPLAYED_HEADERS)
+        return set_session_cookie(response, request, session_id)
+
+    items = [
+        PackageIn(
+            **payload,
+            session_id=session_id,
+            idempotency_key=idempotency.item_key(message_key, index),
+        )
+        for index, payload in enumerate(payloads)
+    ]
+
+    async def send_bulk_background(items: List[PackageIn]):
+        try:
+            await asyncio.gather(
+                *(producer.send_package_to_queue(item, LANE_BULK) for item in items)
+            )
+            logger.info(
+                f"Пачка из {len(items)} посылок отправлена в очередь: "
+                f"session_id={session_id}"
+            )
+        except Exception:
+            logger.exception(
+                f"Ошибка отправки пачки посылок в очередь: session_id={session_id}"
+            )
+            # Часть посылок могла уйти: при повторе с тем же Idempotency-Key
+            # их отсечёт воркер по ключам посылок
+            await idempotency.release(claim_key)
+        finally:
+            admission.release()
+
+    asyncio.create_task(send_bulk_background(items))
 
-    # Ставим cookie только если это новая сессия
+    return set_session_cookie(JSONResponse(content=content), request, session_id)
+
+
+def set_session_cookie(
+    response: JSONResponse, request: Request, session_id: str
+) -> JSONResponse:
+    """Ставит cookie сессии, если сессия новая."""
     if hasattr(request.state, "new_session_id"):
         response.set_cookie(
             key="session_id",
@@ -77,29 +210,54 @@ async def register_package(
             samesite="lax",
             secure=False,  # True если используем HTTPS
         )
-
     return response
 
 
-@router.get("/packages/types")
+@router.get("/packages/types", response_model=Dict[str, List[Dict[str, Any]]])
 async def get_package_types(
     db: AsyncSession = get_async_session_dep,
-) -> Dict[str, List[Dict[str, Any]]]:
+) -> Dict[str, List[Dict[str, Any]]] | FastJSONResponse:
     """
     Получение типов посылок.
     """
+    if settings.FAST_JSON_RESPONSES:
+        body = types_response_cache.get("types")
+        if body is not None:
+            return FastJSONResponse(body)
+
     stmt = select(Type.id, Type.name).order_by(Type.id.asc())
     result = await db.execute(stmt)
     types = [{"id": row.id, "name": row.name} for row in result.all()]
+
+    if settings.FAST_JSON_RESPONSES:
+        body = dumps({"types": types})
+        types_response_cache.set("types", body)
+        return FastJSONResponse(body)
     return {"types": types}
 
 
+async def paginate_rows(db: AsyncSession, stmt: Select) -> Dict[str, Any]:
+    """Страница в формате Page из строк базы, без Pydantic-моделей."""
+    params: Params = resolve_params()
+    raw = params.to_raw_params().as_limit_offset()
+    total = await db.scalar(create_count_query(stmt)) or 0
+    result = await db.execute(stmt.limit(raw.limit).offset(raw.offset))
+    return {
+        "items": [dict(row) for row in result.mappings()],
+        "total": total,
+        "page": params.page,
+        "size": params.size,
+        "pages": math.ceil(total / params.size),
+    }
+
+
 @router.get("/packages", response_model=Page[PackageOut])
 async def get_my_packages(
+    request: Request,
     filters: PackagesFilter = packages_filter_dep,
     session_id: str = get_session_dep,
     db: AsyncSession = get_async_session_dep,
-) -> Page[PackageOut]:
+) -> Page[PackageOut] | Response:
     """
     Получение посылок для текущей сессии.
 
@@ -107,6 +265,24 @@ async def get_my_packages(
     """
     stmt = select(Package).filter(Package.session_id == session_id)
     stmt = filters.filter(stmt)
+    if settings.RESPONSE_CACHE_TTL_SEC > 0:
+        stmt = stmt.with_only_columns(*PACKAGE_OUT_COLUMNS)
+        key = (
+            "packages",
+            session_id,
+            tuple(sorted(request.query_params.multi_items())),
+        )
+
+        # загрузку ждут и чужие запросы — сессия своя, не закрывается
+        # вместе с запросом, который её начал
+        async def load() -> bytes:
+            async with async_session() as session:
+                return dumps(await paginate_rows(session, stmt))
+
+        return await response_cache.respond(request, "packages", key, load)
+    if settings.FAST_JSON_RESPONSES:
+        stmt = stmt.with_only_columns(*PACKAGE_OUT_COLUMNS)
+        return FastJSONResponse(await paginate_rows(db, stmt))
     return await paginate(db, stmt)
 
 
@@ -114,12 +290,21 @@ async def get_my_packages(
 async def get_package_by_id(
     package_id: int,
     db: AsyncSession = get_async_session_dep,
-) -> PackageOut:
+) -> PackageOut | FastJSONResponse:
     """
     Получение сведений о посылке.
 
     package_id: ID посылки
     """
+    if settings.FAST_JSON_RESPONSES:
+        result = await db.execute(
+            select(*PACKAGE_OUT_COLUMNS).filter(Package.id == package_id)
+        )
+        row = result.mappings().first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Посылка не найдена")
+        return FastJSONResponse(dict(row))
+
     stmt = select(Package).filter(Package.id == package_id)
     result = await db.execute(stmt)
     package = result.scalar_one_or_none()
@@ -130,14 +315,42 @@ async def get_package_by_id(
     return package
 
 
+def is_past_day(date: str) -> bool:
+    """Дата `ДД_ММ_ГГГГ` раньше сегодняшней (по Москве)."""
+    try:
+        day = datetime.strptime(date, "%d_%m_%Y").date()
+    except ValueError:
+        return False
+    return day < msk_now().date()
+
+
+async def encoded_stats(mongo: MongoService, date: str | None) -> bytes:
+    """Статистика за день в JSON; прошедшие дни — из stats_response_cache."""
+    cache_key = date if date is not None and is_past_day(date) else None
+    body = stats_response_cache.get(cache_key) if cache_key else None
+    if body is None:
+        stats = await mongo.get_delivery_stats(date)
+        body = dumps([s.model_dump() for s in stats])
+        if cache_key:
+            stats_response_cache.set(cache_key, body)
+    return body
+
+
 @router.get("/stats", response_model=List[DeliveryStatsOut])
 async def get_delivery_stats(
+    request: Request,
     date: str | None = None,
     mongo: MongoService = get_mongo_service_dep,
-) -> List[DeliveryStatsOut]:
+) -> List[DeliveryStatsOut] | Response:
     """
     Получение статистики по доставкам за день.
 
     date: дата в формате `ДД_ММ_ГГГГ` (опционально, например `03_09_2025`).
     """
-    return await mongo.get_delivery_stats(date)
+    if settings.RESPONSE_CACHE_TTL_SEC > 0:
+        return await response_cache.respond(
+            request, "stats", ("stats", date), lambda: encoded_stats(mongo, date)
+        )
+    if not settings.FAST_JSON_RESPONSES:
+        return await mongo.get_delivery_stats(date)
+    return FastJSONResponse(await encoded_stats(mongo, date))
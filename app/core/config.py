@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -16,6 +16,14 @@ class Settings(BaseSettings):
     MYSQL_ROOT_PASSWORD: str = "root"
     MYSQL_HOST: str = "mysql"
     MYSQL_PORT: int = 3306
+    # пул соединений MySQL (SQLAlchemy)
+    MYSQL_POOL_SIZE: int = 10
+    MYSQL_MAX_OVERFLOW: int = 20
+    MYSQL_POOL_TIMEOUT: float = 30.0
+    MYSQL_POOL_RECYCLE: int = 1800
+    MYSQL_POOL_PRE_PING: bool = True
+    MYSQL_STATEMENT_CACHE_SIZE: int = 500
+    MYSQL_ECHO: bool = False
 
     # RabbitMQ (переменные для образа и для приложения)
     RABBITMQ_DEFAULT_USER: Optional[str] = None
@@ -27,10 +35,157 @@ class Settings(BaseSettings):
     # Redis
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
+    # пул соединений Redis
+    REDIS_MAX_CONNECTIONS: int = 100
+    REDIS_POOL_TIMEOUT: float = 5.0
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 5.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
 
     # MongoDB
     MONGO_HOST: str = "mongo"
     MONGO_PORT: int = 27017
+    # пул соединений MongoDB (Motor/PyMongo)
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 60000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 5000
+    MONGO_CONNECT_TIMEOUT_MS: int = 5000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    # write concern записи посылок: число узлов или "majority"
+    MONGO_WRITE_CONCERN: str = "1"
+    MONGO_WRITE_JOURNAL: bool = False
+    MONGO_WRITE_TIMEOUT_MS: int = 5000
+
+    # API: число процессов uvicorn (0 — по числу CPU)
+    API_HOST: str = "0.0.0.0"
+    API_PORT: int = 8000
+    API_WORKERS: int = 1
+    # сколько соединений открыть в каждом пуле при старте процесса
+    WARMUP_MYSQL_CONNECTIONS: int = 5
+    WARMUP_REDIS_CONNECTIONS: int = 5
+    WARMUP_MONGO_CONNECTIONS: int = 5
+    HEALTH_CHECK_TIMEOUT_SEC: float = 2.0
+    # быстрый путь JSON-ответов: orjson без повторной валидации response_model
+    FAST_JSON_RESPONSES: bool = False
+    TYPES_RESPONSE_TTL_SEC: float = 300.0
+    STATS_RESPONSE_CACHE_SIZE: int = 64  # дней статистики в кэше готовых ответов
+    # кэш ответов /api/stats и /api/packages; 0 — выключен
+    RESPONSE_CACHE_TTL_SEC: float = 0.0
+    RESPONSE_CACHE_SIZE: int = 1024
+
+    # логирование
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    LOG_QUEUE_SIZE: int = 10000
+    # доля успешных запросов, попадающих в лог (0..1)
+    LOG_SUCCESS_SAMPLE_RATE: float = 1.0
+
+    # формат сообщений packages_queue: msgpack (v2) или json (v1).
+    # Воркеры читают оба — при выкатке сначала обновляем воркеры.
+    QUEUE_WIRE_FORMAT: str = "msgpack"
+
+    # батчинг публикаций: до N посылок или T мс в одном сообщении-конверте
+    PRODUCER_BATCHING: bool = False
+    PRODUCER_BATCH_SIZE: int = 100
+    PRODUCER_BATCH_DELAY_MS: float = 5.0
+
+    # полосы обработки: interactive (регистрации) и bulk (импорты).
+    # Вес — доля обработчиков воркера при непустых обеих очередях
+    LANE_INTERACTIVE_PREFETCH: int = 50
+    LANE_INTERACTIVE_WEIGHT: int = 4
+    LANE_BULK_PREFETCH: int = 20
+    LANE_BULK_WEIGHT: int = 1
+    LANE_BULK_BATCH_SIZE: int = 500
+    LANE_BULK_BATCH_DELAY_MS: float = 50.0
+    BULK_REGISTER_MAX_ITEMS: int = 1000
+    # число одновременно обрабатываемых сообщений в воркере
+    WORKER_CONCURRENCY: int = 32
+
+    # приёмники воркера: пачка, задержка (linger), параллельные записи, попытки
+    SINK_MYSQL_BATCH_SIZE: int = 10
+    SINK_MYSQL_LINGER_SEC: float = 2.0
+    SINK_MYSQL_MAX_IN_FLIGHT: int = 2
+    SINK_MYSQL_MAX_ATTEMPTS: int = 5
+    SINK_MONGO_BATCH_SIZE: int = 10
+    SINK_MONGO_LINGER_SEC: float = 2.0
+    SINK_MONGO_MAX_IN_FLIGHT: int = 2
+    SINK_MONGO_MAX_ATTEMPTS: int = 3
+    SINK_RETRY_BASE_DELAY_SEC: float = 2.0
+    SINK_RETRY_MAX_DELAY_SEC: float = 30.0
+    SINK_MAX_PENDING_BATCHES: int = 20  # буфер приёмника (в пачках) до backpressure
+    # адаптивный размер пачки и linger приёмников (SINK_*_BATCH_SIZE/LINGER
+    # тогда не используются)
+    BATCH_ADAPTIVE: bool = True
+    BATCH_MIN_SIZE: int = 10
+    BATCH_MAX_SIZE: int = 1000
+    BATCH_TARGET_FLUSH_MS: float = 250.0  # пачка записывается не дольше
+    BATCH_LINGER_MIN_MS: float = 10.0
+    BATCH_LINGER_MAX_MS: float = 2000.0
+    BATCH_PROBE_EVERY: int = 50  # записей без изменений до новой попытки роста
+
+    # transactional outbox: воркер пишет только в MySQL (packages и
+    # packages_outbox в одной транзакции), Mongo наполняет app.workers.outbox
+    OUTBOX_ENABLED: bool = False
+    OUTBOX_RELAY_BATCH_ROWS: int = 50  # строк outbox (пачек воркера) за проход
+    OUTBOX_RELAY_POLL_SEC: float = 0.5  # пауза, когда outbox пуст
+    OUTBOX_RELAY_METRICS_PORT: int = 9102
+
+    # декодирование, валидация и расчёт стоимости в пуле процессов
+    OFFLOAD_PROCESSES: int = 0  # 0 — в event loop, без пула
+    OFFLOAD_CHUNK_SIZE: int = 32  # сообщений в задаче пула, <= WORKER_CONCURRENCY
+    OFFLOAD_LINGER_MS: float = 2.0  # ожидание неполного чанка
+
+    # задержки уровней отложенного повтора, сек; после последнего — DLQ
+    RETRY_DELAYS_SEC: List[int] = [1, 5, 30, 120]
+
+    # идемпотентность: окно SETNX в Redis на API и фильтр дублей в воркере
+    IDEMPOTENCY_WINDOW_SEC: int = 24 * 60 * 60
+    # окно для запросов без Idempotency-Key (ключ по содержимому)
+    IDEMPOTENCY_DERIVED_WINDOW_SEC: int = 60
+    DEDUP_FILTER_CAPACITY: int = 1_000_000
+    DEDUP_FILTER_ERROR_RATE: float = 0.001
+    # ключи за сколько часов загружаются в фильтр при старте воркера
+    DEDUP_WARMUP_HOURS: int = 24
+
+    # контроль допуска регистраций
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_IN_FLIGHT: int = 1000
+    ADMISSION_MAX_QUEUE_DEPTH: int = 100000
+    ADMISSION_QUEUE_CHECK_INTERVAL: float = 1.0
+    ADMISSION_RETRY_AFTER_SEC: int = 1
+    # token bucket на сессию: пополнение в секунду и ёмкость
+    RATE_LIMIT_PER_SEC: float = 10.0
+    RATE_LIMIT_BURST: int = 20
+
+    # супервизор воркеров: число процессов (0 — по числу CPU),
+    # привязка процессов к ядрам, порты метрик/админки дочерних процессов
+    WORKER_PROCESSES: int = 0
+    WORKER_CPU_AFFINITY: bool = False
+    WORKER_RESTART_BACKOFF_MAX_SEC: float = 30.0
+    WORKER_CHILD_METRICS_PORT_BASE: int = 9200
+    WORKER_CHILD_ADMIN_PORT_BASE: int = 9300
+
+    # секционирование packages по месяцам created_at
+    PARTITION_MONTHS_AHEAD: int = 3  # секции создаются заранее на N месяцев
+    PARTITION_RETENTION_MONTHS: int = 12  # месяцы в горячей таблице
+    PARTITION_ARCHIVE: bool = True  # False — старые секции удаляются без архива
+
+    # метрики
+    WORKER_METRICS_PORT: int = 9100
+    QUEUE_DEPTH_POLL_INTERVAL: float = 5.0
+
+    # админка и профилирование
+    ADMIN_TOKEN: Optional[str] = None
+    WORKER_ADMIN_PORT: int = 9101
+    # админ-листенер воркера: ожидание запроса и предел размера заголовков
+    WORKER_ADMIN_READ_TIMEOUT_SEC: float = 5.0
+    WORKER_ADMIN_MAX_HEADER_BYTES: int = 8192
+    PROFILER_MAX_SECONDS: float = 60.0
+    PROFILER_INTERVAL_MS: float = 5.0
+    # порог захвата медленных запросов/сообщений (0 — выключено)
+    SLOW_REQUEST_THRESHOLD_MS: float = 1000.0
+    SLOW_CAPTURE_KEEP: int = 50
 
     # внешние AP
     CBR_DAILY_URL: str = "https://www.cbr-xml-daily.ru/daily_json.js"
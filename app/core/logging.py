@@ -1,12 +1,149 @@
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+import random
+import sys
 import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any
+from uuid import uuid4
 
-from fastapi import HTTPException, Request
+from fastapi import HTTPException
 from fastapi.responses import JSONResponse
-from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import LOG_RECORDS_DROPPED
+from app.core.profiling import SlowCallWatch
 
 logger = logging.getLogger(__name__)
 
+# ID текущего запроса/сообщения, подмешивается во все записи лога
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+# Пути, которые не логируем (Swagger/OpenAPI, метрики)
+SKIP_PATH_PREFIXES = (
+    "/docs",
+    "/openapi.json",
+    "/redoc",
+    "/swagger",
+    "/metrics",
+    "/health",
+    "/ready",
+)
+
+# Стандартные атрибуты LogRecord — всё остальное считаем полями из extra
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись лога в одну JSON-строку."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        # трейсбек — отдельным полем, не внутри message
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        if record.stack_info:
+            data["stack_info"] = record.stack_info
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler с ограниченной очередью: при переполнении запись
+    отбрасывается (log_records_dropped_total), а не блокирует event loop.
+    """
+
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        В отличие от QueueHandler.prepare, трейсбек не склеивается
+        с message: он форматируется в exc_text (кадры не держатся
+        в очереди), а форматтер выводит его отдельно.
+        """
+        record = copy.copy(record)
+        # Фиксируем request_id в потоке-источнике, до передачи в listener
+        record.request_id = request_id_var.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """
+    Настраивает корневой логгер: записи кладутся в очередь,
+    а запись в stdout выполняет отдельный поток QueueListener.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if settings.LOG_JSON:
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(
+            logging.Formatter(
+                "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+            )
+        )
+
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(settings.LOG_QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL)
+    # uvicorn вешает свои обработчики — перенаправляем их в общую очередь
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Дописывает оставшиеся записи и останавливает поток логирования."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
 class LoggingMiddleware:
     def __init__(self, app: ASGIApp):
@@ -17,33 +154,51 @@ class LoggingMiddleware:
             await self.app(scope, receive, send)
             return
 
-        request = Request(scope, receive=receive)
-        start_time = time.time()
+        path: str = scope["path"]
 
         # Пропускаем Swagger/OpenAPI
-        if request.url.path.startswith(
-            ("/docs", "/openapi.json", "/redoc", "/swagger")
-        ):
+        if path.startswith(SKIP_PATH_PREFIXES):
             await self.app(scope, receive, send)
             return
 
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")
+                break
+        request_id = request_id or uuid4().hex
+        token = request_id_var.set(request_id)
+
+        start_time = time.perf_counter()
         response_status = None
+        watch = SlowCallWatch(
+            "request",
+            settings.SLOW_REQUEST_THRESHOLD_MS,
+            method=scope["method"],
+            path=path,
+            request_id=request_id,
+        )
 
-        async def send_wrapper(message):
+        async def send_wrapper(message: Message):
             nonlocal response_status
             if message["type"] == "http.response.start":
+                watch.stage("handler")
                 response_status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER, request_id.encode()))
+                message["headers"] = headers
             await send(message)
 
         try:
-            await self.app(scope, receive, send_wrapper)
+            async with watch:
+                await self.app(scope, receive, send_wrapper)
         except HTTPException as he:
             logger.warning("HTTP error %s: %s", he.status_code, he.detail)
             response = JSONResponse(
                 status_code=he.status_code,
                 content={"error": "HTTPException", "details": he.detail},
             )
-            await response(scope, receive, send)
+            await response(scope, receive, send_wrapper)
             response_status = he.status_code
         except Exception as e:
             logger.exception("Unexpected error: %s", e)
@@ -51,14 +206,24 @@ class LoggingMiddleware:
                 status_code=500,
                 content={"error": "InternalServerError", "details": str(e)},
             )
-            await response(scope, receive, send)
+            await response(scope, receive, send_wrapper)
             response_status = 500
         finally:
-            process_time = time.time() - start_time
-            logger.info(
-                "Completed %s %s with status %s in %.3f sec",
-                request.method,
-                request.url.path,
-                response_status,
-                process_time,
-            )
+            process_time = time.perf_counter() - start_time
+            # Успешные запросы логируем с сэмплированием, ошибки — всегда
+            is_error = response_status is None or response_status >= 400
+            if is_error or random.random() < settings.LOG_SUCCESS_SAMPLE_RATE:
+                logger.info(
+                    "Completed %s %s with status %s in %.3f sec",
+                    scope["method"],
+                    path,
+                    response_status,
+                    process_time,
+                    extra={
+                        "method": scope["method"],
+                        "path": path,
+                        "status": response_status,
+                        "duration_ms": round(process_time * 1000, 3),
+                    },
+                )
+            request_id_var.reset(token)
@@ -0,0 +1,305 @@
+import os
+import time
+from typing import Iterable
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.db.instrumentation import pool_stats_snapshot
+
+# API в несколько процессов (app.server) пишет метрики в общий каталог
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+BATCH_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Логирование
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Записи лога, отброшенные из-за переполнения очереди логирования",
+)
+
+# API
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Длительность обработки HTTP-запроса",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Количество HTTP-запросов в обработке",
+    multiprocess_mode="livesum",
+)
+PUBLISH_DURATION = Histogram(
+    "amqp_publish_duration_seconds",
+    "Длительность публикации сообщения в RabbitMQ",
+    buckets=LATENCY_BUCKETS,
+)
+PUBLISH_FAILURES = Counter(
+    "amqp_publish_failures_total",
+    "Количество неудачных публикаций в RabbitMQ",
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Регистрации, отклонённые контролем допуска",
+    ["reason"],
+)
+RESPONSE_CACHE_REQUESTS = Counter(
+    "http_response_cache_requests_total",
+    "Обращения к кэшу ответов: hit, miss, coalesced, not_modified",
+    ["route", "result"],
+)
+
+# Worker
+
+MESSAGES_CONSUMED = Counter(
+    "worker_messages_consumed_total",
+    "Количество сообщений, полученных воркером",
+)
+MESSAGES_FAILED = Counter(
+    "worker_messages_failed_total",
+    "Количество сообщений, обработанных с ошибкой",
+)
+MESSAGES_RETRIED = Counter(
+    "worker_messages_retried_total",
+    "Сообщения, отправленные на отложенный повтор",
+)
+MESSAGES_DEAD_LETTERED = Counter(
+    "worker_messages_dead_lettered_total",
+    "Сообщения, отправленные в DLQ",
+)
+DUPLICATES_DROPPED = Counter(
+    "worker_duplicates_dropped_total",
+    "Повторные посылки, отброшенные до записи",
+)
+BUFFER_DEPTH = Gauge(
+    "worker_buffer_depth",
+    "Количество посылок в буфере перед записью",
+    ["sink"],
+)
+FLUSH_BATCH_SIZE = Histogram(
+    "worker_flush_batch_size",
+    "Размер пачки при записи в хранилище",
+    ["sink"],
+    buckets=BATCH_BUCKETS,
+)
+FLUSH_DURATION = Histogram(
+    "worker_flush_duration_seconds",
+    "Длительность записи пачки в хранилище",
+    ["sink"],
+    buckets=LATENCY_BUCKETS,
+)
+FLUSH_RETRIES = Counter(
+    "worker_flush_retries_total",
+    "Количество повторных попыток записи пачки",
+    ["sink"],
+)
+FLUSH_FAILURES = Counter(
+    "worker_flush_failures_total",
+    "Пачки, не записанные за все попытки",
+    ["sink"],
+)
+FLUSH_PARTIAL_ITEMS = Counter(
+    "worker_flush_partial_items_total",
+    "Элементы пачки, не записанные при частичном сбое и ушедшие на повтор",
+    ["sink"],
+)
+FLUSHES_IN_FLIGHT = Gauge(
+    "worker_flushes_in_flight",
+    "Записи пачек, выполняющиеся сейчас",
+    ["sink"],
+)
+BATCH_TARGET_SIZE = Gauge(
+    "worker_batch_target_size",
+    "Текущий целевой размер пачки приёмника",
+    ["sink"],
+)
+BATCH_LINGER = Gauge(
+    "worker_batch_linger_seconds",
+    "Текущее ожидание неполной пачки приёмника",
+    ["sink"],
+)
+BATCH_ADJUSTMENTS = Counter(
+    "worker_batch_adjustments_total",
+    "Решения адаптивного размера пачки (grow, hold, latency, error)",
+    ["sink", "decision"],
+)
+OUTBOX_RELAYED = Counter(
+    "worker_outbox_relayed_total",
+    "Посылки, переданные реле outbox в приёмники",
+)
+OUTBOX_RELAY_FAILURES = Counter(
+    "worker_outbox_relay_failures_total",
+    "Проходы реле outbox, завершившиеся ошибкой (строки остаются в outbox)",
+)
+OUTBOX_RELAY_DURATION = Histogram(
+    "worker_outbox_relay_duration_seconds",
+    "Длительность прохода реле outbox",
+    buckets=LATENCY_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    "worker_cache_requests_total",
+    "Обращения к кэшам курса и типов посылок",
+    ["cache", "result"],
+)
+CONSUMER_LAG = Histogram(
+    "worker_consumer_lag_seconds",
+    "Время от публикации сообщения до начала его обработки "
+    "(по заголовку x-published-at-ms; без него — с точностью до 1 с)",
+    buckets=LATENCY_BUCKETS + (30.0, 60.0, 300.0),
+)
+QUEUE_DEPTH = Gauge(
+    "worker_queue_depth",
+    "Количество сообщений в очереди RabbitMQ",
+    ["queue"],
+)
+
+
+class PoolStatsCollector(Collector):
+    """Экспортирует статистику пулов соединений из app.db.instrumentation."""
+
+    def collect(self) -> Iterable[CounterMetricFamily | GaugeMetricFamily]:
+        in_use = GaugeMetricFamily(
+            "db_pool_connections_in_use", "Занятые соединения пула", labels=["db"]
+        )
+        checkout_wait = CounterMetricFamily(
+            "db_pool_checkout_wait_seconds",
+            "Суммарное время ожидания соединения из пула",
+            labels=["db"],
+        )
+        checkouts = CounterMetricFamily(
+            "db_pool_checkouts", "Количество выдач соединений из пула", labels=["db"]
+        )
+        checkout_wait_max = GaugeMetricFamily(
+            "db_pool_checkout_wait_max_seconds",
+            "Максимальное время ожидания соединения из пула",
+            labels=["db"],
+        )
+        checkout_failures = CounterMetricFamily(
+            "db_pool_checkout_failures",
+            "Неудачные попытки получить соединение",
+            labels=["db"],
+        )
+        query_time = CounterMetricFamily(
+            "db_query_duration_seconds",
+            "Суммарное время выполнения запросов",
+            labels=["db"],
+        )
+        queries = CounterMetricFamily(
+            "db_queries", "Количество выполненных запросов", labels=["db"]
+        )
+        query_errors = CounterMetricFamily(
+            "db_query_errors", "Количество запросов с ошибкой", labels=["db"]
+        )
+        for db, stats in pool_stats_snapshot().items():
+            in_use.add_metric([db], stats["in_use"])
+            checkout_wait.add_metric([db], stats["checkout_wait"]["total"])
+            checkouts.add_metric([db], stats["checkout_wait"]["count"])
+            checkout_wait_max.add_metric([db], stats["checkout_wait"]["max"])
+            checkout_failures.add_metric([db], stats["checkout_failures"])
+            query_time.add_metric([db], stats["query_latency"]["total"])
+            queries.add_metric([db], stats["query_latency"]["count"])
+            query_errors.add_metric([db], stats["query_errors"])
+        yield from (
+            in_use,
+            checkout_wait,
+            checkouts,
+            checkout_wait_max,
+            checkout_failures,
+            query_time,
+            queries,
+            query_errors,
+        )
+
+
+REGISTRY.register(PoolStatsCollector())
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: латентность запросов по имени маршрута и число
+    запросов в обработке.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # Имя маршрута вместо пути, чтобы не раздувать число рядов
+            route = scope.get("route")
+            route_name = getattr(route, "name", None) or "unmatched"
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], route_name, str(status)
+            ).observe(time.perf_counter() - start)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Метрики в формате Prometheus."""
+    registry = REGISTRY
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        # Сумма по всем процессам API; статистика пулов — только
+        # процесса, который обслужил запрос
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(PoolStatsCollector())
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead() -> None:
+    """Убирает live-метрики завершающегося процесса API."""
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def start_metrics_server(port: int) -> None:
+    """Поднимает отдельный HTTP-листенер с метриками (для воркера)."""
+    start_http_server(port)
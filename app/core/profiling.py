@@ -0,0 +1,249 @@
+import asyncio
+import json
+import logging
+import math
+import secrets
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from http import HTTPStatus
+from types import FrameType
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilerBusyError(RuntimeError):
+    """Профилировщик уже запущен в этом процессе."""
+
+
+class SamplingProfiler:
+    """
+    Wall-clock сэмплирующий профилировщик.
+    Отдельный поток с заданным интервалом снимает стеки всех потоков процесса
+    и копит их в формате collapsed stacks (flamegraph.pl / speedscope).
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+
+    @staticmethod
+    def _collapse(frame: Optional[FrameType]) -> str:
+        parts: List[str] = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(parts))
+
+    def run(self, seconds: float) -> str:
+        """Блокирующий запуск: сэмплирует seconds секунд и возвращает стеки."""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("Profiler is already running")
+        try:
+            own_id = threading.get_ident()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    thread_name = names.get(thread_id, str(thread_id))
+                    self.samples[f"{thread_name};{self._collapse(frame)}"] += 1
+                time.sleep(self.interval)
+        finally:
+            self._lock.release()
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.items())
+
+
+async def profile_for(seconds: float) -> str:
+    """Профилирует процесс seconds секунд, не блокируя event loop."""
+    seconds = min(max(seconds, 0.1), settings.PROFILER_MAX_SECONDS)
+    profiler = SamplingProfiler(settings.PROFILER_INTERVAL_MS / 1000)
+    return await asyncio.to_thread(profiler.run, seconds)
+
+
+# Захват медленных запросов/сообщений
+
+slow_captures: Deque[Dict[str, Any]] = deque(maxlen=settings.SLOW_CAPTURE_KEEP)
+
+
+class SlowCallWatch:
+    """
+    Следит за длительностью запроса или сообщения.
+    Если обработка не уложилась в порог, по таймеру снимается стек
+    текущей asyncio-задачи (где она ждёт), а по завершении запись
+    с этапами и стеком сохраняется в slow_captures и пишется в лог.
+    """
+
+    def __init__(self, name: str, threshold_ms: float, **context: Any):
+        self.name = name
+        self.threshold = threshold_ms / 1000
+        self.context = context
+        self.stages: Dict[str, float] = {}
+        self._start = 0.0
+        self._last = 0.0
+        self._stack: Optional[str] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def stage(self, name: str) -> None:
+        """Отмечает завершение этапа обработки."""
+        now = time.perf_counter()
+        self.stages[name] = round((now - self._last) * 1000, 3)
+        self._last = now
+
+    def _capture_stack(self, task: asyncio.Task[Any]) -> None:
+        self._stack = "".join(
+            line
+            for frame in task.get_stack()
+            for line in traceback.format_stack(frame, limit=1)
+        )
+
+    async def __aenter__(self) -> "SlowCallWatch":
+        self._start = self._last = time.perf_counter()
+        task = asyncio.current_task()
+        if self.threshold > 0 and task is not None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.threshold, self._capture_stack, task)
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        elapsed = time.perf_counter() - self._start
+        if self.threshold <= 0 or elapsed < self.threshold:
+            return
+        capture = {
+            "name": self.name,
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "stages_ms": self.stages,
+            "stack": self._stack,
+            **self.context,
+        }
+        slow_captures.append(capture)
+        logger.warning(
+            "Slow %s: %.3f sec", self.name, elapsed, extra={"slow_call": capture}
+        )
+
+
+def is_admin_token_valid(token: Optional[str]) -> bool:
+    """Проверка админского токена. Без ADMIN_TOKEN админ-доступ выключен."""
+    if not settings.ADMIN_TOKEN or not token:
+        return False
+    return secrets.compare_digest(token, settings.ADMIN_TOKEN)
+
+
+# Админ-листенер для процессов без FastAPI (воркер)
+
+
+class _HeadersTooLarge(Exception):
+    pass
+
+
+async def _read_request_head(
+    reader: asyncio.StreamReader,
+) -> Tuple[List[str], Dict[str, str]]:
+    """Строка запроса и заголовки, не больше WORKER_ADMIN_MAX_HEADER_BYTES."""
+    budget = settings.WORKER_ADMIN_MAX_HEADER_BYTES
+
+    async def readline() -> str:
+        nonlocal budget
+        try:
+            raw = await reader.readline()
+        except (asyncio.LimitOverrunError, ValueError):
+            raise _HeadersTooLarge()
+        budget -= len(raw)
+        if budget < 0:
+            raise _HeadersTooLarge()
+        return raw.decode("latin-1")
+
+    request_line = (await readline()).split()
+    headers: Dict[str, str] = {}
+    while line := (await readline()).strip():
+        key, _, value = line.partition(":")
+        headers[key.strip().lower()] = value.strip()
+    return request_line, headers
+
+
+def _profile_seconds(value: str) -> Optional[float]:
+    """seconds из запроса, не больше PROFILER_MAX_SECONDS; None — некорректно."""
+    try:
+        seconds = float(value)
+    except ValueError:
+        return None
+    if not math.isfinite(seconds) or seconds <= 0:
+        return None
+    return min(seconds, settings.PROFILER_MAX_SECONDS)
+
+
+async def _handle_admin_connection(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    status, content_type, body = 404, "text/plain", b"Not found"
+    try:
+        # Медленный или молчащий клиент не держит обработчик
+        request_line, headers = await asyncio.wait_for(
+            _read_request_head(reader), settings.WORKER_ADMIN_READ_TIMEOUT_SEC
+        )
+
+        url = urlsplit(request_line[1] if len(request_line) > 1 else "/")
+        params = parse_qs(url.query)
+        if not is_admin_token_valid(headers.get("x-admin-token")):
+            status, body = 403, b"Forbidden"
+        elif url.path == "/profile":
+            seconds = _profile_seconds(params.get("seconds", ["10"])[0])
+            if seconds is None:
+                status, body = 400, b"seconds must be a positive number"
+            else:
+                body = (await profile_for(seconds)).encode()
+                status = 200
+        elif url.path == "/slow-requests":
+            body = json.dumps(list(slow_captures), default=str).encode()
+            status, content_type = 200, "application/json"
+    except asyncio.TimeoutError:
+        status, body = 408, b"Request timeout"
+    except _HeadersTooLarge:
+        status, body = 431, b"Request header fields too large"
+    except ProfilerBusyError as e:
+        status, body = 409, str(e).encode()
+    except Exception as e:
+        logger.exception("Admin request failed")
+        status, body = 500, str(e).encode()
+
+    head = (
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    try:
+        writer.write(head.encode() + body)
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_admin_server(port: int) -> asyncio.AbstractServer:
+    """
+    Минимальный HTTP-листенер с эндпоинтами /profile?seconds=N и
+    /slow-requests, как /admin/* в API (заголовок X-Admin-Token обязателен).
+    """
+    return await asyncio.start_server(
+        _handle_admin_connection,
+        "0.0.0.0",
+        port,
+        limit=settings.WORKER_ADMIN_MAX_HEADER_BYTES,
+    )
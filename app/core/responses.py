@@ -0,0 +1,167 @@
+"""
+Быстрый путь JSON-ответов (FAST_JSON_RESPONSES).
+
+Эндпоинт возвращает FastJSONResponse — FastAPI не валидирует такой ответ
+через response_model, а orjson кодирует строки из базы напрямую, без
+построения Pydantic-моделей. response_model остаётся у эндпоинта для
+документации OpenAPI. Неизменяемые ответы кэшируются готовыми байтами.
+
+ResponseCache (RESPONSE_CACHE_TTL_SEC > 0) держит часто запрашиваемые
+ответы несколько секунд: одинаковые одновременные запросы ждут один
+запрос к хранилищу, а клиент с актуальным If-None-Match получает 304.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+import orjson
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.metrics import RESPONSE_CACHE_REQUESTS
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+def _default(obj: Any) -> Any:
+    # Numeric-колонки MySQL приходят как Decimal, в JSON — числа, как у Pydantic
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(Response):
+    """JSON-ответ через orjson; bytes отдаются как есть (уже закодированы)."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+class TTLCache(Generic[K, V]):
+    """
+    LRU на maxsize ключей; ttl_sec=None — без устаревания (для данных,
+    которые больше не меняются).
+    """
+
+    def __init__(self, maxsize: int, ttl_sec: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl_sec = ttl_sec
+        self._items: OrderedDict[K, Tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K) -> Optional[V]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if self.ttl_sec is not None and time.monotonic() >= expires_at:
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        expires_at = time.monotonic() + (self.ttl_sec or 0.0)
+        self._items[key] = (expires_at, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+
+class EncodedCache(TTLCache[K, bytes]):
+    """LRU закодированных ответов."""
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match: список тегов через запятую, W/ при сравнении не важен."""
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+class ResponseCache:
+    """
+    Готовые ответы на ttl_sec с объединением запросов (single-flight):
+    пока ответ по ключу загружается, остальные запросы с тем же ключом
+    ждут ту же загрузку. Загрузка идёт отдельной задачей, поэтому отмена
+    первого запроса (клиент отключился) не роняет ожидающих.
+    """
+
+    def __init__(self, maxsize: int, ttl_sec: float):
+        self._cache: TTLCache[Hashable, CachedResponse] = TTLCache(maxsize, ttl_sec)
+        self._loading: Dict[Hashable, "asyncio.Task[CachedResponse]"] = {}
+
+    async def _load(
+        self, key: Hashable, load: Callable[[], Awaitable[bytes]]
+    ) -> CachedResponse:
+        body = await load()
+        entry = CachedResponse(body, make_etag(body))
+        self._cache.set(key, entry)
+        return entry
+
+    async def get_or_load(
+        self, key: Hashable, load: Callable[[], Awaitable[bytes]]
+    ) -> Tuple[CachedResponse, str]:
+        """Ответ и откуда он: hit, coalesced (чужая загрузка) или miss."""
+        entry = self._cache.get(key)
+        if entry is not None:
+            return entry, "hit"
+        task = self._loading.get(key)
+        result = "coalesced"
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, load))
+            self._loading[key] = task
+            task.add_done_callback(lambda _: self._loading.pop(key, None))
+            result = "miss"
+        return await asyncio.shield(task), result
+
+    async def respond(
+        self,
+        request: Request,
+        route: str,
+        key: Hashable,
+        load: Callable[[], Awaitable[bytes]],
+    ) -> Response:
+        """FastJSONResponse с ETag или 304, если у клиента та же версия."""
+        entry, result = await self.get_or_load(key, load)
+        headers = {"ETag": entry.etag}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            result = "not_modified"
+            response: Response = Response(status_code=304, headers=headers)
+        else:
+            response = FastJSONResponse(entry.body, headers=headers)
+        RESPONSE_CACHE_REQUESTS.labels(route, result).inc()
+        return response
@@ -0,0 +1,231 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import redis.asyncio as redis
+from pymongo import monitoring
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+@dataclass
+class LatencyStats:
+    """Накопительная статистика по длительностям (в секундах)."""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def snapshot(self) -> Dict[str, float]:
+        avg = self.total / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "total": round(self.total, 6),
+            "avg": round(avg, 6),
+            "max": round(self.max, 6),
+        }
+
+
+@dataclass
+class PoolStats:
+    """Статистика пула соединений одного клиента (mysql/redis/mongo)."""
+
+    name: str
+    checkout_wait: LatencyStats = field(default_factory=LatencyStats)
+    query_latency: LatencyStats = field(default_factory=LatencyStats)
+    in_use: int = 0
+    checkout_failures: int = 0
+    query_errors: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def observe_checkout(self, seconds: float) -> None:
+        with self._lock:
+            self.checkout_wait.observe(seconds)
+            self.in_use += 1
+
+    def observe_checkin(self) -> None:
+        with self._lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+    def observe_checkout_failure(self) -> None:
+        with self._lock:
+            self.checkout_failures += 1
+
+    def observe_query(self, seconds: float, failed: bool = False) -> None:
+        with self._lock:
+            self.query_latency.observe(seconds)
+            if failed:
+                self.query_errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_use": self.in_use,
+                "checkout_failures": self.checkout_failures,
+                "query_errors": self.query_errors,
+                "checkout_wait": self.checkout_wait.snapshot(),
+                "query_latency": self.query_latency.snapshot(),
+            }
+
+
+mysql_stats = PoolStats("mysql")
+redis_stats = PoolStats("redis")
+mongo_stats = PoolStats("mongo")
+
+
+def pool_stats_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Снимок статистики всех пулов (для метрик и отладки)."""
+    return {s.name: s.snapshot() for s in (mysql_stats, redis_stats, mongo_stats)}
+
+
+# MySQL (SQLAlchemy)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул SQLAlchemy, замеряющий время ожидания соединения.
+    В замер входит и установка нового соединения, если пул его создаёт.
+    """
+
+    def _do_get(self):  # type: ignore[no-untyped-def]
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            mysql_stats.observe_checkout_failure()
+            raise
+        mysql_stats.observe_checkout(time.perf_counter() - start)
+        return connection
+
+    def _do_return_conn(self, record):  # type: ignore[no-untyped-def]
+        mysql_stats.observe_checkin()
+        super()._do_return_conn(record)
+
+
+def instrument_sqlalchemy_engine(engine: Engine) -> None:
+    """Вешает на движок слушатели для замера латентности запросов."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, params, context, many):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, params, context, many):
+        start = conn.info["query_start_time"].pop()
+        mysql_stats.observe_query(time.perf_counter() - start)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        conn = context.connection
+        starts = conn.info.get("query_start_time") if conn is not None else None
+        if starts:
+            elapsed = time.perf_counter() - starts.pop()
+            mysql_stats.observe_query(elapsed, failed=True)
+
+
+# Redis
+
+
+class InstrumentedBlockingConnectionPool(redis.BlockingConnectionPool):
+    """
+    Ограниченный пул Redis: при исчерпании соединений ждёт освобождения
+    (не дольше timeout) и замеряет это ожидание.
+    """
+
+    async def get_connection(  # type: ignore[override]
+        self, *args: Any, **kwargs: Any
+    ) -> Any:
+        start = time.perf_counter()
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        except Exception:
+            redis_stats.observe_checkout_failure()
+            raise
+        redis_stats.observe_checkout(time.perf_counter() - start)
+        return connection
+
+    async def release(self, connection: Any) -> None:  # type: ignore[override]
+        redis_stats.observe_checkin()
+        await super().release(connection)
+
+
+class InstrumentedRedis(redis.Redis):
+    """Клиент Redis с замером латентности каждой команды."""
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        start = time.perf_counter()
+        failed = False
+        try:
+            return await super().execute_command(*args, **options)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            redis_stats.observe_query(time.perf_counter() - start, failed=failed)
+
+
+# MongoDB (PyMongo monitoring)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Латентность команд MongoDB."""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        mongo_stats.observe_query(event.duration_micros / 1_000_000)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        mongo_stats.observe_query(event.duration_micros / 1_000_000, failed=True)
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Ожидание и занятость соединений пула MongoDB."""
+
+    def pool_created(self, event: Any) -> None:
+        pass
+
+    def pool_ready(self, event: Any) -> None:
+        pass
+
+    def pool_cleared(self, event: Any) -> None:
+        pass
+
+    def pool_closed(self, event: Any) -> None:
+        pass
+
+    def connection_created(self, event: Any) -> None:
+        pass
+
+    def connection_ready(self, event: Any) -> None:
+        pass
+
+    def connection_closed(self, event: Any) -> None:
+        pass
+
+    def connection_check_out_started(self, event: Any) -> None:
+        pass
+
+    def connection_check_out_failed(self, event: Any) -> None:
+        mongo_stats.observe_checkout_failure()
+
+    def connection_checked_out(self, event: Any) -> None:
+        # duration есть в событии начиная с PyMongo 4.7
+        mongo_stats.observe_checkout(getattr(event, "duration", 0.0) or 0.0)
+
+    def connection_checked_in(self, event: Any) -> None:
+        mongo_stats.observe_checkin()
+
+
+def mongo_event_listeners() -> List[Any]:
+    """Слушатели для передачи в AsyncIOMotorClient(event_listeners=...)."""
+    return [MongoCommandListener(), MongoPoolListener()]
@@ -1,14 +1,57 @@
-import asyncio
-import traceback
+import hashlib
+import logging
 from datetime import timedelta
 from typing import Any, Dict, List, Mapping, Sequence
 
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo.errors import DuplicateKeyError
 
 from app.core.config import settings
 from app.core.utils import msk_now
+from app.db.instrumentation import mongo_event_listeners
 from app.schemas.packages import DeliveryStatsOut, PackageAdvanced
 
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def write_concern_w() -> int | str:
+    """MONGO_WRITE_CONCERN: число узлов или тег вроде "majority"."""
+    w = settings.MONGO_WRITE_CONCERN
+    return int(w) if w.isdigit() else w
+
+
+def package_document(package: PackageAdvanced) -> Dict[str, Any]:
+    """
+    Документ посылки с детерминированным _id: повторная вставка после
+    сбоя даёт duplicate key, а не второй документ.
+    """
+    doc: Dict[str, Any] = package.model_dump()
+    doc["_id"] = (
+        package.idempotency_key
+        or hashlib.sha256(package.model_dump_json().encode()).hexdigest()
+    )
+    return doc
+
+
+def failed_indexes(details: Mapping[str, Any], count: int) -> List[int]:
+    """
+    Индексы документов из BulkWriteError.details, которые нужно повторить.
+    Duplicate key — документ уже записан прошлой попыткой. При ошибке
+    write concern повторяются все, кроме дублей: _id делает это безопасным.
+    """
+    duplicates = set()
+    failed = set()
+    for error in details.get("writeErrors", []):
+        if error.get("code") == DUPLICATE_KEY_ERROR:
+            duplicates.add(error["index"])
+        else:
+            failed.add(error["index"])
+    if details.get("writeConcernErrors"):
+        failed = set(range(count)) - duplicates
+    return sorted(failed)
+
 
 class MongoService:
     MAX_CACHE_DAYS = 7
@@ -16,15 +59,26 @@ class MongoService:
     def __init__(
         self, uri: str = settings.MONGO_URL, db_name: str = "delivery_results"
     ):
-        self.client: AsyncIOMotorClient = AsyncIOMotorClient(uri)
+        self.client: AsyncIOMotorClient = AsyncIOMotorClient(
+            uri,
+            maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+            serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            w=write_concern_w(),
+            journal=settings.MONGO_WRITE_JOURNAL,
+            wTimeoutMS=settings.MONGO_WRITE_TIMEOUT_MS,
+            event_listeners=mongo_event_listeners(),
+        )
         self.db = self.client[db_name]
         self._daily_collections_cache: Dict[
             str, AsyncIOMotorCollection[Dict[str, Any]]
         ] = {}
         self._indexes_created: set[str] = set()
-
-        # Лениво создаём индексы для сегодняшней коллекции
-        asyncio.create_task(self._init_today_indexes())
+        # Индексы сегодняшней коллекции создаёт get_mongo_service():
+        # конструктор не должен требовать запущенный event loop
 
     async def _init_today_indexes(self):
         """Создаёт индексы для сегодняшней коллекции при старте приложения."""
@@ -42,8 +96,9 @@ class MongoService:
             await collection.create_index("created_at")
             self._indexes_created.add(collection.name)
         except Exception:
-            print(f"Error creating indexes for collection {collection.name}:")
-            traceback.print_exc()
+            logger.exception(
+                "Error creating indexes for collection %s", collection.name
+            )
 
     def _cleanup_cache(self):
         """Удаляет коллекции из кэша старше MAX_CACHE_DAYS: 7 дней."""
@@ -79,12 +134,13 @@ class MongoService:
     async def save_package(self, package: PackageAdvanced) -> None:
         """Сохраняет данные о посылке в коллекцию за текущий день."""
         try:
-            doc: Dict[str, Any] = package.model_dump()
+            doc = package_document(package)
             collection = await self.get_daily_collection()
             await collection.insert_one(doc)
+        except DuplicateKeyError:
+            logger.debug("Package %s already saved to MongoDB", doc["_id"])
         except Exception:
-            print("Error saving package to MongoDB:")
-            traceback.print_exc()
+            logger.exception("Error saving package to MongoDB")
 
     async def get_delivery_stats(
         self, date: str | None = None
@@ -122,3 +178,11 @@ async def get_mongo_service() -> MongoService:
         _mongo_service = MongoService()
         await _mongo_service._init_today_indexes()
     return _mongo_service
+
+
+def close_mongo_service() -> None:
+    """Закрывает клиент Mongo (при остановке процесса)."""
+    global _mongo_service
+    if _mongo_service is not None:
+        _mongo_service.client.close()
+        _mongo_service = None
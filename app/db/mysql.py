@@ -4,13 +4,30 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.db.instrumentation import (
+    InstrumentedAsyncQueuePool,
+    instrument_sqlalchemy_engine,
+)
 
 DATABASE_URL = (
     f"mysql+aiomysql://{settings.MYSQL_USER}:{settings.MYSQL_PASSWORD}"
     f"@{settings.MYSQL_HOST}:{settings.MYSQL_PORT}/{settings.MYSQL_DB}?charset=utf8mb4"
 )
 
-engine = create_async_engine(DATABASE_URL, echo=True, future=True)
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=settings.MYSQL_ECHO,
+    future=True,
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_size=settings.MYSQL_POOL_SIZE,
+    max_overflow=settings.MYSQL_MAX_OVERFLOW,
+    pool_timeout=settings.MYSQL_POOL_TIMEOUT,
+    pool_recycle=settings.MYSQL_POOL_RECYCLE,
+    pool_pre_ping=settings.MYSQL_POOL_PRE_PING,
+    # кэш скомпилированных SQL-выражений SQLAlchemy
+    query_cache_size=settings.MYSQL_STATEMENT_CACHE_SIZE,
+)
+instrument_sqlalchemy_engine(engine.sync_engine)
 
 async_session: Callable[[], AsyncSession] = sessionmaker(
     bind=engine,
@@ -0,0 +1,422 @@
+"""
+Обслуживание месячных секций таблицы packages.
+
+    python -m app.db.partitions status
+    python -m app.db.partitions migrate
+    python -m app.db.partitions maintain [--ahead N] [--retention N] [--drop]
+    python -m app.db.partitions maintain --every-hours 24
+
+migrate — переход базы, созданной до секционирования (init.sql выполняется
+только на пустом томе): снимает внешний ключ, переводит created_at и
+updated_at в DATETIME NOT NULL, расширяет первичный и уникальный ключи
+на created_at и секционирует таблицу с единственной секцией pmax, после
+чего выполняет maintain. Таблица перестраивается целиком — запускать при
+остановленных воркерах. Уже выполненные шаги пропускаются.
+
+maintain:
+  * создаёт секции на текущий и PARTITION_MONTHS_AHEAD следующих месяцев,
+    отщепляя их от хвостовой секции pmax (REORGANIZE PARTITION). Обычно
+    pmax пуста и строки не копируются. Если обслуживание пропускалось или
+    таблицу только что секционировали, строки в pmax есть: секции
+    создаются начиная с месяца самой старой из них (каждый месяц в своей
+    секции), и REORGANIZE один раз копирует эти строки;
+  * секции старше PARTITION_RETENTION_MONTHS переносит в таблицы
+    packages_archive_YYYYMM через EXCHANGE PARTITION — обмен метаданными,
+    без построчного DELETE — и удаляет опустевшую секцию. С --drop
+    (или PARTITION_ARCHIVE=False) секция удаляется вместе с данными.
+
+Кроме копирования непустой pmax, операции держат блокировку метаданных
+доли секунды; одновременно работает только один экземпляр (GET_LOCK).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from datetime import date, datetime
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.core.utils import msk_now
+from app.db.mysql import engine
+
+logger = logging.getLogger(__name__)
+
+TABLE = "packages"
+ARCHIVE_PREFIX = "packages_archive_"
+TAIL_PARTITION = "pmax"
+MAINTENANCE_LOCK = "packages_partition_maintenance"
+
+
+class Partition(NamedTuple):
+    name: str
+    # верхняя граница (не включительно); None — хвостовая MAXVALUE
+    upper: Optional[date]
+    rows: int
+
+
+def add_months(month: date, months: int) -> date:
+    """Первое число месяца, отстоящего от month на months."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+
+def _parse_upper(description: str) -> Optional[date]:
+    if description == "MAXVALUE":
+        return None
+    return datetime.fromisoformat(description.strip("'")).date()
+
+
+async def list_partitions(conn: AsyncConnection) -> List[Partition]:
+    # TABLE_ROWS — оценка InnoDB, для отчёта её достаточно
+    result = await conn.execute(
+        text(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS "
+            "FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        ),
+        {"table": TABLE},
+    )
+    return [
+        Partition(name, _parse_upper(description), rows or 0)
+        for name, description, rows in result
+        if name is not None
+    ]
+
+
+def months_to_create(
+    partitions: List[Partition],
+    today: date,
+    ahead: int,
+    oldest: Optional[date] = None,
+) -> List[date]:
+    """
+    Месяцы без своей секции до today + ahead включительно. Новые границы
+    могут только продолжать существующие, поэтому отсчёт идёт от границы
+    последней секции — месяцы, пропущенные при простое обслуживания, тоже
+    создаются. oldest — самая ранняя строка в pmax: её месяц получает
+    свою секцию, а не попадает в секцию текущего месяца.
+    """
+    bounds = [p.upper for p in partitions if p.upper is not None]
+    current = date(today.year, today.month, 1)
+    start = max(bounds) if bounds else current
+    if oldest is not None:
+        start = min(start, date(oldest.year, oldest.month, 1))
+    end = add_months(current, ahead)
+    months = []
+    month = start
+    while month <= end:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def expired_partitions(
+    partitions: List[Partition], today: date, retention: int
+) -> List[Partition]:
+    """Секции, целиком лежащие раньше начала окна хранения."""
+    cutoff = add_months(date(today.year, today.month, 1), -retention)
+    return [p for p in partitions if p.upper is not None and p.upper <= cutoff]
+
+
+async def create_partitions(conn: AsyncConnection, months: List[date]) -> None:
+    definitions = ", ".join(
+        f"PARTITION {partition_name(m)} "
+        f"VALUES LESS THAN ('{add_months(m, 1).isoformat()}')"
+        for m in months
+    )
+    await conn.execute(
+        text(
+            f"ALTER TABLE {TABLE} REORGANIZE PARTITION {TAIL_PARTITION} INTO "
+            f"({definitions}, "
+            f"PARTITION {TAIL_PARTITION} VALUES LESS THAN (MAXVALUE))"
+        )
+    )
+    logger.info("Created partitions: %s", ", ".join(map(partition_name, months)))
+
+
+async def oldest_in_tail(conn: AsyncConnection) -> Optional[date]:
+    """Дата самой ранней строки в pmax (None, если pmax пуста)."""
+    result = await conn.execute(
+        text(f"SELECT MIN(created_at) FROM {TABLE} PARTITION ({TAIL_PARTITION})")
+    )
+    oldest = result.scalar()
+    return oldest.date() if oldest is not None else None
+
+
+async def _is_empty(conn: AsyncConnection, table: str, partition: str = "") -> bool:
+    selector = f" PARTITION ({partition})" if partition else ""
+    result = await conn.execute(text(f"SELECT 1 FROM {table}{selector} LIMIT 1"))
+    return result.first() is None
+
+
+async def archive_partition(conn: AsyncConnection, partition: Partition) -> None:
+    """
+    Переносит секцию в packages_archive_YYYYMM и удаляет её.
+    Повторный запуск после сбоя безопасен: пустая секция просто удаляется.
+    """
+    archive = ARCHIVE_PREFIX + partition.name[1:]
+    if not await _is_empty(conn, TABLE, partition.name):
+        await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {archive} LIKE {TABLE}"))
+        result = await conn.execute(
+            text(
+                "SELECT CREATE_OPTIONS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+            ),
+            {"table": archive},
+        )
+        if "partitioned" in (result.scalar() or ""):
+            await conn.execute(text(f"ALTER TABLE {archive} REMOVE PARTITIONING"))
+        if not await _is_empty(conn, archive):
+            raise RuntimeError(f"Archive table {archive} is not empty")
+        await conn.execute(
+            text(
+                f"ALTER TABLE {TABLE} EXCHANGE PARTITION {partition.name} "
+                f"WITH TABLE {archive}"
+            )
+        )
+        logger.info("Partition %s moved to %s", partition.name, archive)
+    await drop_partition(conn, partition)
+
+
+async def drop_partition(conn: AsyncConnection, partition: Partition) -> None:
+    await conn.execute(text(f"ALTER TABLE {TABLE} DROP PARTITION {partition.name}"))
+    logger.info("Partition %s dropped", partition.name)
+
+
+async def maintain(
+    ahead: int = settings.PARTITION_MONTHS_AHEAD,
+    retention: int = settings.PARTITION_RETENTION_MONTHS,
+    archive: bool = settings.PARTITION_ARCHIVE,
+) -> None:
+    today = msk_now().date()
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text("SELECT GET_LOCK(:name, 0)"), {"name": MAINTENANCE_LOCK}
+        )
+        if not result.scalar():
+            logger.info("Partition maintenance is already running elsewhere")
+            return
+        try:
+            partitions = await list_partitions(conn)
+            if not partitions:
+                raise RuntimeError(
+                    f"Table {TABLE} is not partitioned, "
+                    "run `python -m app.db.partitions migrate` first"
+                )
+            oldest = await oldest_in_tail(conn)
+            months = months_to_create(partitions, today, ahead, oldest)
+            if months:
+                await create_partitions(conn, months)
+            for partition in expired_partitions(partitions, today, retention):
+                if archive:
+                    await archive_partition(conn, partition)
+                else:
+                    await drop_partition(conn, partition)
+        finally:
+            await conn.execute(
+                text("SELECT RELEASE_LOCK(:name)"), {"name": MAINTENANCE_LOCK}
+            )
+
+
+class Column(NamedTuple):
+    data_type: str
+    nullable: bool
+
+
+# Столбец -> определение в целевой схеме (docker/mysql-init/init.sql)
+TIMESTAMP_COLUMNS = {
+    "created_at": "DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP",
+    "updated_at": (
+        "DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"
+    ),
+}
+# Ключ -> (столбцы, определение)
+TARGET_KEYS = {
+    "PRIMARY": (["id", "created_at"], "PRIMARY KEY (id, created_at)"),
+    "uq_packages_idempotency_key": (
+        ["idempotency_key", "created_at"],
+        "UNIQUE KEY uq_packages_idempotency_key (idempotency_key, created_at)",
+    ),
+    "idx_session_id": (
+        ["session_id", "created_at"],
+        "INDEX idx_session_id (session_id, created_at)",
+    ),
+}
+
+
+def migration_clauses(
+    columns: Dict[str, Column], indexes: Dict[str, List[str]]
+) -> List[str]:
+    """Части ALTER TABLE, приводящие packages к секционируемой схеме."""
+    clauses = []
+    if "idempotency_key" not in columns:
+        clauses.append("ADD COLUMN idempotency_key CHAR(64) NULL AFTER session_id")
+    for name, definition in TIMESTAMP_COLUMNS.items():
+        column = columns[name]
+        if column.data_type != "datetime" or column.nullable:
+            clauses.append(f"MODIFY {name} {definition}")
+    for name, (key_columns, definition) in TARGET_KEYS.items():
+        if indexes.get(name) == key_columns:
+            continue
+        if name in indexes:
+            clauses.append(
+                "DROP PRIMARY KEY" if name == "PRIMARY" else f"DROP INDEX {name}"
+            )
+        clauses.append(f"ADD {definition}")
+    # индекс внешнего ключа уходит вместе с ним
+    if not any(cols[0] == "type_id" for cols in indexes.values()):
+        clauses.append("ADD INDEX idx_type_id (type_id)")
+    return clauses
+
+
+async def _columns(conn: AsyncConnection) -> Dict[str, Column]:
+    result = await conn.execute(
+        text(
+            "SELECT COLUMN_NAME, DATA_TYPE, IS_NULLABLE "
+            "FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+        ),
+        {"table": TABLE},
+    )
+    return {
+        name: Column(data_type.lower(), nullable == "YES")
+        for name, data_type, nullable in result
+    }
+
+
+async def _indexes(conn: AsyncConnection) -> Dict[str, List[str]]:
+    result = await conn.execute(
+        text(
+            "SELECT INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+            "ORDER BY INDEX_NAME, SEQ_IN_INDEX"
+        ),
+        {"table": TABLE},
+    )
+    indexes: Dict[str, List[str]] = {}
+    for name, column in result:
+        indexes.setdefault(name, []).append(column)
+    return indexes
+
+
+async def migrate() -> None:
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text(
+                "SELECT CONSTRAINT_NAME "
+                "FROM information_schema.REFERENTIAL_CONSTRAINTS "
+                "WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+            ),
+            {"table": TABLE},
+        )
+        # секционированные таблицы InnoDB не поддерживают внешние ключи
+        for (constraint,) in result.all():
+            await conn.execute(
+                text(f"ALTER TABLE {TABLE} DROP FOREIGN KEY {constraint}")
+            )
+            logger.info("Foreign key %s dropped", constraint)
+
+        columns = await _columns(conn)
+        for name in TIMESTAMP_COLUMNS:
+            if columns[name].nullable:
+                await conn.execute(
+                    text(
+                        f"UPDATE {TABLE} SET {name} = CURRENT_TIMESTAMP "
+                        f"WHERE {name} IS NULL"
+                    )
+                )
+        clauses = migration_clauses(columns, await _indexes(conn))
+        if clauses:
+            await conn.execute(text(f"ALTER TABLE {TABLE} " + ", ".join(clauses)))
+            logger.info("Table %s altered: %s", TABLE, "; ".join(clauses))
+
+        if not await list_partitions(conn):
+            await conn.execute(
+                text(
+                    f"ALTER TABLE {TABLE} PARTITION BY RANGE COLUMNS (created_at) "
+                    f"(PARTITION {TAIL_PARTITION} VALUES LESS THAN (MAXVALUE))"
+                )
+            )
+            logger.info("Table %s partitioned", TABLE)
+        await conn.commit()
+
+
+async def status() -> None:
+    async with engine.connect() as conn:
+        for partition in await list_partitions(conn):
+            print(
+                json.dumps(
+                    {
+                        "partition": partition.name,
+                        "upper": partition.upper and partition.upper.isoformat(),
+                        "rows": partition.rows,
+                    }
+                )
+            )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="packages partition maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="секции и оценка числа строк (JSON lines)")
+    sub.add_parser(
+        "migrate", help="секционировать таблицу, созданную до секционирования"
+    )
+    maintain_parser = sub.add_parser(
+        "maintain", help="создать будущие секции, архивировать старые"
+    )
+    maintain_parser.add_argument(
+        "--ahead", type=int, default=settings.PARTITION_MONTHS_AHEAD
+    )
+    maintain_parser.add_argument(
+        "--retention", type=int, default=settings.PARTITION_RETENTION_MONTHS
+    )
+    maintain_parser.add_argument(
+        "--drop",
+        action="store_true",
+        default=not settings.PARTITION_ARCHIVE,
+        help="удалять старые секции без архива",
+    )
+    maintain_parser.add_argument(
+        "--every-hours",
+        type=float,
+        default=None,
+        help="повторять по расписанию вместо однократного запуска",
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+    try:
+        if args.command == "status":
+            await status()
+            return
+        if args.command == "migrate":
+            await migrate()
+            await maintain()
+            return
+        while True:
+            try:
+                await maintain(args.ahead, args.retention, not args.drop)
+            except Exception:
+                if args.every_hours is None:
+                    raise
+                logger.exception("Partition maintenance failed")
+            if args.every_hours is None:
+                return
+            await asyncio.sleep(args.every_hours * 3600)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,5 +1,13 @@
-import redis.asyncio as redis
-
 from app.core.config import settings
+from app.db.instrumentation import InstrumentedBlockingConnectionPool, InstrumentedRedis
+
+redis_pool = InstrumentedBlockingConnectionPool.from_url(
+    f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}",
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+    health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+)
 
-redis_client = redis.from_url(f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}")
+redis_client = InstrumentedRedis(connection_pool=redis_pool)
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.mongo import MongoService
+from app.db.mysql import engine
+from app.db.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+async def _concurrently(n: int, ping: Callable[[], Awaitable[object]]) -> None:
+    # Одновременные запросы заставляют пул открыть n соединений
+    await asyncio.gather(*(ping() for _ in range(n)))
+
+
+async def warm_mysql(n: int = settings.WARMUP_MYSQL_CONNECTIONS) -> None:
+    async def ping() -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await _concurrently(n, ping)
+
+
+async def warm_redis(n: int = settings.WARMUP_REDIS_CONNECTIONS) -> None:
+    await _concurrently(n, redis_client.ping)
+
+
+async def warm_mongo(
+    mongo: MongoService, n: int = settings.WARMUP_MONGO_CONNECTIONS
+) -> None:
+    await _concurrently(n, lambda: mongo.client.admin.command("ping"))
+
+
+async def warm_pools(mongo: MongoService) -> Dict[str, float]:
+    """
+    Открывает соединения пулов MySQL, Redis и Mongo параллельно,
+    чтобы первые запросы не платили за установку соединений.
+    Возвращает длительность прогрева по хранилищам; ошибки логируются
+    и не мешают старту — пулы досоздадут соединения по требованию.
+    """
+    tasks = {
+        "mysql": warm_mysql(),
+        "redis": warm_redis(),
+        "mongo": warm_mongo(mongo),
+    }
+
+    async def timed(name: str, coro: Awaitable[None]) -> float:
+        start = time.perf_counter()
+        try:
+            await coro
+        except Exception as e:
+            logger.warning("Pool warm-up failed for %s: %s", name, e)
+        return time.perf_counter() - start
+
+    durations = await asyncio.gather(
+        *(timed(name, coro) for name, coro in tasks.items())
+    )
+    result = dict(zip(tasks, durations))
+    logger.info(
+        "Pools warmed up: %s",
+        ", ".join(
+            f"{name}={duration * 1000:.0f}ms" for name, duration in result.items()
+        ),
+    )
+    return result
@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -5,25 +6,45 @@ from fastapi_pagination import add_pagination
 
 from app.api import api_router
 from app.core.exceptions import register_exception_handlers
-from app.core.logging import LoggingMiddleware
-from app.workers.producer import Producer
-
-producer = Producer()
+from app.core.logging import LoggingMiddleware, setup_logging, shutdown_logging
+from app.core.metrics import MetricsMiddleware, mark_process_dead, metrics_endpoint
+from app.db.mongo import close_mongo_service, get_mongo_service
+from app.db.mysql import engine
+from app.db.redis import redis_pool
+from app.services.health import connect_broker, readiness, warm_up
+from app.workers.producer import producer
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: подключаемся к RabbitMQ
-    await producer.connect()
+    # Startup: логирование через очередь. Клиенты создаются здесь, в процессе
+    # воркера uvicorn; пулы и кэши прогреваются до приёма трафика (/ready)
+    setup_logging()
+    mongo = await get_mongo_service()
+    connected, readiness.startup = await asyncio.gather(
+        connect_broker(producer), warm_up(mongo)
+    )
+    readiness.startup["rabbitmq"] = connected
+    await readiness.recheck(mongo, producer)
     yield
-    # Shutdown: отключаемся от RabbitMQ
+    # Shutdown: /ready сразу отвечает 503, отключаемся от RabbitMQ, закрываем пулы
+    readiness.shutting_down = True
     await producer.disconnect()
+    close_mongo_service()
+    await redis_pool.disconnect()
+    await engine.dispose()
+    mark_process_dead()
+    shutdown_logging()
 
 
 app = FastAPI(title="Delivery Service", version="1.0.0", lifespan=lifespan)
 
 # Подключаем middleware
 app.add_middleware(LoggingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+# Метрики Prometheus
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
 
 # Подключаем API роутеры
 app.include_router(api_router)
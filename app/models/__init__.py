@@ -1,4 +1,5 @@
+from app.models.outbox import PackageOutbox
 from app.models.packages import Package
 from app.models.types import Type
 
-__all__ = ["Package", "Type"]
+__all__ = ["Package", "PackageOutbox", "Type"]
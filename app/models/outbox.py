@@ -0,0 +1,16 @@
+from sqlalchemy import BigInteger, Column, DateTime
+from sqlalchemy.dialects.mysql import MEDIUMBLOB
+
+from app.core.utils import msk_now
+from app.models.base import Base
+
+
+class PackageOutbox(Base):
+    __tablename__ = "packages_outbox"
+
+    # порядковый номер пачки:
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    # посылки пачки, записанные в packages той же транзакцией (JSON-массив):
+    payload = Column(MEDIUMBLOB, nullable=False)
+    # дата и время записи пачки:
+    created_at = Column(DateTime(timezone=True), default=msk_now, nullable=False)
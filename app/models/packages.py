@@ -1,4 +1,13 @@
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, Numeric, String
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    Numeric,
+    String,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 
 from app.core.utils import msk_now
@@ -7,25 +16,37 @@ from app.models.base import Base
 
 class Package(Base):
     __tablename__ = "packages"
+    # Таблица секционирована по месяцам created_at (см. app.db.partitions):
+    # created_at входит в первичный и уникальный ключи
+    __table_args__ = (
+        UniqueConstraint(
+            "idempotency_key", "created_at", name="uq_packages_idempotency_key"
+        ),
+    )
 
     # уникальный идентификатор посылки:
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
     # уникальный идентификатор сессии:
     session_id = Column(String(36), nullable=False, index=True)
+    # ключ идемпотентности регистрации (повторы и передоставки не дублируют строку):
+    idempotency_key = Column(String(64), nullable=True)
     # наименование посылки:
     name = Column(String(255), nullable=False)
     # вес посылки в килограммах:
     weight_kg = Column(Numeric(10, 2), nullable=False)
     # стоимость содержимого посылки в USD:
     content_value_usd = Column(Numeric(10, 2), nullable=False)
-    # тип посылки (внешний ключ на таблицу типов):
+    # тип посылки (ссылка на таблицу типов; в БД без FOREIGN KEY —
+    # секционированные таблицы InnoDB их не поддерживают):
     type_id = Column(Integer, ForeignKey("types.id"), nullable=False)
     # наименование типа посылки (для удобства и оптимизации дублируется здесь):
     type_name = Column(String(50), nullable=False)
     # стоимость доставки посылки в RUB:
     delivery_cost_rub = Column(Numeric(10, 2), nullable=True)
-    # дата и время создания записи:
-    created_at = Column(DateTime(timezone=True), default=msk_now, nullable=False)
+    # дата и время регистрации посылки (ключ секционирования):
+    created_at = Column(
+        DateTime(timezone=True), primary_key=True, default=msk_now, nullable=False
+    )
     # дата и время последнего обновления записи:
     updated_at = Column(
         DateTime(timezone=True), default=msk_now, onupdate=msk_now, nullable=False
@@ -3,11 +3,27 @@ from datetime import datetime
 from typing import Optional
 
 from fastapi_filter.contrib.sqlalchemy import Filter
-from pydantic import BaseModel, ConfigDict, Field, NonNegativeFloat, field_validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    NonNegativeFloat,
+    ValidationInfo,
+    field_validator,
+)
+from pydantic.json_schema import SkipJsonSchema
 
 from app.core.utils import msk_now, round_2, round_3
 from app.models.packages import Package
 
+# Контекст валидации для данных, уже округлённых продюсером (формат v2):
+# Model.model_validate(data, context=PRE_ROUNDED) пропускает Decimal-округление
+PRE_ROUNDED = {"pre_rounded": True}
+
+
+def _is_pre_rounded(info: ValidationInfo) -> bool:
+    return bool(info.context and info.context.get("pre_rounded"))
+
 
 class PackageType(enum.IntEnum):
     ОДЕЖДА = 1
@@ -43,12 +59,20 @@ class PackageBase(BaseModel):
 
     @field_validator("weight_kg", mode="before")
     @classmethod
-    def round_to_3_decimals(cls, v: NonNegativeFloat) -> NonNegativeFloat:
+    def round_to_3_decimals(
+        cls, v: NonNegativeFloat, info: ValidationInfo
+    ) -> NonNegativeFloat:
+        if _is_pre_rounded(info):
+            return v
         return round_3(v)
 
     @field_validator("content_value_usd", mode="before")
     @classmethod
-    def round_to_2_decimals(cls, v: NonNegativeFloat) -> NonNegativeFloat:
+    def round_to_2_decimals(
+        cls, v: NonNegativeFloat, info: ValidationInfo
+    ) -> NonNegativeFloat:
+        if _is_pre_rounded(info):
+            return v
         return round_2(v)
 
 
@@ -62,6 +86,11 @@ class PackageIn(PackageBase):
         description="ID пользовательской сессии",
         json_schema_extra={"example": "550e8400-e29b-41d4-a716-446655440000"},
     )
+    idempotency_key: Optional[str] = Field(
+        None,
+        max_length=64,
+        description="Ключ идемпотентности регистрации (sha256, hex)",
+    )
 
 
 class PackageAdvanced(PackageIn):
@@ -86,9 +115,9 @@ class PackageAdvanced(PackageIn):
 
     @field_validator("delivery_cost_rub", mode="before")
     @classmethod
-    def round_delivery_cost(cls, v: Optional[NonNegativeFloat]):
-        if v is None:
-            return None
+    def round_delivery_cost(cls, v: Optional[NonNegativeFloat], info: ValidationInfo):
+        if v is None or _is_pre_rounded(info):
+            return v
         return round_2(v)
 
     model_config = ConfigDict(from_attributes=True)
@@ -102,6 +131,8 @@ class PackageOut(PackageAdvanced):
     id: int = Field(
         ..., description="Уникальный ID посылки", json_schema_extra={"example": 1}
     )
+    # внутренний ключ идемпотентности в ответы не попадает
+    idempotency_key: SkipJsonSchema[Optional[str]] = Field(None, exclude=True)
 
 
 class PackagesFilter(Filter):
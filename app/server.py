@@ -0,0 +1,47 @@
+"""
+Запуск API: несколько процессов uvicorn с uvloop и httptools.
+
+    python -m app.server
+
+Число процессов — API_WORKERS (0 — по числу CPU). Каждый процесс
+поднимает свои клиенты и прогревает пулы в lifespan до приёма трафика.
+"""
+
+import os
+import shutil
+import tempfile
+
+import uvicorn
+
+from app.core.config import settings
+from app.core.metrics import MULTIPROC_DIR_ENV
+
+
+def prepare_multiproc_dir() -> None:
+    """Чистый каталог для метрик процессов — задаётся до их запуска."""
+    path = os.environ.get(MULTIPROC_DIR_ENV) or os.path.join(
+        tempfile.gettempdir(), "prometheus_api"
+    )
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    os.environ[MULTIPROC_DIR_ENV] = path
+
+
+def main() -> None:
+    workers = settings.API_WORKERS or os.cpu_count() or 1
+    if workers > 1:
+        prepare_multiproc_dir()
+    uvicorn.run(
+        "app.main:app",
+        host=settings.API_HOST,
+        port=settings.API_PORT,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        proxy_headers=True,
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import math
+import time
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.metrics import ADMISSION_REJECTED
+from app.db.redis import redis_client
+from app.workers.producer import Producer
+from app.workers.queues import LANE_INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_KEY = "rl:register:{session_id}"
+
+# Token bucket на сессию. Время берём у Redis, чтобы все инстансы API
+# считали одинаково; проверка и списание токена атомарны.
+# Возвращает {allowed, retry_after_ms}.
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(now - ts, 0) * rate / 1000)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+else
+  retry_after = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return {allowed, retry_after}
+"""
+
+token_bucket = redis_client.register_script(TOKEN_BUCKET_LUA)
+
+
+def _reject(status_code: int, reason: str, detail: str, retry_after: float):
+    ADMISSION_REJECTED.labels(reason).inc()
+    return HTTPException(
+        status_code=status_code,
+        detail=detail,
+        headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+    )
+
+
+class AdmissionController:
+    """
+    Контроль допуска регистраций: быстрый 429/503 вместо накопления
+    фоновых публикаций в памяти API.
+
+    - не больше ADMISSION_MAX_IN_FLIGHT публикаций в обработке;
+    - очередь не глубже ADMISSION_MAX_QUEUE_DEPTH (passive declare,
+      кешируется на ADMISSION_QUEUE_CHECK_INTERVAL секунд);
+    - token bucket на сессию в Redis.
+    """
+
+    def __init__(self) -> None:
+        self._slots = asyncio.Semaphore(settings.ADMISSION_MAX_IN_FLIGHT)
+        # глубина очереди по полосам и время последней проверки
+        self._queue_depth: dict[str, int | None] = {}
+        self._depth_checked_at: dict[str, float] = {}
+        self._depth_lock = asyncio.Lock()
+
+    async def admit(
+        self, session_id: str, producer: Producer, lane: str = LANE_INTERACTIVE
+    ) -> None:
+        """
+        Занимает слот публикации или выбрасывает HTTPException 429/503.
+        После успешного admit обязательно вызвать release().
+        """
+        if not settings.ADMISSION_ENABLED:
+            return
+
+        # Слот занимается первым и без ожидания: при занятых слотах —
+        # сразу 503, а не очередь на семафоре
+        if self._slots.locked():
+            raise _reject(
+                503,
+                "in_flight",
+                "Сервис перегружен, повторите позже",
+                settings.ADMISSION_RETRY_AFTER_SEC,
+            )
+        # семафор не заблокирован — acquire() возвращается, не уступая цикл
+        await self._slots.acquire()
+        try:
+            await self._check(session_id, producer, lane)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def _check(self, session_id: str, producer: Producer, lane: str) -> None:
+        """Глубина очереди и token bucket сессии; отказ — HTTPException."""
+        depth = await self._get_queue_depth(producer, lane)
+        if depth is None:
+            raise _reject(
+                503,
+                "broker_unavailable",
+                "Очередь недоступна, повторите позже",
+                settings.ADMISSION_RETRY_AFTER_SEC,
+            )
+        if depth > settings.ADMISSION_MAX_QUEUE_DEPTH:
+            raise _reject(
+                503,
+                "queue_depth",
+                "Очередь переполнена, повторите позже",
+                settings.ADMISSION_RETRY_AFTER_SEC,
+            )
+
+        retry_after_ms = await self._take_token(session_id)
+        if retry_after_ms:
+            raise _reject(
+                429, "rate_limit", "Слишком много запросов", retry_after_ms / 1000
+            )
+
+    def release(self) -> None:
+        if settings.ADMISSION_ENABLED:
+            self._slots.release()
+
+    def _depth_is_fresh(self, lane: str) -> bool:
+        checked_at = self._depth_checked_at.get(lane, 0.0)
+        return time.monotonic() - checked_at < settings.ADMISSION_QUEUE_CHECK_INTERVAL
+
+    async def _get_queue_depth(self, producer: Producer, lane: str) -> int | None:
+        if self._depth_is_fresh(lane):
+            return self._queue_depth[lane]
+        async with self._depth_lock:
+            # Пока ждали лок, глубину мог обновить другой запрос
+            if not self._depth_is_fresh(lane):
+                try:
+                    self._queue_depth[lane] = await producer.get_queue_depth(lane)
+                except Exception as e:
+                    logger.warning("Queue depth check failed (%s): %s", lane, e)
+                    self._queue_depth[lane] = None
+                self._depth_checked_at[lane] = time.monotonic()
+        return self._queue_depth[lane]
+
+    async def _take_token(self, session_id: str) -> int:
+        """Возвращает 0, если токен списан, иначе через сколько мс повторить."""
+        try:
+            allowed, retry_after_ms = await token_bucket(
+                keys=[RATE_LIMIT_KEY.format(session_id=session_id)],
+                args=[settings.RATE_LIMIT_PER_SEC, settings.RATE_LIMIT_BURST],
+            )
+        except Exception as e:
+            # Недоступность Redis не должна ронять регистрацию
+            logger.warning("Rate limit check failed: %s", e)
+            return 0
+        return 0 if allowed else int(retry_after_ms)
+
+
+admission = AdmissionController()
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Sequence
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.mongo import MongoService
+from app.db.mysql import engine
+from app.db.redis import redis_client
+from app.db.warmup import warm_pools
+from app.workers.producer import Producer
+from app.workers.tasks import get_usd_to_rub_rate, load_type_cache
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """
+    Готовность процесса принимать трафик: зависимости отвечают, каталог
+    типов и курс загружены, процесс не останавливается. Если при старте
+    зависимость или кэш были недоступны, /ready повторяет проверку
+    (и загрузку кэшей), пока она не пройдёт.
+    """
+
+    def __init__(self) -> None:
+        self.warmed_up = False
+        self.shutting_down = False
+        self.startup: Dict[str, Any] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.warmed_up and not self.shutting_down
+
+    async def recheck(self, mongo: MongoService, producer: Producer) -> bool:
+        if self.ready or self.shutting_down:
+            return self.ready
+        async with self._lock:
+            if not self.warmed_up:
+                checks = await check_dependencies(mongo, producer)
+                caches: Dict[str, bool] = self.startup.get("caches") or {}
+                if not caches or not all(caches.values()):
+                    caches = await warm_caches()
+                    self.startup["caches"] = caches
+                self.warmed_up = all(check["ok"] for check in checks.values()) and all(
+                    caches.values()
+                )
+        return self.ready
+
+
+readiness = Readiness()
+
+
+async def warm_caches() -> Dict[str, bool]:
+    """Загружает каталог типов и курс USD_RUB в Redis (общий кэш воркеров)."""
+    results: Sequence[Any] = await asyncio.gather(
+        load_type_cache(), get_usd_to_rub_rate(), return_exceptions=True
+    )
+    types_result, rate_result = results
+    for name, result in (("types", types_result), ("rate", rate_result)):
+        if isinstance(result, BaseException):
+            logger.warning("Cache warm-up failed for %s: %s", name, result)
+    return {
+        "types": not isinstance(types_result, BaseException),
+        "rate": rate_result is not None and not isinstance(rate_result, BaseException),
+    }
+
+
+async def connect_broker(producer: Producer) -> bool:
+    """
+    Подключение продюсера при старте. Недоступный RabbitMQ не роняет
+    процесс: /ready отвечает 503 и переподключается при проверке.
+    """
+    try:
+        await producer.connect()
+    except Exception as e:
+        logger.error("RabbitMQ connection failed at startup: %s", e)
+        return False
+    return True
+
+
+async def warm_up(mongo: MongoService) -> Dict[str, Any]:
+    """
+    Стартовая фаза процесса: пулы и кэши прогреваются параллельно.
+    Возвращает длительности и результат для /ready и логов.
+    """
+    start = time.perf_counter()
+    pools, caches = await asyncio.gather(warm_pools(mongo), warm_caches())
+    result = {
+        "pools_ms": {name: round(sec * 1000, 1) for name, sec in pools.items()},
+        "caches": caches,
+        "total_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+    logger.info("Warm-up finished in %.0fms", result["total_ms"])
+    return result
+
+
+async def _timed_check(check: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(check(), settings.HEALTH_CHECK_TIMEOUT_SEC)
+    except Exception as e:
+        return {
+            "ok": False,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "error": repr(e),
+        }
+    return {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+
+async def check_dependencies(
+    mongo: MongoService, producer: Producer
+) -> Dict[str, Dict[str, Any]]:
+    """Один round-trip до каждой зависимости, параллельно, с таймаутом."""
+
+    async def mysql() -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    checks: Dict[str, Callable[[], Awaitable[Any]]] = {
+        "mysql": mysql,
+        "redis": redis_client.ping,
+        "mongo": lambda: mongo.client.admin.command("ping"),
+        "rabbitmq": producer.get_queue_depth,
+    }
+    results = await asyncio.gather(*(_timed_check(c) for c in checks.values()))
+    return dict(zip(checks, results))
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import logging
+from typing import Any, Tuple
+from uuid import uuid4
+
+from app.core.config import settings
+from app.db.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_KEY_PREFIX = "idem:"
+
+
+def client_key_hash(session_id: str, client_key: str) -> str:
+    """
+    Ключ идемпотентности из Idempotency-Key клиента. Сессия входит
+    в хэш, чтобы одинаковые ключи разных клиентов не конфликтовали.
+    """
+    return hashlib.sha256(f"{session_id}:{client_key}".encode()).hexdigest()
+
+
+def resolve_keys(
+    session_id: str, client_key: str | None, payload: Any
+) -> Tuple[str, str, int]:
+    """
+    Возвращает (ключ окна на API, ключ в сообщении, окно в секундах).
+
+    С Idempotency-Key оба ключа совпадают и окно длинное. Без него окно
+    на API строится по содержимому запроса и короткое (ловит повторы по
+    таймауту, но не запрещает зарегистрировать такую же посылку позже),
+    а сообщение получает случайный ключ — от повторной доставки
+    RabbitMQ его всё равно защищает уникальный ключ в packages.
+    """
+    if client_key:
+        key = client_key_hash(session_id, client_key)
+        return key, key, settings.IDEMPOTENCY_WINDOW_SEC
+    content = json.dumps(payload, sort_keys=True, default=str)
+    return (
+        client_key_hash(session_id, content),
+        uuid4().hex,
+        settings.IDEMPOTENCY_DERIVED_WINDOW_SEC,
+    )
+
+
+def item_key(key: str, index: int) -> str:
+    """Ключ посылки внутри массовой регистрации."""
+    return hashlib.sha256(f"{key}:{index}".encode()).hexdigest()
+
+
+async def claim(key: str, window_sec: int) -> bool:
+    """
+    Занимает ключ на window_sec секунд (SET NX).
+    False — запрос с этим ключом уже принят. При недоступности Redis
+    пропускаем запрос: дубль отсечёт воркер.
+    """
+    try:
+        claimed = await redis_client.set(
+            IDEMPOTENCY_KEY_PREFIX + key,
+            1,
+            nx=True,
+            ex=window_sec,
+        )
+    except Exception as e:
+        logger.warning("Idempotency check failed: %s", e)
+        return True
+    return bool(claimed)
+
+
+async def release(key: str) -> None:
+    """Освобождает ключ, если запрос так и не был опубликован."""
+    try:
+        await redis_client.delete(IDEMPOTENCY_KEY_PREFIX + key)
+    except Exception as e:
+        logger.warning("Idempotency key release failed: %s", e)
@@ -0,0 +1,121 @@
+"""
+Адаптивный размер пачки и linger для приёмников воркера.
+
+Размер пачки подбирается по наблюдаемой длительности записи:
+  * растёт, пока стоимость записи одной строки падает;
+  * уменьшается, если запись дольше BATCH_TARGET_FLUSH_MS или падает;
+  * иначе держится, а раз в BATCH_PROBE_EVERY записей пробует вырасти снова.
+Linger подстраивается под поток: ждать пачку имеет смысл, только если
+она наберётся за BATCH_LINGER_MAX_MS, иначе (ночью) пишем сразу.
+"""
+
+import logging
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import BATCH_ADJUSTMENTS, BATCH_LINGER, BATCH_TARGET_SIZE
+
+logger = logging.getLogger(__name__)
+
+GROW_FACTOR = 1.5
+LATENCY_SHRINK_FACTOR = 0.75
+ERROR_SHRINK_FACTOR = 0.5
+# Падение стоимости строки меньше этой доли считаем шумом
+COST_TOLERANCE = 0.05
+# Сглаживание темпа поступления (EWMA)
+RATE_ALPHA = 0.2
+
+
+class AdaptiveBatchController:
+    def __init__(
+        self,
+        sink: str,
+        min_size: int = settings.BATCH_MIN_SIZE,
+        max_size: int = settings.BATCH_MAX_SIZE,
+        target_flush_sec: float = settings.BATCH_TARGET_FLUSH_MS / 1000,
+        linger_min_sec: float = settings.BATCH_LINGER_MIN_MS / 1000,
+        linger_max_sec: float = settings.BATCH_LINGER_MAX_MS / 1000,
+    ):
+        self.sink = sink
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_flush_sec = target_flush_sec
+        self.linger_min_sec = linger_min_sec
+        self.linger_max_sec = linger_max_sec
+        self.batch_size = min_size
+        self.linger_sec = linger_min_sec
+        # поступления в секунду
+        self.arrival_rate = 0.0
+        self._last_cost: Optional[float] = None
+        self._holds = 0
+        self._arrivals = 0
+        self._window_start = time.monotonic()
+        BATCH_TARGET_SIZE.labels(sink).set_function(lambda: self.batch_size)
+        BATCH_LINGER.labels(sink).set_function(lambda: self.linger_sec)
+
+    def record_arrival(self) -> None:
+        self._arrivals += 1
+
+    def _update_rate(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed <= 0:
+            return
+        rate = self._arrivals / elapsed
+        self.arrival_rate += RATE_ALPHA * (rate - self.arrival_rate)
+        self._arrivals = 0
+        self._window_start = now
+
+    def _adjust_linger(self) -> None:
+        """Linger — время набора пачки, если она успевает набраться."""
+        self._update_rate()
+        if self.arrival_rate <= 0:
+            self.linger_sec = self.linger_min_sec
+            return
+        fill_sec = self.batch_size / self.arrival_rate
+        if fill_sec > self.linger_max_sec:
+            self.linger_sec = self.linger_min_sec
+        else:
+            self.linger_sec = max(fill_sec, self.linger_min_sec)
+
+    def _resize(self, factor: float, decision: str) -> None:
+        size = int(self.batch_size * factor)
+        if factor > 1:
+            size = max(size, self.batch_size + 1)
+        size = min(max(size, self.min_size), self.max_size)
+        BATCH_ADJUSTMENTS.labels(self.sink, decision).inc()
+        if size != self.batch_size:
+            logger.debug(
+                "%s batch size %d -> %d (%s)",
+                self.sink,
+                self.batch_size,
+                size,
+                decision,
+            )
+            self.batch_size = size
+
+    def observe(self, size: int, duration_sec: float, ok: bool) -> None:
+        """Итог одной записи пачки: size строк за duration_sec."""
+        if not ok:
+            self._last_cost = None
+            self._resize(ERROR_SHRINK_FACTOR, "error")
+        elif duration_sec > self.target_flush_sec:
+            self._last_cost = None
+            self._resize(LATENCY_SHRINK_FACTOR, "latency")
+        elif size >= self.batch_size:
+            # О выгоде размера судим только по полным пачкам
+            cost = duration_sec / size
+            if self._last_cost is None or cost < self._last_cost * (1 - COST_TOLERANCE):
+                self._holds = 0
+                self._last_cost = cost
+                self._resize(GROW_FACTOR, "grow")
+            else:
+                self._holds += 1
+                self._last_cost = cost
+                BATCH_ADJUSTMENTS.labels(self.sink, "hold").inc()
+                if self._holds >= settings.BATCH_PROBE_EVERY:
+                    # нагрузка могла измениться — пробуем вырасти снова
+                    self._holds = 0
+                    self._last_cost = None
+        self._adjust_linger()
@@ -0,0 +1,93 @@
+import json
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import msgpack
+
+from app.schemas.packages import PackageIn
+
+# Версия формата сообщения передаётся в заголовке AMQP.
+# Сообщения без заголовка считаются JSON (v1) — так писали старые продюсеры.
+SCHEMA_HEADER = "x-schema-id"
+SCHEMA_JSON_V1 = 1
+SCHEMA_MSGPACK_V2 = 2
+# v3: конверт продюсера — msgpack-массив посылок в формате v2
+SCHEMA_ENVELOPE_V3 = 3
+BATCH_SIZE_HEADER = "x-batch-size"
+# Время публикации, мс с эпохи: свойство timestamp AMQP — с точностью до секунды
+PUBLISHED_AT_HEADER = "x-published-at-ms"
+
+CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_MSGPACK = "application/msgpack"
+
+# v2: позиционный массив без имён полей, порядок фиксирован схемой.
+# Новые поля — только в конец: zip() при декодировании отбрасывает
+# лишние значения у старых воркеров и пропускает недостающие у новых.
+PACKAGE_V2_FIELDS = (
+    "name",
+    "weight_kg",
+    "content_value_usd",
+    "type_id",
+    "session_id",
+    "idempotency_key",
+)
+
+
+class UnknownSchemaError(ValueError):
+    """Сообщение в неизвестном формате."""
+
+
+class EncodedMessage(NamedTuple):
+    body: bytes
+    content_type: str
+    headers: Dict[str, Any]
+
+
+def encode_package(package: PackageIn, wire_format: str) -> EncodedMessage:
+    """Кодирует посылку для packages_queue в формате json или msgpack."""
+    if wire_format == "json":
+        return EncodedMessage(
+            package.model_dump_json().encode(),
+            CONTENT_TYPE_JSON,
+            {SCHEMA_HEADER: SCHEMA_JSON_V1},
+        )
+    body = msgpack.packb(
+        [getattr(package, field) for field in PACKAGE_V2_FIELDS], use_bin_type=True
+    )
+    return EncodedMessage(
+        body, CONTENT_TYPE_MSGPACK, {SCHEMA_HEADER: SCHEMA_MSGPACK_V2}
+    )
+
+
+def encode_envelope(packages: Sequence[PackageIn]) -> EncodedMessage:
+    """Кодирует пачку посылок в одно сообщение-конверт (v3)."""
+    body = msgpack.packb(
+        [[getattr(p, field) for field in PACKAGE_V2_FIELDS] for p in packages],
+        use_bin_type=True,
+    )
+    return EncodedMessage(
+        body,
+        CONTENT_TYPE_MSGPACK,
+        {SCHEMA_HEADER: SCHEMA_ENVELOPE_V3, BATCH_SIZE_HEADER: len(packages)},
+    )
+
+
+def decode_packages(
+    body: bytes, headers: Optional[Mapping[str, Any]]
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Декодирует сообщение из packages_queue в список посылок
+    (для конверта — несколько, иначе одна).
+
+    Флаг trusted: для v2/v3 значения уже провалидированы и округлены
+    продюсером, повторное округление не нужно.
+    """
+    schema_id = (headers or {}).get(SCHEMA_HEADER, SCHEMA_JSON_V1)
+    if schema_id == SCHEMA_MSGPACK_V2:
+        values = msgpack.unpackb(body, raw=False)
+        return [dict(zip(PACKAGE_V2_FIELDS, values))], True
+    if schema_id == SCHEMA_ENVELOPE_V3:
+        rows = msgpack.unpackb(body, raw=False)
+        return [dict(zip(PACKAGE_V2_FIELDS, row)) for row in rows], True
+    if schema_id == SCHEMA_JSON_V1:
+        return [json.loads(body)], False
+    raise UnknownSchemaError(f"Unknown message schema id: {schema_id!r}")
@@ -0,0 +1,139 @@
+import hashlib
+import logging
+import math
+from datetime import timedelta
+from typing import Any, Iterable, List, Set
+
+from sqlalchemy import Select, select
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncScalarResult
+
+from app.core.config import settings
+from app.core.utils import msk_now
+from app.db.mysql import async_session
+from app.models.packages import Package
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Bloom-фильтр фиксированного размера: «нет» — точно нет,
+    «да» — с вероятностью ложного срабатывания error_rate.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterable[int]:
+        # Двойное хэширование (Kirsch–Mitzenmacher) из одного blake2b
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key)
+        )
+
+
+class Deduplicator:
+    """
+    Отсекает повторные посылки (ретраи клиента, передоставки RabbitMQ)
+    до записи в MySQL и Mongo.
+
+    Фильтр держит два поколения по DEDUP_FILTER_CAPACITY ключей — память
+    ограничена, старые ключи вытесняются. Отрицательный ответ фильтра
+    окончателен; положительный проверяется по буферу и уникальному ключу
+    packages.idempotency_key.
+    """
+
+    def __init__(
+        self,
+        capacity: int = settings.DEDUP_FILTER_CAPACITY,
+        error_rate: float = settings.DEDUP_FILTER_ERROR_RATE,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous: BloomFilter | None = None
+        # ключи принятых, но ещё не записанных в MySQL посылок
+        self.pending: Set[str] = set()
+
+    def _might_contain(self, key: str) -> bool:
+        return key in self._current or (
+            self._previous is not None and key in self._previous
+        )
+
+    def add(self, key: str) -> None:
+        if self._current.count >= self.capacity:
+            self._previous = self._current
+            self._current = BloomFilter(self.capacity, self.error_rate)
+        self._current.add(key)
+
+    async def is_duplicate(self, key: str) -> bool:
+        """
+        True, если посылка с этим ключом уже записана или ждёт записи.
+        Новый ключ запоминается и считается ждущим записи до flushed().
+        """
+        if self._might_contain(key):
+            if key in self.pending:
+                return True
+            # Ключ занимается до похода в базу: обработчик с тем же ключом,
+            # пришедший во время запроса, увидит его в pending
+            self.pending.add(key)
+            try:
+                exists = await self._exists_in_db(key)
+            except BaseException:
+                self.pending.discard(key)
+                raise
+            if exists:
+                self.pending.discard(key)
+                return True
+            return False
+        self.add(key)
+        self.pending.add(key)
+        return False
+
+    def flushed(self, keys: Iterable[str | None]) -> None:
+        """Посылки записаны в MySQL — дальше дубли ловит уникальный ключ."""
+        self.pending.difference_update(keys)
+
+    @staticmethod
+    async def _exists_in_db(key: str) -> bool:
+        async with async_session() as session:
+            result: Result[Any] = await session.execute(
+                select(Package.id).where(Package.idempotency_key == key).limit(1)
+            )
+            return result.first() is not None
+
+    async def warm_up(self, hours: int = settings.DEDUP_WARMUP_HOURS) -> int:
+        """
+        Загружает ключи за последние hours часов — после рестарта
+        воркера передоставленные сообщения отсекаются фильтром.
+        """
+        since = msk_now() - timedelta(hours=hours)
+        stmt: Select[Any] = (
+            select(Package.idempotency_key)
+            .where(Package.__table__.c.created_at >= since)
+            .where(Package.idempotency_key.is_not(None))
+            .order_by(Package.id.desc())
+            .limit(self.capacity)
+        )
+        async with async_session() as session:
+            result: AsyncScalarResult[Any] = await session.stream_scalars(stmt)
+            keys: List[str] = [key async for key in result]
+        for key in reversed(keys):
+            self.add(key)
+        logger.info("Dedup filter warmed up with %d keys", len(keys))
+        return len(keys)
@@ -0,0 +1,192 @@
+"""
+Просмотр и повторная отправка сообщений из DLQ.
+
+    python -m app.workers.dlq stats
+    python -m app.workers.dlq show --limit 20
+    python -m app.workers.dlq replay [--limit N] [--batch 500]
+
+replay возвращает сообщения в исходные очереди (заголовок x-original-queue)
+пачками: публикации пачки идут параллельно, подтверждения брокера
+собираются вместе, после чего пачка снимается из DLQ одним ack(multiple).
+"""
+
+import argparse
+import asyncio
+import json
+from collections import Counter
+from typing import Any, Dict, List
+
+import aio_pika
+from aio_pika.abc import AbstractChannel, AbstractIncomingMessage
+
+from app.workers.codec import decode_packages
+from app.workers.queues import (
+    DLQ_NAME,
+    ERROR_HEADER,
+    LANE_INTERACTIVE,
+    LANES,
+    ORIGINAL_QUEUE_HEADER,
+    RABBITMQ_URL,
+    RETRY_ATTEMPT_HEADER,
+    RETRY_TIER_HEADER,
+)
+
+# Сколько ждать следующее сообщение, прежде чем считать DLQ пустой
+IDLE_TIMEOUT_SEC = 2.0
+# Сводка stats строится по первым N сообщениям
+STATS_SAMPLE = 10000
+
+
+def header_text(value: Any) -> str:
+    """Значение заголовка AMQP строкой (longstr приходит как bytes)."""
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", "replace")
+    return str(value)
+
+
+def describe(message: AbstractIncomingMessage) -> Dict[str, Any]:
+    headers = message.headers or {}
+    payloads: List[Dict[str, Any]]
+    try:
+        payloads, _ = decode_packages(message.body, headers)
+    except Exception as e:
+        payloads = [{"undecodable": repr(e)}]
+    return {
+        "message_id": message.message_id,
+        "timestamp": message.timestamp,
+        "original_queue": headers.get(ORIGINAL_QUEUE_HEADER),
+        "attempts": headers.get(RETRY_ATTEMPT_HEADER, 0),
+        "error": headers.get(ERROR_HEADER),
+        "packages": payloads,
+    }
+
+
+async def collect(
+    channel: AbstractChannel, limit: int | None
+) -> List[AbstractIncomingMessage]:
+    """Забирает до limit сообщений из DLQ без подтверждения."""
+    queue = await channel.declare_queue(DLQ_NAME, durable=True)
+    total = queue.declaration_result.message_count or 0
+    if limit is not None:
+        total = min(total, limit)
+    messages: List[AbstractIncomingMessage] = []
+    if not total:
+        return messages
+    try:
+        async with queue.iterator(timeout=IDLE_TIMEOUT_SEC) as it:
+            async for message in it:
+                messages.append(message)
+                if len(messages) >= total:
+                    break
+    except asyncio.TimeoutError:
+        pass
+    return messages
+
+
+async def stats(channel: AbstractChannel) -> None:
+    await channel.set_qos(prefetch_count=STATS_SAMPLE)
+    queue = await channel.declare_queue(DLQ_NAME, durable=True)
+    total = queue.declaration_result.message_count or 0
+    messages = await collect(channel, STATS_SAMPLE)
+    by_queue = Counter(
+        header_text((m.headers or {}).get(ORIGINAL_QUEUE_HEADER, "?")) for m in messages
+    )
+    by_error = Counter(
+        header_text((m.headers or {}).get(ERROR_HEADER, "?")).split("(", 1)[0]
+        for m in messages
+    )
+    print(f"{DLQ_NAME}: {total} messages (sampled {len(messages)})")
+    for name, count in by_queue.most_common():
+        print(f"  queue {name}: {count}")
+    for name, count in by_error.most_common():
+        print(f"  error {name}: {count}")
+    # Закрытие канала вернёт неподтверждённые сообщения в DLQ
+
+
+async def show(channel: AbstractChannel, limit: int) -> None:
+    await channel.set_qos(prefetch_count=limit)
+    for message in await collect(channel, limit):
+        print(json.dumps(describe(message), ensure_ascii=False, default=str))
+
+
+async def replay(channel: AbstractChannel, limit: int | None, batch: int) -> int:
+    await channel.set_qos(prefetch_count=batch)
+    queue = await channel.declare_queue(DLQ_NAME, durable=True)
+    total = queue.declaration_result.message_count or 0
+    if limit is not None:
+        total = min(total, limit)
+
+    replayed = 0
+    pending: List[AbstractIncomingMessage] = []
+
+    async def flush() -> None:
+        nonlocal replayed
+        await asyncio.gather(*(republish(channel, m) for m in pending))
+        await pending[-1].ack(multiple=True)
+        replayed += len(pending)
+        pending.clear()
+        print(f"replayed {replayed}/{total}")
+
+    if not total:
+        return 0
+    try:
+        async with queue.iterator(timeout=IDLE_TIMEOUT_SEC) as it:
+            async for message in it:
+                pending.append(message)
+                if len(pending) >= batch or replayed + len(pending) >= total:
+                    await flush()
+                if replayed >= total:
+                    break
+    except asyncio.TimeoutError:
+        pass
+    if pending:
+        await flush()
+    return replayed
+
+
+async def republish(channel: AbstractChannel, message: AbstractIncomingMessage):
+    headers = dict(message.headers or {})
+    original_queue = header_text(
+        headers.pop(ORIGINAL_QUEUE_HEADER, LANES[LANE_INTERACTIVE].queue)
+    )
+    # Возвращённое сообщение снова получает полный набор повторов
+    for header in (ERROR_HEADER, RETRY_ATTEMPT_HEADER, RETRY_TIER_HEADER):
+        headers.pop(header, None)
+    await channel.default_exchange.publish(
+        aio_pika.Message(
+            body=message.body,
+            headers=headers,
+            content_type=message.content_type,
+            message_id=message.message_id,
+            correlation_id=message.correlation_id,
+            timestamp=message.timestamp,
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+        ),
+        routing_key=original_queue,
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Dead-letter queue tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="сводка по исходным очередям и ошибкам")
+    show_parser = sub.add_parser("show", help="вывести сообщения (JSON lines)")
+    show_parser.add_argument("--limit", type=int, default=20)
+    replay_parser = sub.add_parser("replay", help="вернуть в исходные очереди")
+    replay_parser.add_argument("--limit", type=int, default=None)
+    replay_parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    connection = await aio_pika.connect_robust(RABBITMQ_URL)
+    async with connection:
+        channel = await connection.channel()
+        if args.command == "stats":
+            await stats(channel)
+        elif args.command == "show":
+            await show(channel, args.limit)
+        else:
+            await replay(channel, args.limit, args.batch)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
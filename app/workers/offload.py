@@ -0,0 +1,230 @@
+"""
+Вынос CPU-работы воркера в пул процессов (OFFLOAD_PROCESSES > 0).
+
+Обработчики сообщений отдают сырые тела в OffloadStage; стадия собирает
+их в чанки по OFFLOAD_CHUNK_SIZE и отправляет в ProcessPoolExecutor.
+Процесс пула декодирует сообщения, валидирует посылки, считает стоимость
+доставки и возвращает компактные кортежи ROW_FIELDS. Курс и каталог типов
+читаются из Redis в event loop один раз на чанк и передаются в пул, так что
+event loop занят только вводом-выводом.
+
+Передача чанка в пул стоит дороже, чем обработка одного сообщения, поэтому
+event loop разгружается только с чанков от ~16 сообщений (при 64 — CPU
+event loop в ~5 раз меньше); точку перелома показывает
+benchmarks/micro/bench_offload.py. Каждый обработчик ждёт свой результат,
+так что в чанке не больше WORKER_CONCURRENCY сообщений: больший
+OFFLOAD_CHUNK_SIZE урезается до него, иначе чанк никогда не наполнится и
+каждое сообщение ждало бы OFFLOAD_LINGER_MS.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set, Tuple, Union
+
+from app.core.config import settings
+from app.core.utils import round_2
+from app.schemas.packages import PRE_ROUNDED, PackageAdvanced
+from app.workers.codec import SCHEMA_HEADER, decode_packages
+from app.workers.tasks import (
+    delivery_cost,
+    get_type_catalog,
+    get_usd_to_rub_rate,
+    resolve_type,
+)
+
+logger = logging.getLogger(__name__)
+
+# Порядок полей в кортеже строки, который возвращает пул
+ROW_FIELDS = (
+    "name",
+    "weight_kg",
+    "content_value_usd",
+    "type_id",
+    "type_name",
+    "session_id",
+    "delivery_cost_rub",
+    "idempotency_key",
+    "created_at",
+)
+
+Row = Tuple[Any, ...]
+# (тело, x-schema-id, время публикации)
+ChunkItem = Tuple[bytes, Optional[int], Optional[datetime]]
+ChunkResult = Union[List[Row], BaseException]
+
+
+def build_row(
+    payload: Dict[str, Any],
+    trusted: bool,
+    rate: Optional[float],
+    types: Dict[str, str],
+    registered_at: Optional[datetime],
+) -> Row:
+    """То же, что rabbit_worker.build_package, но на готовых курсе и каталоге."""
+    payload["type_id"], payload["type_name"] = resolve_type(
+        payload.get("type_id"), types
+    )
+    cost = None
+    if rate is not None:
+        cost = delivery_cost(
+            payload.get("weight_kg", 0), payload.get("content_value_usd", 0), rate
+        )
+    payload["delivery_cost_rub"] = cost
+    if registered_at is not None:
+        payload["created_at"] = registered_at
+    if trusted:
+        if cost is not None:
+            payload["delivery_cost_rub"] = round_2(cost)
+        package = PackageAdvanced.model_validate(payload, context=PRE_ROUNDED)
+    else:
+        package = PackageAdvanced(**payload)
+    return tuple(getattr(package, field) for field in ROW_FIELDS)
+
+
+def _picklable(error: BaseException) -> BaseException:
+    try:
+        pickle.dumps(error)
+    except Exception:
+        return RuntimeError(repr(error))
+    return error
+
+
+def process_chunk(
+    items: Sequence[ChunkItem], rate: Optional[float], types: Dict[str, str]
+) -> List[ChunkResult]:
+    """
+    Выполняется в процессе пула. Для каждого сообщения — строки его посылок
+    или исключение (тогда сообщение уйдёт на повтор или в DLQ как обычно).
+    """
+    results: List[ChunkResult] = []
+    for body, schema_id, registered_at in items:
+        headers = {SCHEMA_HEADER: schema_id} if schema_id is not None else None
+        try:
+            payloads, trusted = decode_packages(body, headers)
+            results.append(
+                [build_row(p, trusted, rate, types, registered_at) for p in payloads]
+            )
+        except Exception as e:
+            results.append(_picklable(e))
+    return results
+
+
+def to_package(row: Row) -> PackageAdvanced:
+    """Строка пула уже провалидирована — модель собирается без валидации."""
+    return PackageAdvanced.model_construct(**dict(zip(ROW_FIELDS, row)))
+
+
+def _ping() -> None:
+    """Пустая задача: процессы пула стартуют и импортируют модули заранее."""
+
+
+class OffloadStage:
+    def __init__(
+        self,
+        processes: int = settings.OFFLOAD_PROCESSES,
+        chunk_size: int = settings.OFFLOAD_CHUNK_SIZE,
+        linger_sec: float = settings.OFFLOAD_LINGER_MS / 1000,
+        concurrency: int = settings.WORKER_CONCURRENCY,
+    ):
+        self.processes = processes
+        if chunk_size > concurrency:
+            logger.warning(
+                "OFFLOAD_CHUNK_SIZE=%d exceeds WORKER_CONCURRENCY=%d, using %d",
+                chunk_size,
+                concurrency,
+                concurrency,
+            )
+        self.chunk_size = min(chunk_size, concurrency)
+        self.linger_sec = linger_sec
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: List[Tuple[ChunkItem, "asyncio.Future[ChunkResult]"]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # ссылки на задачи чанков: без них задачу может собрать GC
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+    async def start(self) -> None:
+        # forkserver: в процессе воркера уже есть потоки (метрики, логи)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(self._pool, _ping) for _ in range(self.processes))
+        )
+        logger.info(
+            "Offload pool started: %d processes, chunk=%d",
+            self.processes,
+            self.chunk_size,
+        )
+
+    async def process(
+        self,
+        body: bytes,
+        headers: Optional[Mapping[str, Any]],
+        registered_at: Optional[datetime],
+    ) -> List[PackageAdvanced]:
+        """Посылки сообщения; ошибки декодирования и валидации — исключением."""
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[ChunkResult]" = loop.create_future()
+        schema_id = (headers or {}).get(SCHEMA_HEADER)
+        self._pending.append(((body, schema_id, registered_at), future))
+        if len(self._pending) >= self.chunk_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.linger_sec, self._dispatch)
+        result = await future
+        if isinstance(result, BaseException):
+            raise result
+        return [to_package(row) for row in result]
+
+    def _dispatch(self) -> None:
+        """Отправляет в пул всё накопленное, чанками по chunk_size."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            chunk = self._pending[: self.chunk_size]
+            del self._pending[: self.chunk_size]
+            task = asyncio.create_task(self._run(chunk))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(
+        self, chunk: List[Tuple[ChunkItem, "asyncio.Future[ChunkResult]"]]
+    ) -> None:
+        futures = [future for _, future in chunk]
+        try:
+            rate, types = await asyncio.gather(
+                get_usd_to_rub_rate(), get_type_catalog(), return_exceptions=True
+            )
+            # без курса посылки пишутся без стоимости, как в calculate_delivery_cost
+            if isinstance(rate, BaseException):
+                logger.error("USD_RUB rate fetch failed: %s", rate)
+                rate = None
+            if isinstance(types, BaseException):
+                raise types
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._pool, process_chunk, [item for item, _ in chunk], rate, types
+            )
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self) -> None:
+        if self._pending:
+            self._dispatch()
+        # пул закрываем, когда чанки в работе отдали результаты ожидающим
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
+        if self._pool is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._pool.shutdown)
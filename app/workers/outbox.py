@@ -0,0 +1,138 @@
+"""
+Реле transactional outbox: наполняет Mongo из MySQL.
+
+    python -m app.workers.outbox [--batch-rows N] [--poll-sec S]
+
+С OUTBOX_ENABLED воркер делает одну надёжную запись на пачку: строки
+packages и строку packages_outbox с посылками пачки — в одной транзакции.
+Реле забирает строки outbox по порядку id крупными пачками, передаёт
+посылки приёмникам (MongoSink; сюда же добавляются потребители
+статистики и уведомлений) и удаляет строки в той же транзакции.
+
+Строки выбираются через SELECT ... FOR UPDATE SKIP LOCKED — несколько
+реле не берут одни и те же строки. При сбое приёмника транзакция
+откатывается и строки уйдут следующим проходом целиком, поэтому
+приёмники должны быть идемпотентны (у документов Mongo детерминированный
+_id). У приёмников вызывается только write(): буферизацию заменяют
+пачки outbox.
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+import time
+from typing import Any, List, Sequence
+
+from sqlalchemy import delete, select
+from sqlalchemy.engine import Result
+
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.core.metrics import (
+    OUTBOX_RELAY_DURATION,
+    OUTBOX_RELAY_FAILURES,
+    OUTBOX_RELAYED,
+    start_metrics_server,
+)
+from app.db.mongo import close_mongo_service, get_mongo_service
+from app.db.mysql import async_session, engine
+from app.models.outbox import PackageOutbox
+from app.schemas.packages import PackageAdvanced
+from app.workers.sinks import MongoSink, Sink, decode_outbox
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        sinks: Sequence[Sink[PackageAdvanced]],
+        batch_rows: int = settings.OUTBOX_RELAY_BATCH_ROWS,
+        poll_sec: float = settings.OUTBOX_RELAY_POLL_SEC,
+    ):
+        self.sinks = list(sinks)
+        self.batch_rows = batch_rows
+        self.poll_sec = poll_sec
+
+    async def relay_once(self) -> int:
+        """Один проход: до batch_rows строк outbox. Возвращает число строк."""
+        start = time.perf_counter()
+        async with async_session() as session:
+            # без gap-блокировок REPEATABLE READ: пока идёт запись в Mongo,
+            # воркер свободно дописывает новые строки в конец outbox
+            await session.connection(
+                execution_options={"isolation_level": "READ COMMITTED"}
+            )
+            result: Result[Any] = await session.execute(
+                select(PackageOutbox.id, PackageOutbox.payload)
+                .order_by(PackageOutbox.id)
+                .limit(self.batch_rows)
+                .with_for_update(skip_locked=True)
+            )
+            rows = result.all()
+            if not rows:
+                return 0
+            packages: List[PackageAdvanced] = []
+            for row in rows:
+                packages.extend(decode_outbox(row.payload))
+            await asyncio.gather(*(sink.write(packages) for sink in self.sinks))
+            await session.execute(
+                delete(PackageOutbox).where(
+                    PackageOutbox.id.in_([row.id for row in rows])
+                )
+            )
+            await session.commit()
+        OUTBOX_RELAY_DURATION.observe(time.perf_counter() - start)
+        OUTBOX_RELAYED.inc(len(packages))
+        logger.debug("Relayed %d outbox rows (%d packages)", len(rows), len(packages))
+        return len(rows)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Проходы подряд, пока outbox не опустеет; затем пауза poll_sec."""
+        while not stop.is_set():
+            try:
+                relayed = await self.relay_once()
+            except Exception:
+                OUTBOX_RELAY_FAILURES.inc()
+                logger.exception("Outbox relay failed")
+                relayed = 0
+            if relayed < self.batch_rows:
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll_sec)
+                except asyncio.TimeoutError:
+                    pass
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="packages outbox relay")
+    parser.add_argument(
+        "--batch-rows", type=int, default=settings.OUTBOX_RELAY_BATCH_ROWS
+    )
+    parser.add_argument(
+        "--poll-sec", type=float, default=settings.OUTBOX_RELAY_POLL_SEC
+    )
+    parser.add_argument(
+        "--metrics-port", type=int, default=settings.OUTBOX_RELAY_METRICS_PORT
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+    start_metrics_server(args.metrics_port)
+    mongo = await get_mongo_service()
+    relay = OutboxRelay([MongoSink(mongo)], args.batch_rows, args.poll_sec)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    logger.info("Outbox relay started: batch=%d rows", args.batch_rows)
+    try:
+        await relay.run(stop)
+    finally:
+        close_mongo_service()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
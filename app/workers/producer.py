@@ -1,42 +1,130 @@
+import asyncio
 import logging
-from typing import Optional
+import time
+from typing import Dict, List, Optional, Set, Tuple
 
 import aio_pika
 
 from app.core.config import settings
+from app.core.metrics import PUBLISH_DURATION, PUBLISH_FAILURES
+from app.core.utils import msk_now
 from app.schemas.packages import PackageIn
+from app.workers.codec import (
+    PUBLISHED_AT_HEADER,
+    EncodedMessage,
+    encode_envelope,
+    encode_package,
+)
+from app.workers.queues import LANE_INTERACTIVE, LANES, RABBITMQ_URL, Lane
 
 logger = logging.getLogger(__name__)
 
-RABBITMQ_URL = (
-    f"amqp://{settings.RABBIT_USER}:{settings.RABBIT_PASSWORD}@"
-    f"{settings.RABBIT_HOST}:5672/"
-)
-QUEUE_NAME = "packages_queue"
+Pending = List[Tuple[PackageIn, asyncio.Future[None]]]
 
 
 class Producer:
-    def __init__(self):
+    """
+    Публикация посылок в RabbitMQ.
+
+    Каждая полоса (interactive/bulk) публикуется в свою очередь. Если для
+    полосы включён батчинг, посылки копятся до batch_size штук или
+    batch_delay_ms и уходят одним сообщением-конвертом. Каждый вызов
+    send_package_to_queue всё равно завершается только после подтверждения
+    брокером (publisher confirms) того конверта, в который попала посылка.
+    """
+
+    def __init__(self, lanes: Dict[str, Lane] = LANES):
         self.connection: Optional[aio_pika.RobustConnection] = None
         self.channel: Optional[aio_pika.RobustChannel] = None
-        self.queue_name: str = QUEUE_NAME
+        self.lanes = lanes
+        self._pending: Dict[str, Pending] = {lane: [] for lane in lanes}
+        self._flush_timers: Dict[str, asyncio.TimerHandle] = {}
+        self._flush_tasks: Set[asyncio.Task[None]] = set()
+        self._connect_lock = asyncio.Lock()
 
     async def connect(self):
         """Подключение к RabbitMQ и создание канала."""
-        if self.connection is None or self.connection.is_closed:
-            self.connection = await aio_pika.connect_robust(RABBITMQ_URL)
-            self.channel = await self.connection.channel()
-            await self.channel.declare_queue(self.queue_name, durable=True)
-            logger.info("Connected to RabbitMQ")
+        async with self._connect_lock:
+            if self.connection is None or self.connection.is_closed:
+                self.connection = await aio_pika.connect_robust(RABBITMQ_URL)
+                self.channel = await self.connection.channel()
+                for lane in self.lanes.values():
+                    await self.channel.declare_queue(lane.queue, durable=True)
+                logger.info("Connected to RabbitMQ")
 
     async def disconnect(self):
-        """Закрытие соединения."""
+        """Закрытие соединения (с дозаписью накопленной пачки)."""
+        for lane in self.lanes:
+            self._start_flush(lane)
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
         if self.connection and not self.connection.is_closed:
             await self.connection.close()
             logger.info("Disconnected from RabbitMQ")
 
-    async def send_package_to_queue(self, package: PackageIn) -> None:
-        """Отправка посылки в очередь."""
+    async def send_package_to_queue(
+        self, package: PackageIn, lane: str = LANE_INTERACTIVE
+    ) -> None:
+        """Отправка посылки в очередь полосы lane."""
+        config = self.lanes[lane]
+        if not config.batching:
+            await self._publish(
+                encode_package(package, settings.QUEUE_WIRE_FORMAT), config.queue
+            )
+            logger.debug(
+                "Посылка отправлена в очередь: session_id=%s", package.session_id
+            )
+            return
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[None] = loop.create_future()
+        pending = self._pending[lane]
+        pending.append((package, future))
+        if len(pending) >= config.batch_size:
+            self._start_flush(lane)
+        elif lane not in self._flush_timers:
+            self._flush_timers[lane] = loop.call_later(
+                config.batch_delay_ms / 1000, self._start_flush, lane
+            )
+        await future
+
+    async def get_queue_depth(self, lane: str = LANE_INTERACTIVE) -> int:
+        """Количество сообщений в очереди полосы (passive declare)."""
+        if not self.connection or self.connection.is_closed:
+            await self.connect()
+        if self.channel is None:
+            raise RuntimeError("Channel is not initialized after connection")
+        queue = await self.channel.declare_queue(self.lanes[lane].queue, passive=True)
+        return queue.declaration_result.message_count or 0
+
+    def _start_flush(self, lane: str) -> None:
+        """Забирает накопленную пачку полосы и публикует её в фоне."""
+        timer = self._flush_timers.pop(lane, None)
+        if timer is not None:
+            timer.cancel()
+        if not self._pending[lane]:
+            return
+        batch, self._pending[lane] = self._pending[lane], []
+        task = asyncio.create_task(self._flush(batch, self.lanes[lane].queue))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self, batch: Pending, queue_name: str):
+        try:
+            await self._publish(
+                encode_envelope([package for package, _ in batch]), queue_name
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            logger.debug("Пачка из %d посылок отправлена в очередь", len(batch))
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+    async def _publish(self, encoded: EncodedMessage, queue_name: str) -> None:
         if not self.connection or self.connection.is_closed:
             await self.connect()
 
@@ -44,16 +132,31 @@ class Producer:
         if channel is None:
             raise RuntimeError("Channel is not initialized after connection")
 
-        await channel.default_exchange.publish(
-            aio_pika.Message(
-                body=package.model_dump_json().encode(),
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-            ),
-            routing_key=self.queue_name,
-        )
+        start = time.perf_counter()
+        try:
+            await channel.default_exchange.publish(
+                aio_pika.Message(
+                    body=encoded.body,
+                    content_type=encoded.content_type,
+                    headers={
+                        **encoded.headers,
+                        PUBLISHED_AT_HEADER: time.time_ns() // 1_000_000,
+                    },
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                    timestamp=msk_now(),
+                ),
+                routing_key=queue_name,
+            )
+        except Exception:
+            PUBLISH_FAILURES.inc()
+            raise
+        finally:
+            PUBLISH_DURATION.observe(time.perf_counter() - start)
+
 
-        logger.info(f"Посылка отправлена в очередь: session_id={package.session_id}")
+# Один продюсер (и одно соединение с RabbitMQ) на процесс
+producer = Producer()
 
 
 async def get_producer() -> Producer:
-    return Producer()
+    return producer
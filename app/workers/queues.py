@@ -0,0 +1,67 @@
+from typing import Dict, NamedTuple
+
+from app.core.config import settings
+
+# Топология RabbitMQ — общая для продюсера и воркера
+RABBITMQ_URL = (
+    f"amqp://{settings.RABBIT_USER}:{settings.RABBIT_PASSWORD}@"
+    f"{settings.RABBIT_HOST}:5672/"
+)
+
+LANE_INTERACTIVE = "interactive"
+LANE_BULK = "bulk"
+
+
+class Lane(NamedTuple):
+    """
+    Полоса обработки: своя очередь, prefetch и вес у воркера,
+    свои параметры батчинга у продюсера.
+    """
+
+    name: str
+    queue: str
+    prefetch: int
+    weight: int
+    batching: bool
+    batch_size: int
+    batch_delay_ms: float
+
+
+LANES: Dict[str, Lane] = {
+    # Регистрации пользователей: маленькие задержки важнее пропускной способности
+    LANE_INTERACTIVE: Lane(
+        name=LANE_INTERACTIVE,
+        queue="packages_queue",
+        prefetch=settings.LANE_INTERACTIVE_PREFETCH,
+        weight=settings.LANE_INTERACTIVE_WEIGHT,
+        batching=settings.PRODUCER_BATCHING,
+        batch_size=settings.PRODUCER_BATCH_SIZE,
+        batch_delay_ms=settings.PRODUCER_BATCH_DELAY_MS,
+    ),
+    # Массовые импорты: крупные конверты, дренируются в фоне
+    LANE_BULK: Lane(
+        name=LANE_BULK,
+        queue="packages_bulk_queue",
+        prefetch=settings.LANE_BULK_PREFETCH,
+        weight=settings.LANE_BULK_WEIGHT,
+        batching=True,
+        batch_size=settings.LANE_BULK_BATCH_SIZE,
+        batch_delay_ms=settings.LANE_BULK_BATCH_DELAY_MS,
+    ),
+}
+
+# Отложенные повторы: headers-exchange раскладывает сообщение по очереди
+# уровня (x-retry-tier), по истечении TTL очередь уровня возвращает его
+# через default exchange в исходную очередь (routing key сохраняется).
+RETRY_EXCHANGE = "packages.retry"
+RETRY_TIER_HEADER = "x-retry-tier"
+RETRY_ATTEMPT_HEADER = "x-retry-attempt"
+
+# Сообщения, исчерпавшие повторы или заведомо битые
+DLQ_NAME = "packages_dlq"
+ORIGINAL_QUEUE_HEADER = "x-original-queue"
+ERROR_HEADER = "x-error"
+
+
+def retry_queue_name(delay_sec: int) -> str:
+    return f"packages_retry_{delay_sec}s"
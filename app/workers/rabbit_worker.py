@@ -1,185 +1,273 @@
 import asyncio
-import json
-import traceback
-from typing import Any, Dict, List
+import logging
+import signal
+import time
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo
 
 import aio_pika
 from aio_pika import IncomingMessage
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.logging import request_id_var, setup_logging
+from app.core.metrics import (
+    CONSUMER_LAG,
+    DUPLICATES_DROPPED,
+    MESSAGES_CONSUMED,
+    MESSAGES_FAILED,
+    QUEUE_DEPTH,
+    start_metrics_server,
+)
+from app.core.profiling import SlowCallWatch, start_admin_server
+from app.core.utils import round_2
 from app.db.mongo import MongoService, get_mongo_service
-from app.db.mysql import async_session
-from app.models.packages import Package
-from app.schemas.packages import PackageAdvanced
+from app.schemas.packages import PRE_ROUNDED, PackageAdvanced
+from app.services.health import warm_up
+from app.workers.codec import PUBLISHED_AT_HEADER, decode_packages
+from app.workers.dedup import Deduplicator
+from app.workers.offload import OffloadStage
+from app.workers.queues import LANES, RABBITMQ_URL
+from app.workers.retry import RetryPublisher, declare_retry_topology
+from app.workers.scheduler import WeightedLaneScheduler
+from app.workers.sinks import MongoSink, MySQLSink, SinkPipeline
 from app.workers.tasks import calculate_delivery_cost, get_type_name, validate_type_id
 
-RABBITMQ_URL = (
-    f"amqp://{settings.RABBIT_USER}:{settings.RABBIT_PASSWORD}@"
-    f"{settings.RABBIT_HOST}:5672/"
-)
+logger = logging.getLogger(__name__)
 
-QUEUE_NAME = "packages_queue"
 
+# Приёмники посылок (MySQL, Mongo) — будут добавлены в main()
+sinks: SinkPipeline[PackageAdvanced] = SinkPipeline()
 
-# MySQL
-MYSQL_BUFFER_SIZE = 10
-MYSQL_BUFFER_TIMEOUT = 2
-MAX_RETRIES = 5
-message_buffer: List[PackageAdvanced] = []
-buffer_lock = asyncio.Lock()
+# MongoService и RetryPublisher — будут инициализированы в main()
+mongo_service: MongoService | None = None
+retry_publisher: RetryPublisher | None = None
+# Пул процессов для CPU-работы — при OFFLOAD_PROCESSES > 0
+offload: OffloadStage | None = None
 
-# Mongo
-MONGO_BUFFER_SIZE = 10
-MONGO_BUFFER_TIMEOUT = 2
-mongo_buffer: List[PackageAdvanced] = []
-mongo_buffer_lock = asyncio.Lock()
+# Отсекает повторные посылки до записи в MySQL и Mongo
+deduplicator = Deduplicator()
 
-# MongoService — будет инициализирован в main()
-mongo_service: MongoService | None = None
+# Сообщения всех полос попадают сюда, обработчики разбирают их по весам
+scheduler: WeightedLaneScheduler[IncomingMessage] = WeightedLaneScheduler(
+    {name: lane.weight for name, lane in LANES.items()}
+)
+
+
+def published_time(message: IncomingMessage) -> Optional[float]:
+    """Время публикации (сек. с эпохи): заголовок продюсера или timestamp AMQP."""
+    published_ms = (message.headers or {}).get(PUBLISHED_AT_HEADER)
+    if isinstance(published_ms, int):
+        return published_ms / 1000
+    # сообщения старых продюсеров: точность timestamp — секунда
+    if message.timestamp is None:
+        return None
+    published_at = message.timestamp
+    if published_at.tzinfo is None:
+        published_at = published_at.replace(tzinfo=timezone.utc)
+    return published_at.timestamp()
 
 
 async def process_package_message(message: IncomingMessage):
     """
     Обрабатывает сообщение из RabbitMQ.
     Валидирует, рассчитывает стоимость доставки,
-    сохраняет в буферы для MySQL и MongoDB.
+    передаёт посылки в приёмники (MySQL, MongoDB; с OUTBOX_ENABLED —
+    только MySQL).
+
+    Упавшее сообщение уходит на отложенный повтор или в DLQ.
     """
 
+    MESSAGES_CONSUMED.inc()
+    request_id_var.set(message.message_id or message.correlation_id)
+    registered_at: Optional[datetime] = None
+    published_at = published_time(message)
+    if published_at is not None:
+        CONSUMER_LAG.observe(max(time.time() - published_at, 0.0))
+        registered_at = datetime.fromtimestamp(published_at, ZoneInfo(settings.TZ))
+
+    watch = SlowCallWatch(
+        "message",
+        settings.SLOW_REQUEST_THRESHOLD_MS,
+        message_id=message.message_id,
+    )
     try:
-        async with message.process():
-            payload: Dict[str, Any] = json.loads(message.body)
-
-            # Проверяем type_id и получаем type_name
-            type_id = await validate_type_id(payload.get("type_id"))
-            type_name = await get_type_name(type_id)
-            payload["type_id"] = type_id
-            payload["type_name"] = type_name
-
-            # Рассчитываем delivery_cost
-            delivery_cost = await calculate_delivery_cost(
-                payload.get("weight_kg", 0), payload.get("content_value_usd", 0)
-            )
-            payload["delivery_cost_rub"] = delivery_cost
-
-            # Создаём Pydantic-модель
-            package = PackageAdvanced(**payload)
-
-            # Добавляем пакет в Mongo буфер
-            asyncio.create_task(save_package_batch(package))
-
-            # Добавляем в буфер для MySQL
-            async with buffer_lock:
-                message_buffer.append(package)
-                if len(message_buffer) >= MYSQL_BUFFER_SIZE:
-                    await flush_mysql_buffer_locked()
-
-    except Exception:
-        print("Error processing message:")
-        traceback.print_exc()
-
-
-async def flush_mysql_buffer_locked():
-    """Флашит буфер MySQL в базу данных с ретраями."""
-    if not message_buffer:
-        return
-
-    retries = 0
-    while retries < MAX_RETRIES:
-        try:
-            async with async_session() as session:
-                db: AsyncSession = session
+        async with watch:
+            # Сообщение — одна посылка или конверт из нескольких (батч продюсера)
+            if offload is not None:
+                # декодирование, валидация и расчёт — в пуле процессов
+                packages = await offload.process(
+                    message.body, message.headers, registered_at
+                )
+                watch.stage("offload")
+            else:
+                payloads, trusted = decode_packages(message.body, message.headers)
+                watch.stage("decode")
+
+                # Сначала строим все посылки конверта: если одна упадёт,
+                # повтор не задублирует уже буферизованные
                 packages = [
-                    Package(
-                        name=p.name,
-                        weight_kg=p.weight_kg,
-                        content_value_usd=p.content_value_usd,
-                        type_id=p.type_id,
-                        type_name=p.type_name,
-                        session_id=p.session_id,
-                        delivery_cost_rub=p.delivery_cost_rub,
-                    )
-                    for p in message_buffer
+                    await build_package(p, trusted, registered_at) for p in payloads
                 ]
-                db.add_all(packages)
-                await db.commit()
-                print(f"Flushed {len(packages)} packages to MySQL")
-                message_buffer.clear()
-                return
-        except Exception as e:
-            retries += 1
-            wait_time = 2**retries
-            print(f"MySQL flush error (attempt {retries}/{MAX_RETRIES}): {e}")
-            traceback.print_exc()
-            await asyncio.sleep(wait_time)
-
-    print("Failed to flush MySQL buffer after max retries, messages remain in buffer.")
+            for package in packages:
+                key = package.idempotency_key
+                if key is not None and await deduplicator.is_duplicate(key):
+                    DUPLICATES_DROPPED.inc()
+                    logger.info("Duplicate package dropped: key=%s", key)
+                    continue
+                await sinks.put(package)
+            watch.stage("process")
+    except Exception as e:
+        MESSAGES_FAILED.inc()
+        logger.exception("Error processing message")
+        if retry_publisher is None:
+            await message.nack(requeue=True)
+        else:
+            await retry_publisher.handle_failure(message, e)
+        return
 
+    await message.ack()
 
-async def periodic_mysql_flush():
-    """Периодически флашит буфер MySQL по таймауту."""
 
+async def build_package(
+    payload: Dict[str, Any],
+    trusted: bool,
+    registered_at: Optional[datetime] = None,
+) -> PackageAdvanced:
+    """
+    Проверяет тип, рассчитывает стоимость доставки и валидирует посылку.
+    registered_at — время публикации сообщения, становится created_at.
+    """
+    if registered_at is not None:
+        payload["created_at"] = registered_at
+    # Проверяем type_id и получаем type_name
+    type_id = await validate_type_id(payload.get("type_id"))
+    type_name = await get_type_name(type_id)
+    payload["type_id"] = type_id
+    payload["type_name"] = type_name
+
+    # Рассчитываем delivery_cost
+    delivery_cost = await calculate_delivery_cost(
+        payload.get("weight_kg", 0), payload.get("content_value_usd", 0)
+    )
+    payload["delivery_cost_rub"] = delivery_cost
+
+    # Создаём Pydantic-модель. Поля сообщений v2 уже округлены
+    # продюсером — повторное Decimal-округление пропускаем
+    if trusted:
+        if delivery_cost is not None:
+            payload["delivery_cost_rub"] = round_2(delivery_cost)
+        return PackageAdvanced.model_validate(payload, context=PRE_ROUNDED)
+    return PackageAdvanced(**payload)
+
+
+async def poll_queue_depth(channel: aio_pika.abc.AbstractChannel):
+    """Периодически снимает глубину очередей (отставание консьюмера)."""
     while True:
-        await asyncio.sleep(MYSQL_BUFFER_TIMEOUT)
-        async with buffer_lock:
-            await flush_mysql_buffer_locked()
-
-
-async def save_package_batch(package: PackageAdvanced):
-    """Добавляет пакет в буфер Mongo и триггерит батчевую запись."""
-    async with mongo_buffer_lock:
-        mongo_buffer.append(package)
-        if len(mongo_buffer) >= MONGO_BUFFER_SIZE:
-            await flush_mongo_buffer_locked()
-
-
-async def flush_mongo_buffer_locked():
-    """Флашит буфер MongoDB в базу данных."""
-    if not mongo_buffer or mongo_service is None:
-        return
-
-    batch = mongo_buffer.copy()
-    mongo_buffer.clear()
-
-    try:
-        docs = [p.model_dump() for p in batch]
-        collection = await mongo_service.get_daily_collection()
-        await collection.insert_many(docs)
-        print(f"Flushed {len(batch)} packages to MongoDB")
-    except Exception as e:
-        print(f"MongoDB batch save error ({len(batch)} packages): {e}")
-        traceback.print_exc()
-        # При ошибке возвращаем пакеты обратно в буфер
-        async with mongo_buffer_lock:
-            mongo_buffer[:0] = batch  # prepend обратно
+        for lane in LANES.values():
+            try:
+                queue = await channel.declare_queue(lane.queue, passive=True)
+                depth = queue.declaration_result.message_count or 0
+                QUEUE_DEPTH.labels(lane.queue).set(depth)
+            except Exception as e:
+                logger.warning("Queue depth poll error (%s): %s", lane.queue, e)
+        await asyncio.sleep(settings.QUEUE_DEPTH_POLL_INTERVAL)
 
 
-async def periodic_mongo_flush():
-    """Периодически флашит буфер Mongo по таймауту."""
-    while True:
-        await asyncio.sleep(MONGO_BUFFER_TIMEOUT)
-        async with mongo_buffer_lock:
-            await flush_mongo_buffer_locked()
+async def on_lane_message(lane_name: str, message: IncomingMessage):
+    scheduler.submit(lane_name, message)
 
 
-async def main():
+async def consume_lanes(connection: aio_pika.abc.AbstractConnection):
+    """
+    Подписывается на очереди всех полос. У каждой полосы свой канал,
+    чтобы prefetch ограничивал её независимо от остальных.
+    """
+    for name, lane in LANES.items():
+        channel = await connection.channel()
+        await channel.set_qos(prefetch_count=lane.prefetch)
+        queue = await channel.declare_queue(lane.queue, durable=True)
+        await queue.consume(partial(on_lane_message, name))
+        logger.info(
+            "Worker listening on queue '%s' (lane=%s, prefetch=%d, weight=%d)",
+            lane.queue,
+            name,
+            lane.prefetch,
+            lane.weight,
+        )
+
+
+async def shutdown(connection: aio_pika.abc.AbstractConnection):
+    """
+    Останавливает приём сообщений и дописывает буферы. Неподтверждённые
+    сообщения при закрытии соединения вернутся в очередь.
+    """
+    logger.info("Worker shutting down...")
+    await scheduler.stop()
+    await connection.close()
+    if offload is not None:
+        await offload.close()
+    await sinks.close()
+
+
+async def main(
+    metrics_port: int = settings.WORKER_METRICS_PORT,
+    admin_port: int = settings.WORKER_ADMIN_PORT,
+):
     """Основная функция воркера."""
-    global mongo_service
+    global mongo_service, retry_publisher, offload
+    setup_logging()
+    start_metrics_server(metrics_port)
+    if settings.ADMIN_TOKEN:
+        await start_admin_server(admin_port)
     mongo_service = await get_mongo_service()
-
-    print("Connecting to RabbitMQ...")
+    # Пулы, кэши типов/курса и фильтр дублей прогреваются параллельно
+    # до подписки на очереди
+    _, dedup_result = await asyncio.gather(
+        warm_up(mongo_service), deduplicator.warm_up(), return_exceptions=True
+    )
+    if isinstance(dedup_result, BaseException):
+        # Без прогрева дубли всё равно отсечёт уникальный ключ в MySQL
+        logger.error("Dedup filter warm-up failed: %s", dedup_result)
+
+    logger.info("Connecting to RabbitMQ...")
     connection = await aio_pika.connect_robust(RABBITMQ_URL)
-    channel = await connection.channel()
-
-    queue = await channel.declare_queue(QUEUE_NAME, durable=True)
-    await queue.consume(process_package_message)
-    print(f"Worker listening on queue '{QUEUE_NAME}'...")
-
-    # Запускаем периодические флашеры для буферов MySQL и Mongo
-    asyncio.create_task(periodic_mysql_flush())
-    asyncio.create_task(periodic_mongo_flush())
 
-    await asyncio.Future()  # держим воркер живым
+    # Отдельный канал с publisher confirms для повторов и DLQ
+    retry_channel = await connection.channel()
+    retry_exchange = await declare_retry_topology(retry_channel)
+    retry_publisher = RetryPublisher(retry_channel, retry_exchange)
+
+    sinks.add(
+        MySQLSink(
+            on_flushed=lambda batch: deduplicator.flushed(
+                p.idempotency_key for p in batch
+            ),
+            outbox=settings.OUTBOX_ENABLED,
+        )
+    )
+    if not settings.OUTBOX_ENABLED:
+        # в режиме outbox Mongo наполняет реле app.workers.outbox
+        sinks.add(MongoSink(mongo_service))
+    sinks.start()
+
+    if settings.OFFLOAD_PROCESSES > 0:
+        offload = OffloadStage()
+        await offload.start()
+
+    scheduler.start(process_package_message, settings.WORKER_CONCURRENCY)
+    await consume_lanes(connection)
+
+    asyncio.create_task(poll_queue_depth(await connection.channel()))
+
+    # Держим воркер живым до SIGTERM/SIGINT
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    await shutdown(connection)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,127 @@
+import json
+import logging
+from typing import Any, Dict
+
+import aio_pika
+import msgpack
+from aio_pika.abc import AbstractChannel, AbstractExchange, AbstractIncomingMessage
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.core.metrics import MESSAGES_DEAD_LETTERED, MESSAGES_RETRIED
+from app.workers.codec import UnknownSchemaError
+from app.workers.queues import (
+    DLQ_NAME,
+    ERROR_HEADER,
+    ORIGINAL_QUEUE_HEADER,
+    RETRY_ATTEMPT_HEADER,
+    RETRY_EXCHANGE,
+    RETRY_TIER_HEADER,
+    retry_queue_name,
+)
+
+logger = logging.getLogger(__name__)
+
+# Ошибки, которые повтор не исправит: сообщение сразу уходит в DLQ
+PERMANENT_ERRORS = (
+    UnknownSchemaError,
+    ValidationError,
+    json.JSONDecodeError,
+    msgpack.UnpackException,
+    TypeError,
+    KeyError,
+)
+
+ERROR_HEADER_MAX_LEN = 1000
+
+
+async def declare_retry_topology(channel: AbstractChannel) -> AbstractExchange:
+    """Объявляет retry-exchange, очереди уровней задержки и DLQ."""
+    exchange = await channel.declare_exchange(
+        RETRY_EXCHANGE, aio_pika.ExchangeType.HEADERS, durable=True
+    )
+    for tier, delay_sec in enumerate(settings.RETRY_DELAYS_SEC):
+        queue = await channel.declare_queue(
+            retry_queue_name(delay_sec),
+            durable=True,
+            arguments={
+                "x-message-ttl": delay_sec * 1000,
+                # без x-dead-letter-routing-key — вернётся в исходную очередь
+                "x-dead-letter-exchange": "",
+            },
+        )
+        await queue.bind(
+            exchange, arguments={"x-match": "all", RETRY_TIER_HEADER: tier}
+        )
+    await channel.declare_queue(DLQ_NAME, durable=True)
+    return exchange
+
+
+class RetryPublisher:
+    """
+    Перекладывает упавшее сообщение в очередь отложенного повтора
+    (экспоненциальные уровни RETRY_DELAYS_SEC) или в DLQ.
+
+    Исходное сообщение подтверждается только после подтверждения
+    брокером публикации копии, поэтому сбой здесь сообщение не теряет:
+    оно возвращается в очередь.
+    """
+
+    def __init__(self, channel: AbstractChannel, retry_exchange: AbstractExchange):
+        self.channel = channel
+        self.retry_exchange = retry_exchange
+
+    async def handle_failure(
+        self, message: AbstractIncomingMessage, error: BaseException
+    ) -> None:
+        headers: Dict[str, Any] = dict(message.headers or {})
+        attempt = int(headers.get(RETRY_ATTEMPT_HEADER, 0))
+        original_queue = str(
+            headers.get(ORIGINAL_QUEUE_HEADER) or message.routing_key or ""
+        )
+        retriable = not isinstance(error, PERMANENT_ERRORS)
+
+        try:
+            if retriable and attempt < len(settings.RETRY_DELAYS_SEC):
+                headers[RETRY_TIER_HEADER] = attempt
+                headers[RETRY_ATTEMPT_HEADER] = attempt + 1
+                await self.retry_exchange.publish(
+                    self._copy(message, headers), routing_key=original_queue
+                )
+                MESSAGES_RETRIED.inc()
+                logger.warning(
+                    "Message scheduled for retry %d in %ss: %s",
+                    attempt + 1,
+                    settings.RETRY_DELAYS_SEC[attempt],
+                    error,
+                )
+            else:
+                headers.pop(RETRY_TIER_HEADER, None)
+                headers[ORIGINAL_QUEUE_HEADER] = original_queue
+                headers[ERROR_HEADER] = repr(error)[:ERROR_HEADER_MAX_LEN]
+                await self.channel.default_exchange.publish(
+                    self._copy(message, headers), routing_key=DLQ_NAME
+                )
+                MESSAGES_DEAD_LETTERED.inc()
+                logger.error(
+                    "Message dead-lettered after %d attempts: %s", attempt, error
+                )
+        except Exception:
+            logger.exception("Failed to park message, returning it to the queue")
+            await message.nack(requeue=True)
+            return
+        await message.ack()
+
+    @staticmethod
+    def _copy(
+        message: AbstractIncomingMessage, headers: Dict[str, Any]
+    ) -> aio_pika.Message:
+        return aio_pika.Message(
+            body=message.body,
+            headers=headers,
+            content_type=message.content_type,
+            message_id=message.message_id,
+            correlation_id=message.correlation_id,
+            timestamp=message.timestamp,
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+        )
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Generic, List, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class WeightedLaneScheduler(Generic[T]):
+    """
+    Раздаёт сообщения из нескольких полос фиксированному числу
+    обработчиков по весам (smooth weighted round-robin).
+
+    Пока обе полосы непусты, на каждые weight[a] сообщений полосы a
+    приходится weight[b] сообщений полосы b; пустая полоса свою долю
+    не резервирует — остальные забирают всю мощность.
+    """
+
+    def __init__(self, weights: Dict[str, int]):
+        self.weights = {lane: max(weight, 1) for lane, weight in weights.items()}
+        self._queues: Dict[str, Deque[T]] = {lane: deque() for lane in weights}
+        self._current: Dict[str, int] = dict.fromkeys(weights, 0)
+        self._ready = asyncio.Semaphore(0)
+        self._tasks: List[asyncio.Task[None]] = []
+
+    def submit(self, lane: str, item: T) -> None:
+        self._queues[lane].append(item)
+        self._ready.release()
+
+    def depth(self, lane: str) -> int:
+        return len(self._queues[lane])
+
+    def _pick(self) -> str:
+        active = [lane for lane, queue in self._queues.items() if queue]
+        total = 0
+        for lane in active:
+            self._current[lane] += self.weights[lane]
+            total += self.weights[lane]
+        chosen = max(active, key=self._current.__getitem__)
+        self._current[chosen] -= total
+        return chosen
+
+    async def _run_one(self, handler: Callable[[T], Awaitable[None]]) -> None:
+        while True:
+            # Семафор считает сообщения во всех полосах — после acquire
+            # хотя бы одна полоса непуста
+            await self._ready.acquire()
+            lane = self._pick()
+            item = self._queues[lane].popleft()
+            try:
+                await handler(item)
+            except Exception:
+                logger.exception("Unhandled error in lane '%s' handler", lane)
+
+    def start(self, handler: Callable[[T], Awaitable[None]], concurrency: int) -> None:
+        """Запускает concurrency обработчиков."""
+        self._tasks = [
+            asyncio.create_task(self._run_one(handler)) for _ in range(concurrency)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
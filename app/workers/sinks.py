@@ -0,0 +1,343 @@
+"""
+Приёмники (sinks) воркера: куда пишутся обработанные посылки.
+
+У каждого приёмника свой буфер, размер пачки, задержка (linger), число
+параллельных записей и политика повторов — медленный приёмник не задерживает
+остальные. Новый приёмник — наследник Sink с методом write(), добавленный
+в SinkPipeline; обработчик сообщений при этом не меняется.
+"""
+
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Generic, Iterable, List, NamedTuple, Optional, Set, TypeVar
+
+from pydantic import TypeAdapter
+from pymongo.errors import BulkWriteError
+from sqlalchemy import insert
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from app.core.config import settings
+from app.core.metrics import (
+    BUFFER_DEPTH,
+    FLUSH_BATCH_SIZE,
+    FLUSH_DURATION,
+    FLUSH_FAILURES,
+    FLUSH_PARTIAL_ITEMS,
+    FLUSH_RETRIES,
+    FLUSHES_IN_FLIGHT,
+)
+from app.db.mongo import MongoService, failed_indexes, package_document
+from app.db.mysql import async_session
+from app.models.outbox import PackageOutbox
+from app.models.packages import Package
+from app.schemas.packages import PRE_ROUNDED, PackageAdvanced
+from app.workers.batching import AdaptiveBatchController
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Дубль, проскочивший фильтр (другой процесс, рестарт), не ломает пачку:
+# уникальный ключ (idempotency_key, created_at) превращает вставку в no-op.
+# created_at берётся из времени публикации сообщения, поэтому передоставка
+# попадает в ту же секцию и в тот же ключ
+_insert = mysql_insert(Package)
+PACKAGES_UPSERT = _insert.on_duplicate_key_update(
+    idempotency_key=_insert.inserted.idempotency_key
+)
+
+OUTBOX_INSERT = insert(PackageOutbox)
+_outbox_payload = TypeAdapter(List[PackageAdvanced])
+
+
+def encode_outbox(batch: List[PackageAdvanced]) -> bytes:
+    return _outbox_payload.dump_json(batch)
+
+
+def decode_outbox(payload: bytes) -> List[PackageAdvanced]:
+    # стоимость округлена при записи пачки
+    return _outbox_payload.validate_json(payload, context=PRE_ROUNDED)
+
+
+class RetryPolicy(NamedTuple):
+    max_attempts: int = 5
+    base_delay_sec: float = settings.SINK_RETRY_BASE_DELAY_SEC
+    max_delay_sec: float = settings.SINK_RETRY_MAX_DELAY_SEC
+
+    def delay(self, attempt: int) -> float:
+        """Экспоненциальная задержка перед попыткой attempt + 1."""
+        return min(self.base_delay_sec * 2 ** (attempt - 1), self.max_delay_sec)
+
+
+class PartialWriteError(Exception, Generic[T]):
+    """
+    Записана только часть пачки. write() бросает её с незаписанными
+    элементами — повторяются только они.
+    """
+
+    def __init__(self, failed: List[T], cause: BaseException):
+        super().__init__(failed, cause)
+        self.failed = failed
+        self.cause = cause
+
+    def __str__(self) -> str:
+        return f"{len(self.failed)} items not written: {self.cause}"
+
+
+class Sink(ABC, Generic[T]):
+    """
+    Буферизующий приёмник. Пачка уходит в write(), когда набралось
+    batch_size элементов или прошло linger_sec; одновременно выполняется
+    не больше max_in_flight записей. Пачка, не записанная за все попытки,
+    возвращается в начало буфера и уйдёт со следующей записью.
+
+    С controller размер пачки и linger подбираются по ходу работы.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_size: int,
+        linger_sec: float,
+        max_in_flight: int,
+        retry: RetryPolicy,
+        controller: Optional[AdaptiveBatchController] = None,
+    ):
+        self.name = name
+        self.batch_size = batch_size
+        self.linger_sec = linger_sec
+        self.max_in_flight = max_in_flight
+        self.retry = retry
+        self.controller = controller
+        if controller is not None:
+            self.batch_size = controller.batch_size
+            self.linger_sec = controller.linger_sec
+        self._buffer: List[T] = []
+        self._in_flight = 0
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self._has_space = asyncio.Event()
+        self._has_space.set()
+        self._linger_task: Optional["asyncio.Task[None]"] = None
+        self._closing = False
+        BUFFER_DEPTH.labels(name).set_function(lambda: len(self._buffer))
+        FLUSHES_IN_FLIGHT.labels(name).set_function(lambda: self._in_flight)
+
+    @abstractmethod
+    async def write(self, batch: List[T]) -> None:
+        """
+        Записывает пачку; исключение — повтор по политике retry,
+        PartialWriteError — повтор только незаписанной части.
+        """
+
+    def on_flushed(self, batch: List[T]) -> None:
+        """Вызывается после успешной записи пачки."""
+
+    @property
+    def max_pending(self) -> int:
+        # Сверх этого put() ждёт: память ограничена, а обработчики
+        # притормаживают вместе с отстающим хранилищем
+        return self.batch_size * settings.SINK_MAX_PENDING_BATCHES
+
+    async def put(self, item: T) -> None:
+        while len(self._buffer) >= self.max_pending:
+            self._has_space.clear()
+            await self._has_space.wait()
+        self._buffer.append(item)
+        if self.controller is not None:
+            self.controller.record_arrival()
+        self._schedule()
+
+    def _schedule(self, force: bool = False) -> None:
+        """Запускает записи полных пачек (force — и неполной) на свободные слоты."""
+        while (
+            self._buffer
+            and self._in_flight < self.max_in_flight
+            and (force or len(self._buffer) >= self.batch_size)
+        ):
+            batch = self._buffer[: self.batch_size]
+            del self._buffer[: self.batch_size]
+            self._in_flight += 1
+            task = asyncio.create_task(self._flush(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            force = False
+        if len(self._buffer) < self.max_pending:
+            self._has_space.set()
+
+    def _observe(self, size: int, duration_sec: float, ok: bool) -> None:
+        if self.controller is None:
+            return
+        self.controller.observe(size, duration_sec, ok)
+        self.batch_size = self.controller.batch_size
+        self.linger_sec = self.controller.linger_sec
+
+    async def _flush(self, batch: List[T]) -> None:
+        try:
+            for attempt in range(1, self.retry.max_attempts + 1):
+                start = time.perf_counter()
+                try:
+                    await self.write(batch)
+                except Exception as e:
+                    self._observe(len(batch), time.perf_counter() - start, False)
+                    if isinstance(e, PartialWriteError):
+                        FLUSH_PARTIAL_ITEMS.labels(self.name).inc(len(e.failed))
+                        batch = e.failed
+                    logger.exception(
+                        "%s flush error (attempt %d/%d): %s",
+                        self.name,
+                        attempt,
+                        self.retry.max_attempts,
+                        e,
+                    )
+                    if attempt < self.retry.max_attempts:
+                        FLUSH_RETRIES.labels(self.name).inc()
+                        await asyncio.sleep(self.retry.delay(attempt))
+                    continue
+                duration = time.perf_counter() - start
+                self._observe(len(batch), duration, True)
+                FLUSH_DURATION.labels(self.name).observe(duration)
+                FLUSH_BATCH_SIZE.labels(self.name).observe(len(batch))
+                logger.debug("Flushed %d items to %s", len(batch), self.name)
+                self.on_flushed(batch)
+                return
+            FLUSH_FAILURES.labels(self.name).inc()
+            if self._closing:
+                logger.error(
+                    "Failed to flush %d items to %s on shutdown, dropped",
+                    len(batch),
+                    self.name,
+                )
+                return
+            logger.error(
+                "Failed to flush %d items to %s, returned to buffer",
+                len(batch),
+                self.name,
+            )
+            self._buffer[:0] = batch
+        finally:
+            self._in_flight -= 1
+            self._schedule(force=self._closing)
+
+    async def _linger(self) -> None:
+        while True:
+            await asyncio.sleep(self.linger_sec)
+            self._schedule(force=True)
+
+    def start(self) -> None:
+        self._linger_task = asyncio.create_task(self._linger())
+
+    async def close(self) -> None:
+        """Дописывает буфер и ждёт завершения записей."""
+        if self._linger_task is not None:
+            self._linger_task.cancel()
+        self._closing = True
+        self._schedule(force=True)
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
+
+
+class SinkPipeline(Generic[T]):
+    """Раздаёт каждый элемент всем приёмникам."""
+
+    def __init__(self, sinks: Iterable[Sink[T]] = ()):
+        self.sinks: List[Sink[T]] = list(sinks)
+
+    def add(self, sink: Sink[T]) -> None:
+        self.sinks.append(sink)
+
+    async def put(self, item: T) -> None:
+        for sink in self.sinks:
+            await sink.put(item)
+
+    def start(self) -> None:
+        for sink in self.sinks:
+            sink.start()
+
+    async def close(self) -> None:
+        await asyncio.gather(*(sink.close() for sink in self.sinks))
+
+
+class MySQLSink(Sink[PackageAdvanced]):
+    """
+    Посылки в packages одним multi-row INSERT ... ON DUPLICATE KEY UPDATE.
+    С outbox=True в той же транзакции пишется строка packages_outbox
+    с посылками пачки — для реле app.workers.outbox.
+    """
+
+    def __init__(
+        self,
+        on_flushed: Callable[[List[PackageAdvanced]], None] | None = None,
+        outbox: bool = False,
+    ):
+        super().__init__(
+            "mysql",
+            batch_size=settings.SINK_MYSQL_BATCH_SIZE,
+            linger_sec=settings.SINK_MYSQL_LINGER_SEC,
+            max_in_flight=settings.SINK_MYSQL_MAX_IN_FLIGHT,
+            retry=RetryPolicy(settings.SINK_MYSQL_MAX_ATTEMPTS),
+            controller=(
+                AdaptiveBatchController("mysql") if settings.BATCH_ADAPTIVE else None
+            ),
+        )
+        self._on_flushed = on_flushed
+        self.outbox = outbox
+
+    async def write(self, batch: List[PackageAdvanced]) -> None:
+        rows = [
+            {
+                "name": p.name,
+                "weight_kg": p.weight_kg,
+                "content_value_usd": p.content_value_usd,
+                "type_id": p.type_id,
+                "type_name": p.type_name,
+                "session_id": p.session_id,
+                "delivery_cost_rub": p.delivery_cost_rub,
+                "idempotency_key": p.idempotency_key,
+                "created_at": p.created_at,
+            }
+            for p in batch
+        ]
+        async with async_session() as session:
+            await session.execute(PACKAGES_UPSERT, rows)
+            if self.outbox:
+                await session.execute(OUTBOX_INSERT, {"payload": encode_outbox(batch)})
+            await session.commit()
+
+    def on_flushed(self, batch: List[PackageAdvanced]) -> None:
+        if self._on_flushed is not None:
+            self._on_flushed(batch)
+
+
+class MongoSink(Sink[PackageAdvanced]):
+    """
+    Посылки в дневную коллекцию MongoDB неупорядоченным insert_many:
+    сбой одного документа не останавливает остальные. У документов
+    детерминированный _id, поэтому повтор пачки не создаёт дублей.
+    """
+
+    def __init__(self, mongo: MongoService):
+        super().__init__(
+            "mongo",
+            batch_size=settings.SINK_MONGO_BATCH_SIZE,
+            linger_sec=settings.SINK_MONGO_LINGER_SEC,
+            max_in_flight=settings.SINK_MONGO_MAX_IN_FLIGHT,
+            retry=RetryPolicy(settings.SINK_MONGO_MAX_ATTEMPTS),
+            controller=(
+                AdaptiveBatchController("mongo") if settings.BATCH_ADAPTIVE else None
+            ),
+        )
+        self.mongo = mongo
+
+    async def write(self, batch: List[PackageAdvanced]) -> None:
+        docs = [package_document(p) for p in batch]
+        collection = await self.mongo.get_daily_collection()
+        try:
+            await collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            failed = failed_indexes(e.details, len(docs))
+            if not failed:
+                # только дубли: документы записаны прошлой попыткой
+                return
+            raise PartialWriteError([batch[i] for i in failed], e) from e
@@ -0,0 +1,293 @@
+"""
+Супервизор воркеров: N процессов rabbit_worker на одной машине.
+
+    python -m app.workers.supervisor [--processes N] [--cpu-affinity]
+
+У каждого процесса свои соединения, каналы и prefetch; упавший процесс
+перезапускается с экспоненциальной задержкой. На WORKER_METRICS_PORT
+супервизор отдаёт /metrics — метрики всех процессов с меткой worker —
+и /health со статусом процессов.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.process import BaseProcess
+from typing import Any, Dict, Iterable, List, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.parser import text_string_to_metric_families
+from prometheus_client.registry import Collector
+
+from app.core.config import settings
+from app.core.logging import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Дети форкаются из forkserver, а не из супервизора: в супервизоре уже
+# работают потоки (HTTP, логирование), и fork из него небезопасен.
+# Forkserver заранее импортирует воркер — перезапуск процесса дешёвый.
+mp = multiprocessing.get_context("forkserver")
+mp.set_forkserver_preload(["app.workers.rabbit_worker"])
+
+CHILD_SCRAPE_TIMEOUT_SEC = 1.0
+MONITOR_INTERVAL_SEC = 1.0
+STOP_TIMEOUT_SEC = 30.0
+# Процесс, проживший дольше, считается стабильным — задержка сбрасывается
+STABLE_UPTIME_SEC = 60.0
+
+
+def run_worker(
+    index: int, metrics_port: int, admin_port: int, cpu: Optional[int]
+) -> None:
+    """Точка входа дочернего процесса."""
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+    from app.workers import rabbit_worker
+
+    setup_logging()
+    logger.info("Worker %d started (pid=%d, cpu=%s)", index, os.getpid(), cpu)
+    asyncio.run(rabbit_worker.main(metrics_port, admin_port))
+
+
+@dataclass
+class WorkerSlot:
+    index: int
+    cpu: Optional[int]
+    process: Optional[BaseProcess] = None
+    started_at: float = 0.0
+    restarts: int = 0
+    backoff: float = 0.0
+    restart_at: Optional[float] = field(default=None)
+
+    @property
+    def metrics_port(self) -> int:
+        return settings.WORKER_CHILD_METRICS_PORT_BASE + self.index
+
+    @property
+    def admin_port(self) -> int:
+        return settings.WORKER_CHILD_ADMIN_PORT_BASE + self.index
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class Supervisor:
+    def __init__(self, processes: int, cpu_affinity: bool):
+        cpus = sorted(os.sched_getaffinity(0)) if cpu_affinity else []
+        self.slots = [
+            WorkerSlot(index=i, cpu=cpus[i % len(cpus)] if cpus else None)
+            for i in range(processes)
+        ]
+        self._stopping = threading.Event()
+
+    def start(self, slot: WorkerSlot) -> None:
+        process = mp.Process(
+            target=run_worker,
+            args=(slot.index, slot.metrics_port, slot.admin_port, slot.cpu),
+            name=f"worker-{slot.index}",
+        )
+        process.start()
+        slot.process = process
+        slot.started_at = time.monotonic()
+        slot.restart_at = None
+
+    def monitor(self) -> None:
+        """Перезапускает упавшие процессы до остановки супервизора."""
+        while not self._stopping.wait(MONITOR_INTERVAL_SEC):
+            now = time.monotonic()
+            for slot in self.slots:
+                if slot.alive:
+                    if now - slot.started_at > STABLE_UPTIME_SEC:
+                        slot.backoff = 0.0
+                    continue
+                if slot.restart_at is None:
+                    exitcode = slot.process.exitcode if slot.process else None
+                    slot.backoff = min(
+                        max(slot.backoff * 2, 1.0),
+                        settings.WORKER_RESTART_BACKOFF_MAX_SEC,
+                    )
+                    slot.restart_at = now + slot.backoff
+                    logger.error(
+                        "Worker %d exited with code %s, restarting in %.0fs",
+                        slot.index,
+                        exitcode,
+                        slot.backoff,
+                    )
+                elif now >= slot.restart_at:
+                    slot.restarts += 1
+                    self.start(slot)
+
+    def stop(self, *_: Any) -> None:
+        self._stopping.set()
+
+    def shutdown(self) -> None:
+        """SIGTERM детям и ожидание дозаписи их буферов."""
+        for slot in self.slots:
+            if slot.alive and slot.process is not None:
+                slot.process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT_SEC
+        for slot in self.slots:
+            if slot.process is None:
+                continue
+            slot.process.join(max(deadline - time.monotonic(), 0))
+            if slot.process.is_alive():
+                logger.warning("Worker %d did not stop in time, killing", slot.index)
+                slot.process.kill()
+                slot.process.join()
+
+    def health(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        workers = [
+            {
+                "index": slot.index,
+                "pid": slot.process.pid if slot.process else None,
+                "alive": slot.alive,
+                "cpu": slot.cpu,
+                "restarts": slot.restarts,
+                "uptime_sec": round(now - slot.started_at, 1) if slot.alive else 0,
+            }
+            for slot in self.slots
+        ]
+        alive = sum(1 for worker in workers if worker["alive"])
+        return {
+            "status": "ok" if alive == len(workers) else "degraded",
+            "alive": alive,
+            "processes": len(workers),
+            "workers": workers,
+        }
+
+    def run(self) -> None:
+        for slot in self.slots:
+            self.start(slot)
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info("Supervisor started %d workers", len(self.slots))
+        try:
+            self.monitor()
+        finally:
+            self.shutdown()
+            logger.info("Supervisor stopped")
+
+
+class WorkersCollector(Collector):
+    """
+    Собирает /metrics дочерних процессов и отдаёт их с меткой worker,
+    плюс состояние самого супервизора.
+    """
+
+    def __init__(self, supervisor: Supervisor):
+        self.supervisor = supervisor
+
+    def collect(self) -> Iterable[Metric]:
+        families: Dict[str, Metric] = {}
+        for slot in self.supervisor.slots:
+            if not slot.alive:
+                continue
+            try:
+                with urllib.request.urlopen(
+                    f"http://127.0.0.1:{slot.metrics_port}/metrics",
+                    timeout=CHILD_SCRAPE_TIMEOUT_SEC,
+                ) as resp:
+                    text = resp.read().decode()
+            except Exception as e:
+                logger.warning("Metrics scrape of worker %d failed: %s", slot.index, e)
+                continue
+            worker = str(slot.index)
+            for family in text_string_to_metric_families(text):
+                merged = families.setdefault(
+                    family.name,
+                    Metric(family.name, family.documentation, family.type),
+                )
+                for sample in family.samples:
+                    merged.add_sample(
+                        sample.name,
+                        {**sample.labels, "worker": worker},
+                        sample.value,
+                        sample.timestamp,
+                    )
+        yield from families.values()
+
+        up = GaugeMetricFamily(
+            "worker_process_up", "Жив ли процесс воркера", labels=["worker"]
+        )
+        restarts = CounterMetricFamily(
+            "worker_process_restarts",
+            "Перезапуски процесса воркера",
+            labels=["worker"],
+        )
+        for slot in self.supervisor.slots:
+            up.add_metric([str(slot.index)], int(slot.alive))
+            restarts.add_metric([str(slot.index)], slot.restarts)
+        yield up
+        yield restarts
+
+
+def serve_http(supervisor: Supervisor, port: int) -> ThreadingHTTPServer:
+    """Поднимает /metrics и /health супервизора в фоновом потоке."""
+    registry = CollectorRegistry(auto_describe=False)
+    registry.register(WorkersCollector(supervisor))
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.startswith("/health"):
+                health = supervisor.health()
+                body = json.dumps(health).encode()
+                status = 200 if health["status"] == "ok" else 503
+                content_type = "application/json"
+            elif self.path.startswith("/metrics"):
+                body = generate_latest(registry)
+                status = 200
+                content_type = CONTENT_TYPE_LATEST
+            else:
+                body, status, content_type = b"Not Found", 404, "text/plain"
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Worker process supervisor")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=settings.WORKER_PROCESSES or os.cpu_count() or 1,
+    )
+    parser.add_argument(
+        "--cpu-affinity",
+        action=argparse.BooleanOptionalAction,
+        default=settings.WORKER_CPU_AFFINITY,
+    )
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    supervisor = Supervisor(args.processes, args.cpu_affinity)
+    server = serve_http(supervisor, settings.WORKER_METRICS_PORT)
+    try:
+        supervisor.run()
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,12 @@
 import asyncio
 import logging
-import traceback
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 import httpx
 from sqlalchemy import select
 
 from app.core.config import settings
+from app.core.metrics import CACHE_REQUESTS
 from app.db.mysql import async_session
 from app.db.redis import redis_client
 from app.models.types import Type
@@ -31,6 +31,7 @@ async def get_usd_to_rub_rate() -> Optional[float]:
     try:
         cached = await redis_client.get(CBR_CACHE_KEY)
         if cached is not None:
+            CACHE_REQUESTS.labels("rate", "hit").inc()
             value = (
                 cached.decode()
                 if isinstance(cached, (bytes, bytearray))
@@ -39,6 +40,7 @@ async def get_usd_to_rub_rate() -> Optional[float]:
             return float(value.replace(",", "."))
     except Exception as e:
         logger.warning("Redis GET failed for USD_RUB: %s", e)
+    CACHE_REQUESTS.labels("rate", "miss").inc()
 
     got_lock = await redis_client.set(CBR_LOCK_KEY, "1", ex=CBR_LOCK_TTL, nx=True)
     if not got_lock:
@@ -88,6 +90,11 @@ async def get_usd_to_rub_rate() -> Optional[float]:
             logger.warning("Failed to release Redis lock: %s", e)
 
 
+def delivery_cost(weight_kg: float, content_value_usd: float, rate: float) -> float:
+    """Стоимость доставки в RUB по курсу rate."""
+    return ((weight_kg * 0.5) + (content_value_usd * 0.01)) * rate
+
+
 async def calculate_delivery_cost(
     weight_kg: float, content_value_usd: float
 ) -> Optional[float]:
@@ -96,9 +103,9 @@ async def calculate_delivery_cost(
         rate = await get_usd_to_rub_rate()
         if rate is None:
             return None
-        return ((weight_kg * 0.5) + (content_value_usd * 0.01)) * rate
+        return delivery_cost(weight_kg, content_value_usd, rate)
     except Exception:
-        traceback.print_exc()
+        logger.exception("Error calculating delivery cost")
         return None
 
 
@@ -123,6 +130,7 @@ async def get_type_name(type_id: Optional[int]) -> str:
     field = str(type_id)  # Redis всегда принимает str|bytes
     name = await redis_client.hget(TYPE_CACHE_KEY, field)
 
+    CACHE_REQUESTS.labels("type", "hit" if name else "miss").inc()
     if not name:
         await load_type_cache()
         name = await redis_client.hget(TYPE_CACHE_KEY, field)
@@ -135,6 +143,34 @@ async def get_type_name(type_id: Optional[int]) -> str:
     return name
 
 
+async def get_type_catalog() -> Dict[str, str]:
+    """Каталог типов {type_id: name} из Redis (при промахе — из MySQL)."""
+    types = await redis_client.hgetall(TYPE_CACHE_KEY)
+    CACHE_REQUESTS.labels("type", "hit" if types else "miss").inc()
+    if not types:
+        await load_type_cache()
+        types = await redis_client.hgetall(TYPE_CACHE_KEY)
+    return {
+        (k.decode() if isinstance(k, bytes) else str(k)): (
+            v.decode() if isinstance(v, bytes) else str(v)
+        )
+        for k, v in types.items()
+    }
+
+
+def resolve_type(type_id: Optional[int], types: Dict[str, str]) -> Tuple[int, str]:
+    """
+    (type_id, type_name) по каталогу — то же, что validate_type_id
+    и get_type_name, но без обращений к Redis.
+    """
+    if type_id is None:
+        return DEFAULT_TYPE_ID, types.get(str(DEFAULT_TYPE_ID), DEFAULT_TYPE_NAME)
+    name = types.get(str(type_id), DEFAULT_TYPE_NAME)
+    if name == DEFAULT_TYPE_NAME:
+        return DEFAULT_TYPE_ID, types.get(str(DEFAULT_TYPE_ID), DEFAULT_TYPE_NAME)
+    return type_id, name
+
+
 async def validate_type_id(type_id: Optional[int]) -> int:
     """Проверяет существование type_id через Redis"""
     if type_id is None:
@@ -0,0 +1,66 @@
+"""
+Локальная подмена API ЦБ РФ для нагрузочных тестов.
+
+Отдаёт daily_json.js с фиксированным курсом, чтобы бенчмарки не зависели
+от внешней сети и давали воспроизводимую стоимость доставки.
+
+    python -m benchmarks.fake_cbr --port 8081 --usd 90.5
+"""
+
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def build_payload(usd_rate: float) -> bytes:
+    return json.dumps(
+        {
+            "Date": "2025-01-01T11:30:00+03:00",
+            "Valute": {
+                "USD": {
+                    "ID": "R01235",
+                    "CharCode": "USD",
+                    "Nominal": 1,
+                    "Name": "Доллар США",
+                    "Value": usd_rate,
+                }
+            },
+        },
+        ensure_ascii=False,
+    ).encode()
+
+
+def make_handler(payload: bytes) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/daily_json.js":
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/javascript; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake CBR daily_json.js server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--usd", type=float, default=90.0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        (args.host, args.port), make_handler(build_payload(args.usd))
+    )
+    print(f"Fake CBR listening on {args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
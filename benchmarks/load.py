@@ -0,0 +1,304 @@
+"""
+Нагрузочный тест сервиса: регистрация / список / статистика.
+
+Гоняет заданную смесь запросов против запущенного API и параллельно
+опрашивает MySQL, фиксируя момент появления каждой зарегистрированной
+посылки. В отчёте — перцентили латентности HTTP по операциям,
+латентность «регистрация → запись в MySQL» и устойчивая пропускная
+способность (посылок/сек). Результат сохраняется в benchmarks/results,
+чтобы регрессии между коммитами были видны через --compare.
+
+    python -m benchmarks.load --base-url http://localhost:8000 \\
+        --duration 60 --concurrency 50 --mix register=8,list=1,stats=1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import httpx
+from sqlalchemy import bindparam, text
+
+from app.db.mysql import async_session
+
+RESULTS_DIR = Path(__file__).parent / "results"
+# Имён в одном запросе опроса MySQL
+POLL_CHUNK = 1000
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pct(p: float) -> float:
+        index = min(int(round(p / 100 * (len(ordered) - 1))), len(ordered) - 1)
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p99_ms": pct(99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def parse_mix(raw: str) -> Dict[str, int]:
+    mix: Dict[str, int] = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+class LoadRun:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.run_id = uuid4().hex[:8]
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        # имя посылки -> время отправки / время появления в MySQL
+        self.sent_at: Dict[str, float] = {}
+        self.persisted_at: Dict[str, float] = {}
+        self.stop = asyncio.Event()
+
+    @property
+    def name_prefix(self) -> str:
+        return f"bench-{self.run_id}-"
+
+    def make_package(self, seq: int) -> Dict[str, Any]:
+        return {
+            "name": f"{self.name_prefix}{seq}",
+            "weight_kg": round(random.uniform(0.1, 30), 3),
+            "content_value_usd": round(random.uniform(1, 2000), 2),
+            "type_id": random.randint(1, 3),
+        }
+
+    def mark_sent(self, packages: List[Dict[str, Any]], sent: float) -> None:
+        # Только принятые API посылки: отклонённые (429/503) не будут записаны
+        for package in packages:
+            self.sent_at[package["name"]] = sent
+
+    async def register(self, client: httpx.AsyncClient, seq: int) -> None:
+        package = self.make_package(seq)
+        sent = time.monotonic()
+        if await self.request(
+            client, "register", "POST", "/api/packages/register", package
+        ):
+            self.mark_sent([package], sent)
+
+    async def register_bulk(self, client: httpx.AsyncClient, seq: int) -> None:
+        payload = [self.make_package(seq + i) for i in range(self.args.bulk_size)]
+        sent = time.monotonic()
+        if await self.request(
+            client, "bulk", "POST", "/api/packages/register/bulk", payload
+        ):
+            self.mark_sent(payload, sent)
+
+    async def request(
+        self,
+        client: httpx.AsyncClient,
+        op: str,
+        method: str,
+        url: str,
+        payload: Optional[Any] = None,
+    ) -> bool:
+        """Выполняет запрос; True — ответ без ошибки."""
+        start = time.perf_counter()
+        ok = False
+        try:
+            resp = await client.request(method, url, json=payload)
+            ok = resp.status_code < 400
+        except httpx.HTTPError:
+            pass
+        if not ok:
+            self.errors[op] += 1
+        self.latencies[op].append(time.perf_counter() - start)
+        return ok
+
+    async def client_loop(self, worker_id: int) -> None:
+        ops, weights = zip(*parse_mix(self.args.mix).items())
+        seq = 0
+        # cookie session_id сохраняется клиентом — одна сессия на виртуального юзера
+        async with httpx.AsyncClient(
+            base_url=self.args.base_url, timeout=self.args.timeout
+        ) as client:
+            while not self.stop.is_set():
+                op = random.choices(ops, weights)[0]
+                if op == "register":
+                    seq += 1
+                    await self.register(client, worker_id * 10_000_000 + seq)
+                elif op == "bulk":
+                    # номера bulk_size посылок: seq + 1 .. seq + bulk_size
+                    seq += 1
+                    await self.register_bulk(client, worker_id * 10_000_000 + seq)
+                    seq += self.args.bulk_size - 1
+                elif op == "list":
+                    await self.request(client, "list", "GET", "/api/packages")
+                elif op == "stats":
+                    await self.request(client, "stats", "GET", "/api/stats")
+                if self.args.think_ms:
+                    await asyncio.sleep(self.args.think_ms / 1000)
+
+    async def persistence_poller(self, floor_id: int) -> None:
+        """
+        Опрашивает MySQL и отмечает время появления посылок прогона.
+        Ищутся только ещё не найденные имена: воркеры коммитят пачки не
+        в порядке id, поэтому отсечка по последнему увиденному id теряла
+        бы строки. floor_id — максимальный id до начала прогона.
+        """
+        stmt = text(
+            "SELECT name FROM packages WHERE id > :floor_id AND name IN :names"
+        ).bindparams(bindparam("names", expanding=True))
+        while True:
+            outstanding = [
+                name for name in self.sent_at if name not in self.persisted_at
+            ]
+            async with async_session() as session:
+                for i in range(0, len(outstanding), POLL_CHUNK):
+                    result = await session.execute(
+                        stmt,
+                        {
+                            "floor_id": floor_id,
+                            "names": outstanding[i : i + POLL_CHUNK],
+                        },
+                    )
+                    now = time.monotonic()
+                    for (name,) in result.all():
+                        self.persisted_at.setdefault(name, now)
+            if self.stop.is_set() and len(self.persisted_at) >= len(self.sent_at):
+                return
+            await asyncio.sleep(self.args.poll_interval)
+
+    async def run(self) -> Dict[str, Any]:
+        async with async_session() as session:
+            result = await session.execute(
+                text("SELECT COALESCE(MAX(id), 0) FROM packages")
+            )
+            floor_id = result.scalar_one()
+        poller = asyncio.create_task(self.persistence_poller(floor_id))
+        clients = [
+            asyncio.create_task(self.client_loop(i))
+            for i in range(self.args.concurrency)
+        ]
+        started = time.monotonic()
+        await asyncio.sleep(self.args.duration)
+        self.stop.set()
+        await asyncio.gather(*clients)
+        load_elapsed = time.monotonic() - started
+
+        # Ждём дозапись хвоста очереди
+        try:
+            await asyncio.wait_for(poller, timeout=self.args.drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        persist_latencies = [
+            self.persisted_at[name] - sent
+            for name, sent in self.sent_at.items()
+            if name in self.persisted_at
+        ]
+        persisted_times = sorted(self.persisted_at.values())
+        persist_window = (
+            persisted_times[-1] - persisted_times[0] if len(persisted_times) > 1 else 0
+        )
+        return {
+            "run_id": self.run_id,
+            "commit": git_commit(),
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "params": vars(self.args),
+            "duration_sec": round(load_elapsed, 3),
+            "http": {
+                op: {**percentiles(values), "errors": self.errors[op]}
+                for op, values in self.latencies.items()
+            },
+            "requests_per_sec": round(
+                sum(len(v) for v in self.latencies.values()) / load_elapsed, 2
+            ),
+            "registered": len(self.sent_at),
+            "persisted": len(self.persisted_at),
+            "persist_latency": percentiles(persist_latencies),
+            "persisted_per_sec": (
+                round(len(persisted_times) / persist_window, 2) if persist_window else 0
+            ),
+        }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def save_result(result: Dict[str, Any], name: str) -> Path:
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULTS_DIR / f"{name}-{result['commit']}-{result['run_id']}.json"
+    path.write_text(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+    return path
+
+
+def compare(result: Dict[str, Any], baseline_path: Path) -> None:
+    """Печатает дельты ключевых показателей относительно прошлого прогона."""
+    baseline = json.loads(baseline_path.read_text())
+    rows: List[Tuple[str, Any, Any, Tuple[str, ...]]] = [
+        ("persisted_per_sec", result, baseline, ("persisted_per_sec",))
+    ]
+    for key in ("p50_ms", "p99_ms"):
+        rows.append((f"persist {key}", result, baseline, ("persist_latency", key)))
+        for op in result["http"]:
+            rows.append((f"{op} {key}", result, baseline, ("http", op, key)))
+
+    print(f"\nComparison with {baseline_path.name} ({baseline.get('commit')}):")
+    for label, new, old, path in rows:
+        for part in path:
+            new = new.get(part, {}) if isinstance(new, dict) else None
+            old = old.get(part, {}) if isinstance(old, dict) else None
+        if not isinstance(new, (int, float)) or not isinstance(old, (int, float)):
+            continue
+        delta = (new - old) / old * 100 if old else 0.0
+        print(f"  {label:<24} {old:>12} -> {new:>12}  ({delta:+.1f}%)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Delivery service load test")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--mix", default="register=8,list=1,stats=1")
+    parser.add_argument("--think-ms", type=float, default=0)
+    parser.add_argument(
+        "--bulk-size", type=int, default=100, help="посылок в одном bulk-запросе"
+    )
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--drain-timeout", type=float, default=120)
+    parser.add_argument("--name", default="load", help="префикс файла результата")
+    parser.add_argument(
+        "--compare", type=Path, help="файл прошлого результата для сравнения"
+    )
+    args = parser.parse_args()
+
+    result = asyncio.run(LoadRun(args).run())
+    path = save_result(result, args.name)
+    print(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+    print(f"\nSaved to {path}")
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+from typing import Any, Dict, List
+
+import pytest
+
+from app.schemas.packages import PRE_ROUNDED, PackageAdvanced, PackageIn
+from app.workers.codec import decode_packages, encode_envelope, encode_package
+
+
+def encoded(payloads: List[Dict[str, Any]], wire_format: str) -> List[Any]:
+    return [encode_package(PackageIn(**p), wire_format) for p in payloads]
+
+
+@pytest.mark.benchmark(group="wire-encode")
+@pytest.mark.parametrize("wire_format", ["json", "msgpack"])
+def bench_encode(
+    benchmark, run_batch, payloads: List[Dict[str, Any]], wire_format: str
+):
+    items = [PackageIn(**p) for p in payloads]
+    messages = run_batch(lambda: [encode_package(p, wire_format) for p in items])
+    # размер тела сообщения — попадает в JSON-отчёт бенчмарка
+    benchmark.extra_info["avg_body_bytes"] = sum(len(m.body) for m in messages) / len(
+        messages
+    )
+
+
+@pytest.mark.benchmark(group="wire-decode-validate")
+@pytest.mark.parametrize("wire_format", ["json", "msgpack"])
+def bench_decode_and_build(run_batch, payloads: List[Dict[str, Any]], wire_format: str):
+    # путь воркера: декодирование + построение PackageAdvanced
+    messages = encoded(payloads, wire_format)
+
+    def decode_all() -> List[PackageAdvanced]:
+        result = []
+        for m in messages:
+            rows, trusted = decode_packages(m.body, m.headers)
+            if trusted:
+                result.append(
+                    PackageAdvanced.model_validate(rows[0], context=PRE_ROUNDED)
+                )
+            else:
+                result.append(PackageAdvanced(**rows[0]))
+        return result
+
+    run_batch(decode_all)
+
+
+@pytest.mark.benchmark(group="wire-decode-validate")
+def bench_decode_envelopes(run_batch, payloads: List[Dict[str, Any]]):
+    # конверты продюсера по 100 посылок
+    items = [PackageIn(**p) for p in payloads]
+    envelopes = [encode_envelope(items[i : i + 100]) for i in range(0, len(items), 100)]
+
+    def decode_all() -> List[PackageAdvanced]:
+        return [
+            PackageAdvanced.model_validate(row, context=PRE_ROUNDED)
+            for m in envelopes
+            for row in decode_packages(m.body, m.headers)[0]
+        ]
+
+    run_batch(decode_all)
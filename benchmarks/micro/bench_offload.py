@@ -0,0 +1,85 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List
+
+import pytest
+
+from app.schemas.packages import PackageIn
+from app.workers.codec import SCHEMA_HEADER, encode_package
+from app.workers.offload import ChunkItem, process_chunk
+
+RATE = 90.0
+TYPES = {"1": "одежда", "2": "электроника", "3": "разное"}
+POOL_PROCESSES = 4
+
+
+@pytest.fixture(scope="module")
+def pool() -> Iterator[ProcessPoolExecutor]:
+    executor = ProcessPoolExecutor(
+        max_workers=POOL_PROCESSES,
+        mp_context=multiprocessing.get_context("forkserver"),
+    )
+    # процессы стартуют и импортируют модули до замеров
+    warm = [
+        executor.submit(process_chunk, [], RATE, TYPES) for _ in range(POOL_PROCESSES)
+    ]
+    for future in warm:
+        future.result()
+    yield executor
+    executor.shutdown()
+
+
+def parent_cpu(benchmark: Any, fn: Callable[[], Any]) -> Callable[[], Any]:
+    """
+    CPU родительского процесса (потока event loop) за раунд — в extra_info:
+    на одном ядре пул не выигрывает по времени, но освобождает event loop.
+    """
+
+    def wrapped() -> Any:
+        start = time.process_time()
+        result = fn()
+        benchmark.extra_info["parent_cpu_ms"] = (time.process_time() - start) * 1000
+        return result
+
+    return wrapped
+
+
+def items(payloads: List[Dict[str, Any]], wire_format: str) -> List[ChunkItem]:
+    encoded = [encode_package(PackageIn(**p), wire_format) for p in payloads]
+    return [(m.body, m.headers[SCHEMA_HEADER], None) for m in encoded]
+
+
+@pytest.mark.benchmark(group="offload")
+@pytest.mark.parametrize("wire_format", ["json", "msgpack"])
+def bench_inline(
+    benchmark, run_batch, payloads: List[Dict[str, Any]], wire_format: str
+):
+    # OFFLOAD_PROCESSES=0: вся работа в потоке event loop
+    chunk = items(payloads, wire_format)
+    run_batch(parent_cpu(benchmark, lambda: process_chunk(chunk, RATE, TYPES)))
+
+
+@pytest.mark.benchmark(group="offload")
+@pytest.mark.parametrize("wire_format", ["json", "msgpack"])
+@pytest.mark.parametrize("chunk_size", [1, 16, 64, 256])
+def bench_pool(
+    benchmark,
+    run_batch,
+    pool: ProcessPoolExecutor,
+    payloads: List[Dict[str, Any]],
+    wire_format: str,
+    chunk_size: int,
+):
+    # Точка перелома: с какого OFFLOAD_CHUNK_SIZE накладные расходы
+    # на передачу чанка окупаются параллельной работой процессов
+    all_items = items(payloads, wire_format)
+    chunks = [
+        all_items[i : i + chunk_size] for i in range(0, len(all_items), chunk_size)
+    ]
+
+    def run() -> List[Any]:
+        futures = [pool.submit(process_chunk, c, RATE, TYPES) for c in chunks]
+        return [f.result() for f in futures]
+
+    run_batch(parent_cpu(benchmark, run))
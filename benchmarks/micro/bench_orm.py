@@ -0,0 +1,76 @@
+from typing import Any, Dict, List
+
+import pytest
+from sqlalchemy.dialects import mysql
+
+from app.models.packages import Package
+from app.schemas.packages import PackageAdvanced
+from app.workers.sinks import PACKAGES_UPSERT
+
+DIALECT = mysql.dialect()
+
+
+def to_orm(p: PackageAdvanced) -> Package:
+    # ORM-объекты на строку — для сравнения с Core-путём MySQLSink.write
+    return Package(
+        name=p.name,
+        weight_kg=p.weight_kg,
+        content_value_usd=p.content_value_usd,
+        type_id=p.type_id,
+        type_name=p.type_name,
+        session_id=p.session_id,
+        delivery_cost_rub=p.delivery_cost_rub,
+        idempotency_key=p.idempotency_key,
+        created_at=p.created_at,
+    )
+
+
+def to_row(p: PackageAdvanced) -> Dict[str, Any]:
+    # так строит строки MySQLSink.write (app/workers/sinks.py)
+    return {
+        "name": p.name,
+        "weight_kg": p.weight_kg,
+        "content_value_usd": p.content_value_usd,
+        "type_id": p.type_id,
+        "type_name": p.type_name,
+        "session_id": p.session_id,
+        "delivery_cost_rub": p.delivery_cost_rub,
+        "idempotency_key": p.idempotency_key,
+        "created_at": p.created_at,
+    }
+
+
+@pytest.mark.benchmark(group="row-construction")
+def bench_orm_objects(run_batch, packages: List[PackageAdvanced]):
+    run_batch(lambda: [to_orm(p) for p in packages])
+
+
+@pytest.mark.benchmark(group="row-construction")
+def bench_core_row_dicts(run_batch, packages: List[PackageAdvanced]):
+    run_batch(lambda: [to_row(p) for p in packages])
+
+
+@pytest.mark.benchmark(group="row-construction")
+def bench_core_row_tuples(run_batch, packages: List[PackageAdvanced]):
+    run_batch(
+        lambda: [
+            (
+                p.name,
+                p.weight_kg,
+                p.content_value_usd,
+                p.type_id,
+                p.type_name,
+                p.session_id,
+                p.delivery_cost_rub,
+                p.idempotency_key,
+                p.created_at,
+            )
+            for p in packages
+        ]
+    )
+
+
+@pytest.mark.benchmark(group="statement-compile")
+def bench_core_insert_compile(benchmark):
+    # executemany компилирует upsert MySQLSink один раз на пачку — меряем эту цену
+    benchmark(lambda: PACKAGES_UPSERT.compile(dialect=DIALECT))
@@ -0,0 +1,47 @@
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+from app.core.utils import round_2, round_3
+from app.workers import tasks
+
+
+@pytest.mark.benchmark(group="rounding")
+def bench_round_3(run_batch, payloads: List[Dict[str, Any]]):
+    values = [p["weight_kg"] for p in payloads]
+    run_batch(lambda: [round_3(v) for v in values])
+
+
+@pytest.mark.benchmark(group="rounding")
+def bench_round_2(run_batch, payloads: List[Dict[str, Any]]):
+    values = [p["content_value_usd"] for p in payloads]
+    run_batch(lambda: [round_2(v) for v in values])
+
+
+@pytest.mark.benchmark(group="rounding")
+def bench_builtin_round_reference(run_batch, payloads: List[Dict[str, Any]]):
+    # ориентир: нижняя граница стоимости округления без Decimal
+    values = [p["content_value_usd"] for p in payloads]
+    run_batch(lambda: [round(v, 2) for v in values])
+
+
+@pytest.mark.benchmark(group="pricing")
+def bench_calculate_delivery_cost(
+    run_batch, payloads: List[Dict[str, Any]], monkeypatch: pytest.MonkeyPatch
+):
+    # Курс подменяем константой: меряем расчёт, а не Redis
+    async def fixed_rate() -> float:
+        return 90.0
+
+    monkeypatch.setattr(tasks, "get_usd_to_rub_rate", fixed_rate)
+    pairs = [(p["weight_kg"], p["content_value_usd"]) for p in payloads]
+
+    async def price_all() -> List[Any]:
+        return [await tasks.calculate_delivery_cost(w, v) for w, v in pairs]
+
+    loop = asyncio.new_event_loop()
+    try:
+        run_batch(lambda: loop.run_until_complete(price_all()))
+    finally:
+        loop.close()
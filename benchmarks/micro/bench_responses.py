@@ -0,0 +1,75 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List
+
+import pytest
+from fastapi_pagination import Page, Params
+from pydantic import TypeAdapter
+
+from app.core.responses import dumps
+from app.schemas.packages import PackageOut
+
+PAGE_SIZE = 100
+
+
+def db_rows(payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Строки в том виде, в каком их отдаёт aiomysql: Decimal и datetime."""
+    now = datetime(2025, 9, 3, 12, 0, 0)
+    return [
+        {
+            **p,
+            "id": i,
+            "idempotency_key": None,
+            "weight_kg": Decimal(str(round(p["weight_kg"], 3))),
+            "content_value_usd": Decimal(str(round(p["content_value_usd"], 2))),
+            "delivery_cost_rub": Decimal(str(round(p["delivery_cost_rub"], 2))),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i, p in enumerate(payloads)
+    ]
+
+
+def pages(rows: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    return [rows[i : i + PAGE_SIZE] for i in range(0, len(rows), PAGE_SIZE)]
+
+
+@pytest.mark.benchmark(group="list-response")
+def bench_page_response_model(run_batch, payloads: List[Dict[str, Any]]):
+    # paginate() строит PackageOut на строку, FastAPI валидирует
+    # ответ по response_model ещё раз и кодирует JSON
+    chunks = pages(db_rows(payloads))
+    adapter = TypeAdapter(Page[PackageOut])
+    params = Params(page=1, size=PAGE_SIZE)
+
+    def render() -> List[bytes]:
+        result = []
+        for chunk in chunks:
+            items = [PackageOut.model_validate(row) for row in chunk]
+            page = Page[PackageOut].create(items, total=len(payloads), params=params)
+            result.append(adapter.dump_json(adapter.validate_python(page)))
+        return result
+
+    run_batch(render)
+
+
+@pytest.mark.benchmark(group="list-response")
+def bench_page_fast_json(run_batch, payloads: List[Dict[str, Any]]):
+    # FAST_JSON_RESPONSES: строки кодируются orjson как есть
+    chunks = pages(db_rows(payloads))
+
+    def render() -> List[bytes]:
+        return [
+            dumps(
+                {
+                    "items": chunk,
+                    "total": len(payloads),
+                    "page": 1,
+                    "size": PAGE_SIZE,
+                    "pages": 1,
+                }
+            )
+            for chunk in chunks
+        ]
+
+    run_batch(render)
@@ -0,0 +1,40 @@
+import json
+from typing import Any, Dict, List
+
+import pytest
+
+from app.schemas.packages import PackageAdvanced, PackageIn
+
+
+@pytest.mark.benchmark(group="schema-validate")
+def bench_package_advanced_validate(run_batch, payloads: List[Dict[str, Any]]):
+    run_batch(lambda: [PackageAdvanced(**p) for p in payloads])
+
+
+@pytest.mark.benchmark(group="schema-validate")
+def bench_package_advanced_model_validate(run_batch, payloads: List[Dict[str, Any]]):
+    run_batch(lambda: [PackageAdvanced.model_validate(p) for p in payloads])
+
+
+@pytest.mark.benchmark(group="schema-decode")
+def bench_json_loads_and_validate(run_batch, packages: List[PackageAdvanced]):
+    bodies = [p.model_dump_json().encode() for p in packages]
+    run_batch(lambda: [PackageAdvanced(**json.loads(b)) for b in bodies])
+
+
+@pytest.mark.benchmark(group="schema-decode")
+def bench_model_validate_json(run_batch, packages: List[PackageAdvanced]):
+    bodies = [p.model_dump_json().encode() for p in packages]
+    run_batch(lambda: [PackageAdvanced.model_validate_json(b) for b in bodies])
+
+
+@pytest.mark.benchmark(group="schema-serialize")
+def bench_model_dump_for_mongo(run_batch, packages: List[PackageAdvanced]):
+    run_batch(lambda: [p.model_dump() for p in packages])
+
+
+@pytest.mark.benchmark(group="schema-serialize")
+def bench_model_dump_json_for_queue(run_batch, payloads: List[Dict[str, Any]]):
+    # так сериализует Producer.send_package_to_queue
+    items = [PackageIn(**p) for p in payloads]
+    run_batch(lambda: [p.model_dump_json() for p in items])
@@ -0,0 +1,65 @@
+import random
+from typing import Any, Callable, Dict, List
+
+import pytest
+
+from app.schemas.packages import PackageAdvanced
+
+DEFAULT_SIZES = "1000,10000"
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--bench-sizes",
+        default=DEFAULT_SIZES,
+        help="размеры синтетических пачек через запятую, например 1000,100000,1000000",
+    )
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    if "batch_size" in metafunc.fixturenames:
+        raw = metafunc.config.getoption("--bench-sizes")
+        sizes = [int(s) for s in raw.split(",") if s]
+        metafunc.parametrize("batch_size", sizes, ids=[f"n={s}" for s in sizes])
+
+
+def make_payloads(n: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Синтетические сообщения в том виде, в каком их получает воркер."""
+    rnd = random.Random(seed)
+    return [
+        {
+            "name": f"package-{i}",
+            "weight_kg": rnd.uniform(0.1, 30),
+            "content_value_usd": rnd.uniform(1, 2000),
+            "type_id": rnd.randint(1, 3),
+            "session_id": "550e8400-e29b-41d4-a716-446655440000",
+            "type_name": "разное",
+            "delivery_cost_rub": rnd.uniform(10, 5000),
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def payloads(batch_size: int) -> List[Dict[str, Any]]:
+    return make_payloads(batch_size)
+
+
+@pytest.fixture
+def packages(payloads: List[Dict[str, Any]]) -> List[PackageAdvanced]:
+    return [PackageAdvanced(**p) for p in payloads]
+
+
+@pytest.fixture
+def run_batch(benchmark: Any) -> Callable[..., Any]:
+    """
+    Один раунд — обработка всей пачки. Число раундов небольшое,
+    чтобы пачки в 1M укладывались в разумное время.
+    """
+
+    def runner(fn: Callable[..., Any], *args: Any) -> Any:
+        return benchmark.pedantic(
+            fn, args=args, rounds=5, iterations=1, warmup_rounds=1
+        )
+
+    return runner
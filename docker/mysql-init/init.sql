@@ -31,21 +31,42 @@ INSERT INTO types (id, name) VALUES
     (3, 'разное')
 ON DUPLICATE KEY UPDATE name = VALUES(name);
 
--- Создание таблицы пакетов
+-- Создание таблицы пакетов.
+-- Секционирование по месяцам created_at (RANGE COLUMNS): вставки идут
+-- в небольшую текущую секцию, запросы по периоду отсекают лишние секции,
+-- старые месяцы уходят в архив целиком (app.db.partitions).
+-- Ограничения секционирования InnoDB:
+--   * каждый PRIMARY/UNIQUE ключ содержит created_at;
+--   * внешние ключи не поддерживаются — type_id проверяет воркер.
+-- Секции на текущий и следующие месяцы создаёт python -m app.db.partitions,
+-- здесь только «хвост» pmax.
 CREATE TABLE IF NOT EXISTS packages (
-    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    id BIGINT AUTO_INCREMENT,
     session_id CHAR(36) NOT NULL,
+    idempotency_key CHAR(64) NULL,
     name VARCHAR(255) NOT NULL,
     weight_kg DECIMAL(10,3) NOT NULL,
     content_value_usd DECIMAL(10,3) NOT NULL,
     type_id INT NOT NULL,
     type_name VARCHAR(50) NOT NULL,
     delivery_cost_rub DECIMAL(10,2) NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    CONSTRAINT packages_ibfk_1 FOREIGN KEY (type_id) REFERENCES types(id)
-        ON UPDATE CASCADE
-        ON DELETE RESTRICT,
-    INDEX idx_session_id (session_id)
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at),
+    INDEX idx_session_id (session_id, created_at),
+    INDEX idx_type_id (type_id),
+    UNIQUE KEY uq_packages_idempotency_key (idempotency_key, created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+PARTITION BY RANGE COLUMNS (created_at) (
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+-- Transactional outbox (OUTBOX_ENABLED): строка на пачку воркера,
+-- пишется в одной транзакции с packages; реле app.workers.outbox
+-- передаёт посылки в Mongo и удаляет строку.
+CREATE TABLE IF NOT EXISTS packages_outbox (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    payload MEDIUMBLOB NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
@@ -0,0 +1,85 @@
+from app.core.config import settings
+from app.workers.batching import AdaptiveBatchController
+
+
+def make_controller(sink: str) -> AdaptiveBatchController:
+    return AdaptiveBatchController(
+        f"test-{sink}",
+        min_size=10,
+        max_size=100,
+        target_flush_sec=1.0,
+        linger_min_sec=0.005,
+        linger_max_sec=0.05,
+    )
+
+
+def test_grows_while_row_cost_falls():
+    controller = make_controller("grow")
+    controller.observe(10, 0.1, ok=True)
+    assert controller.batch_size == 15
+    # 15 строк за то же время — строка дешевле
+    controller.observe(15, 0.1, ok=True)
+    assert controller.batch_size == 22
+
+
+def test_holds_when_row_cost_flat():
+    controller = make_controller("hold")
+    controller.observe(10, 0.1, ok=True)
+    controller.observe(15, 0.15, ok=True)
+    assert controller.batch_size == 15
+
+
+def test_partial_batch_does_not_grow():
+    controller = make_controller("partial")
+    controller.observe(3, 0.001, ok=True)
+    assert controller.batch_size == 10
+
+
+def test_probe_after_holds():
+    controller = make_controller("probe")
+    controller.observe(10, 0.1, ok=True)
+    for _ in range(settings.BATCH_PROBE_EVERY + 1):
+        controller.observe(15, 0.15, ok=True)
+    # после BATCH_PROBE_EVERY удержаний стоимость забыта — снова рост
+    assert controller.batch_size == 22
+
+
+def test_shrinks_on_slow_flush_and_error():
+    controller = make_controller("shrink")
+    controller.batch_size = 80
+    controller.observe(80, 2.0, ok=True)
+    assert controller.batch_size == 60
+    controller.observe(60, 0.1, ok=False)
+    assert controller.batch_size == 30
+
+
+def test_bounds():
+    controller = make_controller("bounds")
+    controller.observe(10, 0.1, ok=False)
+    assert controller.batch_size == 10
+    controller.batch_size = 100
+    controller.observe(100, 0.01, ok=True)
+    assert controller.batch_size == 100
+
+
+def test_linger_follows_arrival_rate(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("app.workers.batching.time.monotonic", lambda: clock[0])
+    controller = make_controller("linger")
+    # нет поступлений — пишем сразу
+    clock[0] = 1.0
+    controller.observe(10, 0.01, ok=True)
+    assert controller.linger_sec == controller.linger_min_sec
+    # 5000 посылок/с: EWMA 1000/с, пачка из 15 набирается за 15 мс
+    for _ in range(5000):
+        controller.record_arrival()
+    clock[0] = 2.0
+    controller.observe(5, 0.01, ok=True)
+    assert abs(controller.linger_sec - 0.015) < 1e-9
+    # 50 посылок/с (EWMA 810/с): пачка набралась бы позже linger_max_sec
+    controller.batch_size = 100
+    for _ in range(50):
+        controller.record_arrival()
+    clock[0] = 3.0
+    controller.observe(5, 0.01, ok=True)
+    assert controller.linger_sec == controller.linger_min_sec
@@ -0,0 +1,34 @@
+import pytest
+
+from app.workers.dedup import BloomFilter
+
+
+def test_bloom_filter_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    keys = [f"key-{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert bloom.count == 1000
+    assert all(key in bloom for key in keys)
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter(10_000, 0.01)
+    for i in range(10_000):
+        bloom.add(f"added-{i}")
+    false_positives = sum(f"absent-{i}" in bloom for i in range(20_000))
+    # при заполнении до capacity — около error_rate
+    assert false_positives / 20_000 < 0.02
+
+
+def test_bloom_filter_empty():
+    bloom = BloomFilter(100, 0.001)
+    assert "key" not in bloom
+
+
+@pytest.mark.parametrize("capacity,error_rate", [(1, 0.5), (10, 0.1), (10**6, 1e-4)])
+def test_bloom_filter_sizing(capacity, error_rate):
+    bloom = BloomFilter(capacity, error_rate)
+    assert bloom.size >= 8
+    assert bloom.hash_count >= 1
+    assert len(bloom.bits) * 8 >= bloom.size
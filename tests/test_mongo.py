@@ -0,0 +1,29 @@
+from app.db.mongo import DUPLICATE_KEY_ERROR, failed_indexes
+
+
+def test_failed_indexes_skips_duplicates():
+    details = {
+        "writeErrors": [
+            {"index": 1, "code": DUPLICATE_KEY_ERROR},
+            {"index": 3, "code": 121},
+            {"index": 0, "code": 2},
+        ]
+    }
+    assert failed_indexes(details, 5) == [0, 3]
+
+
+def test_failed_indexes_only_duplicates():
+    details = {"writeErrors": [{"index": 0, "code": DUPLICATE_KEY_ERROR}]}
+    assert failed_indexes(details, 2) == []
+
+
+def test_failed_indexes_write_concern_error_retries_all_but_duplicates():
+    details = {
+        "writeErrors": [{"index": 2, "code": DUPLICATE_KEY_ERROR}],
+        "writeConcernErrors": [{"code": 64, "errmsg": "waiting for replication"}],
+    }
+    assert failed_indexes(details, 4) == [0, 1, 3]
+
+
+def test_failed_indexes_empty_details():
+    assert failed_indexes({}, 3) == []
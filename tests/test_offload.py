@@ -0,0 +1,7 @@
+from app.workers.offload import OffloadStage
+
+
+def test_chunk_size_capped_by_worker_concurrency():
+    # обработчиков не больше concurrency — больший чанк не наполнится
+    assert OffloadStage(chunk_size=64, concurrency=32).chunk_size == 32
+    assert OffloadStage(chunk_size=16, concurrency=32).chunk_size == 16
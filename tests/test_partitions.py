@@ -0,0 +1,130 @@
+from datetime import date
+
+from app.db.partitions import (
+    Column,
+    Partition,
+    add_months,
+    expired_partitions,
+    migration_clauses,
+    months_to_create,
+)
+
+
+def monthly(first: date, count: int) -> list:
+    partitions = [
+        Partition(f"p{add_months(first, i):%Y%m}", add_months(first, i + 1), 0)
+        for i in range(count)
+    ]
+    return partitions + [Partition("pmax", None, 0)]
+
+
+def test_add_months_year_rollover():
+    assert add_months(date(2026, 12, 1), 1) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert add_months(date(2026, 11, 1), 14) == date(2028, 1, 1)
+
+
+def test_months_to_create_fresh_table():
+    # только pmax: секции с текущего месяца по today + ahead
+    months = months_to_create(monthly(date(2026, 1, 1), 0), date(2026, 11, 20), 2)
+    assert months == [date(2026, 11, 1), date(2026, 12, 1), date(2027, 1, 1)]
+
+
+def test_months_to_create_up_to_date():
+    # p202610..p202612 есть, граница — 2027-01-01
+    partitions = monthly(date(2026, 10, 1), 3)
+    assert months_to_create(partitions, date(2026, 11, 5), 1) == []
+    assert months_to_create(partitions, date(2026, 11, 5), 2) == [date(2027, 1, 1)]
+
+
+def test_months_to_create_gap_after_missed_runs():
+    # последняя секция закончилась в марте, обслуживание простояло до июня
+    partitions = monthly(date(2026, 1, 1), 2)
+    months = months_to_create(partitions, date(2026, 6, 15), 1)
+    assert months == [date(2026, m, 1) for m in range(3, 8)]
+
+
+def test_months_to_create_oldest_row_in_pmax():
+    # свежее секционирование таблицы со строками с 2025-11
+    months = months_to_create(
+        monthly(date(2026, 1, 1), 0), date(2026, 1, 10), 1, date(2025, 11, 17)
+    )
+    assert months == [
+        date(2025, 11, 1),
+        date(2025, 12, 1),
+        date(2026, 1, 1),
+        date(2026, 2, 1),
+    ]
+
+
+def test_months_to_create_oldest_inside_existing_range():
+    # строки pmax за месяцы, у которых уже есть секции, границ не меняют
+    partitions = monthly(date(2026, 10, 1), 2)
+    assert months_to_create(partitions, date(2026, 10, 1), 1, date(2026, 12, 3)) == []
+
+
+def test_expired_partitions_retention_cutoff():
+    partitions = monthly(date(2026, 1, 1), 6)
+    # окно хранения 3 месяца от 2026-06: с 2026-03-01
+    expired = expired_partitions(partitions, date(2026, 6, 30), 3)
+    assert [p.name for p in expired] == ["p202601", "p202602"]
+
+
+def test_expired_partitions_across_year_and_keeps_pmax():
+    partitions = monthly(date(2025, 11, 1), 4)
+    expired = expired_partitions(partitions, date(2026, 2, 1), 2)
+    assert [p.name for p in expired] == ["p202511"]
+    assert expired_partitions(partitions, date(2030, 1, 1), 0)[-1].name == "p202602"
+
+
+LEGACY_COLUMNS = {
+    "id": Column("bigint", False),
+    "session_id": Column("varchar", False),
+    "type_id": Column("int", False),
+    "created_at": Column("timestamp", True),
+    "updated_at": Column("timestamp", True),
+}
+LEGACY_INDEXES = {
+    "PRIMARY": ["id"],
+    "idx_session_id": ["session_id"],
+    "packages_ibfk_1": ["type_id"],
+}
+
+
+def test_migration_clauses_legacy_table():
+    clauses = migration_clauses(LEGACY_COLUMNS, LEGACY_INDEXES)
+    assert clauses[0].startswith("ADD COLUMN idempotency_key")
+    assert "MODIFY created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP" in clauses
+    assert "DROP PRIMARY KEY" in clauses
+    assert "ADD PRIMARY KEY (id, created_at)" in clauses
+    assert "DROP INDEX idx_session_id" in clauses
+    assert (
+        "ADD UNIQUE KEY uq_packages_idempotency_key (idempotency_key, created_at)"
+        in clauses
+    )
+    # индекс по type_id остался от внешнего ключа
+    assert not any("idx_type_id" in c for c in clauses)
+
+
+def test_migration_clauses_unique_key_widened():
+    columns = dict(LEGACY_COLUMNS, idempotency_key=Column("char", True))
+    indexes = dict(LEGACY_INDEXES, uq_packages_idempotency_key=["idempotency_key"])
+    clauses = migration_clauses(columns, indexes)
+    assert not any(c.startswith("ADD COLUMN") for c in clauses)
+    assert "DROP INDEX uq_packages_idempotency_key" in clauses
+
+
+def test_migration_clauses_target_schema_is_noop():
+    columns = dict(
+        LEGACY_COLUMNS,
+        idempotency_key=Column("char", True),
+        created_at=Column("datetime", False),
+        updated_at=Column("datetime", False),
+    )
+    indexes = {
+        "PRIMARY": ["id", "created_at"],
+        "uq_packages_idempotency_key": ["idempotency_key", "created_at"],
+        "idx_session_id": ["session_id", "created_at"],
+        "idx_type_id": ["type_id"],
+    }
+    assert migration_clauses(columns, indexes) == []
@@ -0,0 +1,114 @@
+import asyncio
+from typing import Optional
+
+import pytest
+from starlette.requests import Request
+
+from app.core.responses import ResponseCache, etag_matches, make_etag
+
+ETAG = make_etag(b"body")
+
+
+@pytest.mark.parametrize(
+    "if_none_match,expected",
+    [
+        (None, False),
+        ("", False),
+        (ETAG, True),
+        (f"W/{ETAG}", True),
+        (f'"other", {ETAG}', True),
+        (f'"other",W/{ETAG}', True),
+        ('"other"', False),
+        ("*", True),
+        (ETAG.strip('"'), False),
+    ],
+)
+def test_etag_matches(if_none_match, expected):
+    assert etag_matches(if_none_match, ETAG) is expected
+
+
+def test_make_etag_depends_on_body():
+    assert make_etag(b"body") == ETAG
+    assert make_etag(b"other") != ETAG
+    assert ETAG.startswith('"') and ETAG.endswith('"')
+
+
+def make_request(if_none_match: Optional[str] = None) -> Request:
+    headers = []
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+class CountingLoad:
+    def __init__(self, body: bytes = b"[]", delay: float = 0.01):
+        self.body = body
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self) -> bytes:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.body
+
+
+def test_concurrent_misses_coalesce_into_one_load():
+    async def run():
+        cache = ResponseCache(maxsize=10, ttl_sec=60)
+        load = CountingLoad()
+        results = await asyncio.gather(
+            *(cache.get_or_load("key", load) for _ in range(10))
+        )
+        return load.calls, [source for _, source in results]
+
+    calls, sources = asyncio.run(run())
+    assert calls == 1
+    assert sources.count("miss") == 1
+    assert sources.count("coalesced") == 9
+
+
+def test_cancelled_first_caller_does_not_fail_waiters():
+    async def run():
+        cache = ResponseCache(maxsize=10, ttl_sec=60)
+        load = CountingLoad(b"body", delay=0.05)
+        first = asyncio.ensure_future(cache.get_or_load("key", load))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get_or_load("key", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        entry, source = await waiter
+        return load.calls, entry.body, source
+
+    assert asyncio.run(run()) == (1, b"body", "coalesced")
+
+
+def test_entry_expires_after_ttl():
+    async def run():
+        cache = ResponseCache(maxsize=10, ttl_sec=0.05)
+        load = CountingLoad(delay=0)
+        sources = [(await cache.get_or_load("key", load))[1]]
+        sources.append((await cache.get_or_load("key", load))[1])
+        await asyncio.sleep(0.1)
+        sources.append((await cache.get_or_load("key", load))[1])
+        return load.calls, sources
+
+    assert asyncio.run(run()) == (2, ["miss", "hit", "miss"])
+
+
+def test_respond_if_none_match_returns_304():
+    async def run():
+        cache = ResponseCache(maxsize=10, ttl_sec=60)
+        load = CountingLoad(b'{"items": []}', delay=0)
+        full = await cache.respond(make_request(), "test", "key", load)
+        etag = full.headers["etag"]
+        cached = await cache.respond(make_request(etag), "test", "key", load)
+        stale = await cache.respond(make_request('"other"'), "test", "key", load)
+        return full, cached, stale, etag
+
+    full, cached, stale, etag = asyncio.run(run())
+    assert full.status_code == 200
+    assert full.body == b'{"items": []}'
+    assert cached.status_code == 304
+    assert cached.body == b""
+    assert cached.headers["etag"] == etag
+    assert stale.status_code == 200